@@ -125,6 +125,20 @@ LARGE_UPLOAD_ALLOWED_PATH_URLS = [
 
 LARGE_UPLOAD_FIELD_LIMIT = int(os.getenv('LARGE_UPLOAD_FIELD_LIMIT', 5000))
 
+TENANT_CACHE_TIMEOUT = int(os.getenv('TENANT_CACHE_TIMEOUT', 300))
+REPORT_HEADER_CACHE_TIMEOUT = int(os.getenv('REPORT_HEADER_CACHE_TIMEOUT', 60 * 60 * 24))
+LIST_FILTER_CACHE_TIMEOUT = int(os.getenv('LIST_FILTER_CACHE_TIMEOUT', 60 * 10))
+MEMBER_DASHBOARD_CACHE_TIMEOUT = int(os.getenv('MEMBER_DASHBOARD_CACHE_TIMEOUT', 60 * 2))
+
+# Reportes PDF en segundo plano (common.base.reports)
+REPORT_WORKER_EMBEDDED = ast.literal_eval(os.getenv('REPORT_WORKER_EMBEDDED', 'True'))
+REPORT_WORKER_POLL_INTERVAL = int(os.getenv('REPORT_WORKER_POLL_INTERVAL', 5))
+REPORT_RENDER_WAIT = float(os.getenv('REPORT_RENDER_WAIT', 3))
+REPORT_JOB_TIMEOUT = int(os.getenv('REPORT_JOB_TIMEOUT', 600))
+REPORT_CACHE_TIMEOUT = int(os.getenv('REPORT_CACHE_TIMEOUT', 60 * 60 * 24 * 7))
+BATCH_QR_CACHE_TIMEOUT = int(os.getenv('BATCH_QR_CACHE_TIMEOUT', 60 * 60 * 24 * 30))
+PACKER_LABEL_QR_CACHE_TIMEOUT = int(os.getenv('PACKER_LABEL_QR_CACHE_TIMEOUT', 60 * 60 * 24 * 7))
+
 
 
 ROOT_URLCONF = "application.urls"
@@ -646,6 +660,13 @@ FIREBASE_AUTH_PROJECTS = ast.literal_eval(os.getenv("FIREBASE_AUTH_PROJECTS", "[
 EE_SERVICE_ACCOUNT_EMAIL = os.getenv("EE_SERVICE_ACCOUNT_EMAIL", "")
 EE_SERVICE_ACCOUNT_DATA = os.getenv("EE_SERVICE_ACCOUNT_DATA", "")
 
+# Thumbnails de Earth Engine (eudr.imagery); EE_IMAGERY_BACKEND=eudr.imagery.FakeEarthEngineBackend para pruebas
+EE_IMAGERY_BACKEND = os.getenv("EE_IMAGERY_BACKEND", "eudr.imagery.EarthEngineBackend")
+EE_IMAGERY_MAX_WORKERS = int(os.getenv("EE_IMAGERY_MAX_WORKERS", 4))
+EE_IMAGERY_TIMEOUT = float(os.getenv("EE_IMAGERY_TIMEOUT", 60))
+EE_IMAGERY_CACHE_TIMEOUT = int(os.getenv("EE_IMAGERY_CACHE_TIMEOUT", 60 * 60 * 24))
+EE_IMAGERY_CACHE_MAX_BYTES = int(os.getenv("EE_IMAGERY_CACHE_MAX_BYTES", 1024 * 1024))
+
 
 
 
@@ -14,6 +14,7 @@ from packhouses.purchases.views import (requisition_pdf, set_requisition_ready,
                                         set_purchase_order_supply_payment)
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 from .admin import custom_index
+from common.base.views import report_job_status
 
 
 urlpatterns = [
@@ -37,6 +38,8 @@ urlpatterns = [
          set_purchase_order_supply_payment,
          name='set_purchase_order_supply_payment'),
 
+    path('dadmin/reports/<uuid:uuid>/', report_job_status, name='report_job_status'),
+
     # Admin URLs
     path("dadmin/", admin.site.urls),
     path("wadmin/", include(wagtailadmin_urls)),
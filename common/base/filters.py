@@ -1,10 +1,146 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.utils.encoding import force_str
+from django.utils.translation import get_language
 from cities_light.models import Country, Region, SubRegion, City
 from common.profiles.models import UserProfile, OrganizationProfile, PackhouseExporterSetting, PackhouseExporterProfile
 from .models import ProductKindCountryStandard, ProductKindCountryStandardSize, CapitalFramework
 from common.base.models import ProductKind
 from django.utils.translation import gettext_lazy as _
 
+LIST_FILTER_CACHE_KEY = 'list_filter:{filter}:{model}:{organization_id}:{language}:{versions}'
+LIST_FILTER_VERSION_KEY = 'list_filter_version:{model}'
+
+
+def get_list_filter_version_key(model):
+    return LIST_FILTER_VERSION_KEY.format(model=model._meta.label_lower)
+
+
+def bump_list_filter_version(model):
+    """
+    Invalida las opciones en cache de los filtros que dependen del modelo:
+    incrementa su versión, que forma parte de la llave de cache.
+    """
+    key = get_list_filter_version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def invalidate_list_filters(sender, **kwargs):
+    bump_list_filter_version(sender)
+
+
+def invalidate_list_filters_on_m2m(sender, instance, action, model, **kwargs):
+    # sender es la tabla intermedia; se invalidan los dos modelos de la relación
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_list_filter_version(type(instance))
+        bump_list_filter_version(model)
+
+
+def connect_list_filter_invalidation(model):
+    dispatch_uid = f'list_filter_invalidation:{model._meta.label_lower}'
+    post_save.connect(invalidate_list_filters, sender=model, dispatch_uid=dispatch_uid)
+    post_delete.connect(invalidate_list_filters, sender=model, dispatch_uid=dispatch_uid)
+    # Los cambios de ManyToMany (p. ej. Market.countries) no pasan por post_save
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        m2m_changed.connect(invalidate_list_filters_on_m2m, sender=through,
+                            dispatch_uid=f'list_filter_invalidation:{through._meta.label_lower}')
+
+
+class CachedLookupFilter(admin.SimpleListFilter):
+    """
+    Filtro de changelist cuyas opciones (id, etiqueta) salen de una sola consulta
+    values_list, sin instanciar modelos ni recorrer relaciones por fila. Las
+    opciones se guardan en cache por organización y se invalidan cuando cambia
+    alguno de los modelos de `invalidate_on`.
+
+    `invalidate_on` sólo lista los catálogos que dan las opciones o sus
+    etiquetas; los modelos con altas constantes (lotes, empaques, cortes...)
+    invalidarían el cache en cada guardado. Un valor que empieza a usarse
+    aparece a más tardar en LIST_FILTER_CACHE_TIMEOUT.
+
+    Por defecto las opciones son los valores de `lookup_field` usados en el modelo
+    del admin; con `lookup_model` salen de ese catálogo y se filtra por `filter_field`.
+    """
+    lookup_field = None
+    lookup_model = None
+    filter_field = None
+    label_fields = ('name',)
+    label_template = None
+    label_choices = None
+    lookup_ordering = None
+    organization_field = 'organization'
+    invalidate_on = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for model in cls.invalidate_on:
+            connect_list_filter_invalidation(model)
+
+    def get_lookup_queryset(self, request, model_admin):
+        model = self.lookup_model or model_admin.model
+        queryset = model._default_manager.all()
+        if not self.organization_field:
+            return queryset
+        organization = getattr(request, 'organization', None)
+        if organization is None:
+            # Sin organización no hay opciones que mostrar, no las de todas
+            return queryset.none()
+        return queryset.filter(**{self.organization_field: organization})
+
+    def get_lookup_rows(self, request, model_admin):
+        prefix = '' if self.lookup_model else f'{self.lookup_field}__'
+        value_path = 'pk' if self.lookup_model else self.lookup_field
+        label_paths = [f'{prefix}{field}' for field in self.label_fields]
+        ordering = [f'{prefix}{field}' for field in (self.lookup_ordering or self.label_fields)] or [value_path]
+        return (
+            self.get_lookup_queryset(request, model_admin)
+            .filter(**{f'{value_path}__isnull': False})
+            .values_list(value_path, *label_paths)
+            .order_by(*ordering)
+            .distinct()
+        )
+
+    def get_label(self, value, *labels):
+        if self.label_choices is not None:
+            return self.label_choices.get(value, value)
+        if not labels:
+            return value
+        if self.label_template:
+            return self.label_template.format(*labels)
+        return labels[0]
+
+    def get_cache_key(self, request, model_admin):
+        versions = cache.get_many([get_list_filter_version_key(model) for model in self.invalidate_on])
+        organization = getattr(request, 'organization', None)
+        return LIST_FILTER_CACHE_KEY.format(
+            filter=f'{type(self).__module__}.{type(self).__qualname__}',
+            model=model_admin.model._meta.label_lower,
+            organization_id=getattr(organization, 'pk', None),
+            language=get_language(),
+            versions='.'.join(str(versions.get(get_list_filter_version_key(model), 0))
+                              for model in self.invalidate_on),
+        )
+
+    def lookups(self, request, model_admin):
+        cache_key = self.get_cache_key(request, model_admin)
+        choices = cache.get(cache_key)
+        if choices is None:
+            choices = [(value, force_str(self.get_label(value, *labels)))
+                       for value, *labels in self.get_lookup_rows(request, model_admin)]
+            cache.set(cache_key, choices, settings.LIST_FILTER_CACHE_TIMEOUT)
+        return choices
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.filter_field or self.lookup_field: self.value()})
+        return queryset
+
 
 class ByCountryForCapitalFrameworkFilter(admin.SimpleListFilter):
     title = _('Country')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from common.base.reports import purge_expired_reports
+
+
+class Command(BaseCommand):
+    help = 'Delete finished report jobs and PDF files older than REPORT_CACHE_TIMEOUT.'
+
+    def handle(self, *args, **options):
+        deleted_jobs, deleted_files = purge_expired_reports()
+        self.stdout.write(f'Deleted {deleted_jobs} report job(s) and {deleted_files} file(s).')
@@ -0,0 +1,20 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from common.base.reports import process_report_queue
+
+
+class Command(BaseCommand):
+    help = 'Render queued PDF reports (ReportJob) outside the web workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the pending jobs and exit.')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_report_queue()
+            if processed:
+                self.stdout.write(f'Rendered {processed} report(s).')
+            if options['once']:
+                break
+            time.sleep(settings.REPORT_WORKER_POLL_INTERVAL)
@@ -7,9 +7,7 @@ from django.http import Http404
 from django.shortcuts import redirect
 import re
 
-from organizations.models import Organization, OrganizationUser
-
-from common.profiles.models import PackhouseExporterProfile, PackhouseExporterSetting
+from .tenancy import get_tenant_for_hostname, is_user_in_organization
 
 
 class LanguageDetectionMiddleware:
@@ -51,33 +49,17 @@ class SubdomainDetectionMiddleware:
         requested_hostname = self._get_request_hostname(request)
 
         if re.match(r'^/(dadmin|rest)/.*', request.path):
-            ### Ask for Settings
-            try:
-                requested_settings = PackhouseExporterSetting.objects.get(
-                    hostname=requested_hostname,
-                )
-            except PackhouseExporterSetting.DoesNotExist:
-                print("PackhouseExporterSetting does not exist")
-                raise Http404
-
-            ### Ask for PackhouseExporterProfile
-            try:
-                requested_organization_profile = requested_settings.profile
-            except PackhouseExporterProfile.DoesNotExist:
-                print("PackhouseExporterProfile does not exist")
+            ### Ask for Settings, PackhouseExporterProfile and Organization (cached by hostname)
+            tenant = get_tenant_for_hostname(requested_hostname)
+            if tenant is None:
                 raise Http404
 
-            ### Ask for Organization
-            try:
-                # Verificar si existe Organization asociada al PackhouseExporterProfile
-                requested_organization = Organization.objects.get(
-                    id=requested_organization_profile.organization_id,
-                )
+            requested_settings, requested_organization = tenant
+            # Evita marcar la sesión como modificada (y re-guardarla) en cada request
+            if request.session.get('organization_id') != requested_organization.id:
                 request.session['organization_id'] = requested_organization.id
-                request.organization = requested_organization
-                request.organization_settings = requested_settings
-            except Organization.DoesNotExist:
-                raise Http404
+            request.organization = requested_organization
+            request.organization_settings = requested_settings
 
             if request.user.is_authenticated:
                 if not self._is_user_allowed(request.user, requested_organization):
@@ -101,13 +83,10 @@ class SubdomainDetectionMiddleware:
     def _is_user_in_organization(self, user, organization):
         """
         Query if the 'User' is member of the 'Organization'
-            using 'OrganizationUser' information.
+            using 'OrganizationUser' information (cached).
         """
 
-        return OrganizationUser.objects.filter(
-            organization=organization,
-            user=user,
-        ).exists()
+        return is_user_in_organization(user, organization)
 
     def _is_user_allowed(self, user, organization):
         """
@@ -1,6 +1,7 @@
 from random import choices
 
 from django.utils.translation import gettext_lazy as _
+from django.conf import settings
 from django.db import models
 from wagtail.models import Orderable
 from organizations.models import Organization
@@ -14,12 +15,13 @@ from common.mixins import CleanDocumentsMixin
 from django.utils.text import slugify
 from django.utils.functional import lazy
 import os
+import uuid
 
 
 # Create your models here.
 
 from .settings import (SUPPLY_MEASURE_UNIT_CATEGORY_CHOICES, SUPPLY_CATEGORY_CHOICES,
-                       PRODUCT_MEASURE_UNIT_CATEGORY_CHOICES)
+                       PRODUCT_MEASURE_UNIT_CATEGORY_CHOICES, REPORT_JOB_STATUS_CHOICES)
 
 class ProductKind(models.Model):
     name = models.CharField(max_length=255, unique=True)
@@ -389,3 +391,58 @@ class FruitPurchasePriceCategory(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['name'], name='fruitpurchasepricecategory_unique_name')
         ]
+
+
+class ReportJob(models.Model):
+    """
+    PDF en cola para renderizarse fuera del request. El archivo generado se
+    guarda por content_hash (template + contexto + estilos), así que un
+    reporte sin cambios se reimprime sin volver a pasar por WeasyPrint.
+    """
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    template_name = models.CharField(max_length=255)
+    html = models.TextField(blank=True)
+    stylesheets = models.JSONField(default=list, blank=True)
+    base_url = models.CharField(max_length=255, blank=True)
+    filename = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=REPORT_JOB_STATUS_CHOICES, default='pending', db_index=True)
+    file = models.FileField(upload_to='reports/', null=True, blank=True)
+    error = models.TextField(blank=True)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, null=True, blank=True)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = _('Report Job')
+        verbose_name_plural = _('Report Jobs')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='reportjob_status_created_idx'),
+        ]
+
+
+class OoidCounter(models.Model):
+    """
+    Último folio (ooid) asignado por secuencia y alcance. La secuencia es
+    '<app_label>.<model>:<campo de alcance>' y scope_id el id de ese alcance
+    (normalmente la organización). Ver common.base.sequences.
+    """
+    sequence = models.CharField(max_length=100)
+    scope_id = models.PositiveBigIntegerField(default=0)
+    last_value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.sequence} [{self.scope_id}]: {self.last_value}"
+
+    class Meta:
+        verbose_name = _('Ooid Counter')
+        verbose_name_plural = _('Ooid Counters')
+        constraints = [
+            models.UniqueConstraint(fields=['sequence', 'scope_id'], name='ooidcounter_unique_sequence_scope')
+        ]
@@ -0,0 +1,276 @@
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.http import FileResponse, HttpResponse
+from django.shortcuts import redirect
+from django.template.loader import render_to_string
+from django.utils import timezone
+from weasyprint import HTML, CSS
+from weasyprint.text.fonts import FontConfiguration
+
+from .models import ReportJob
+
+logger = logging.getLogger(__name__)
+
+# Fuentes y hojas de estilo compiladas se comparten entre renders del mismo proceso;
+# WeasyPrint/Pango no es thread-safe, así que los renders se serializan con _render_lock
+_font_config = FontConfiguration()
+_render_lock = threading.Lock()
+
+_worker_lock = threading.Lock()
+_worker_wakeup = threading.Event()
+_worker_thread = None
+
+
+def render_report_html(template_name, context, stylesheets=()):
+    """
+    Renderiza el template del reporte y calcula su content hash sobre el HTML
+    final. La fecha de impresión se imprime con resolución de día, así que
+    reimprimir el mismo registro (por el mismo usuario, que también aparece en
+    el pie) reutiliza el PDF durante el día.
+
+    Regresa (html, content_hash).
+    """
+    print_date = context.get('date')
+    if isinstance(print_date, datetime):
+        context = {**context, 'date': print_date.date()}
+    html = render_to_string(template_name, context)
+
+    digest = hashlib.sha256()
+    for part in (template_name, html, *stylesheets):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return html, digest.hexdigest()
+
+
+def enqueue_report(request, template_name, context, filename, stylesheets=()):
+    """
+    Encola el PDF del template o reutiliza el trabajo existente con el mismo
+    content hash (terminado dentro de REPORT_CACHE_TIMEOUT, o aún en proceso).
+    """
+    stylesheets = list(stylesheets)
+    html, content_hash = render_report_html(template_name, context, stylesheets)
+    organization = getattr(request, 'organization', None)
+    cache_limit = get_report_cache_limit()
+
+    job = (
+        ReportJob.objects
+        .filter(content_hash=content_hash, organization=organization)
+        .filter(Q(status='done', finished_at__gte=cache_limit) | Q(status__in=['pending', 'running']))
+        .order_by('-created_at')
+        .first()
+    )
+    if job is not None:
+        return job
+
+    job = ReportJob.objects.create(
+        content_hash=content_hash,
+        template_name=template_name,
+        html=html,
+        stylesheets=stylesheets,
+        base_url=request.build_absolute_uri('/'),
+        filename=filename,
+        organization=organization,
+        requested_by=request.user if request.user.is_authenticated else None,
+    )
+    transaction.on_commit(wake_report_worker)
+    return job
+
+
+def render_pdf_response(request, template_name, context, filename, stylesheets=(), synchronous=False):
+    """
+    Punto de entrada de las vistas PDF: encola el reporte, espera hasta
+    REPORT_RENDER_WAIT segundos y, si no terminó, redirige a la página de
+    estado para no retener el hilo del worker de gunicorn.
+
+    Con synchronous=True el PDF se genera dentro del request; es para vistas
+    públicas (p. ej. las que se abren por QR) que no pueden mandar al usuario
+    a la página de estado, que requiere sesión.
+    """
+    if synchronous:
+        stylesheets = list(stylesheets)
+        html = render_report_html(template_name, context, stylesheets)[0]
+        response = HttpResponse(
+            write_report_pdf(html, request.build_absolute_uri('/'), stylesheets),
+            content_type='application/pdf',
+        )
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+        return response
+
+    job = enqueue_report(request, template_name, context, filename, stylesheets)
+    job = wait_for_report(job, settings.REPORT_RENDER_WAIT)
+    if job.status == 'done':
+        return report_file_response(job)
+    return redirect('report_job_status', uuid=job.uuid)
+
+
+def wait_for_report(job, timeout):
+    deadline = time.monotonic() + timeout
+    while job.status in ('pending', 'running') and time.monotonic() < deadline:
+        time.sleep(0.2)
+        job.refresh_from_db(fields=['status', 'file', 'error', 'finished_at'])
+    return job
+
+
+def report_file_response(job):
+    response = FileResponse(job.file.open('rb'), content_type='application/pdf')
+    response['Content-Disposition'] = f'inline; filename="{job.filename}"'
+    return response
+
+
+@lru_cache(maxsize=64)
+def get_compiled_stylesheet(stylesheet, base_url):
+    """
+    Compila una hoja de estilos una sola vez por proceso; las @font-face que
+    declare quedan registradas en el FontConfiguration compartido. Se llama
+    sólo desde write_report_pdf, con _render_lock tomado.
+    """
+    return CSS(string=stylesheet, base_url=base_url, font_config=_font_config)
+
+
+def write_report_pdf(html, base_url, stylesheets):
+    # El worker embebido y las vistas síncronas renderizan desde hilos distintos
+    with _render_lock:
+        return HTML(string=html, base_url=base_url).write_pdf(
+            stylesheets=[get_compiled_stylesheet(stylesheet, base_url) for stylesheet in stylesheets],
+            font_config=_font_config,
+        )
+
+
+def get_report_cache_limit():
+    return timezone.now() - timedelta(seconds=settings.REPORT_CACHE_TIMEOUT)
+
+
+def is_report_file_fresh(file_name):
+    """
+    Un PDF ya generado sólo se reutiliza dentro de REPORT_CACHE_TIMEOUT; los
+    storages que no reportan la fecha de modificación no se reutilizan.
+    """
+    if not default_storage.exists(file_name):
+        return False
+    try:
+        return default_storage.get_modified_time(file_name) >= get_report_cache_limit()
+    except NotImplementedError:
+        return False
+
+
+def claim_next_report_job():
+    """
+    Toma el siguiente trabajo pendiente (o uno 'running' que excedió
+    REPORT_JOB_TIMEOUT) con skip_locked para que varios workers no se pisen.
+    """
+    stale_limit = timezone.now() - timedelta(seconds=settings.REPORT_JOB_TIMEOUT)
+    with transaction.atomic():
+        job = (
+            ReportJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status='pending') | Q(status='running', started_at__lt=stale_limit))
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def process_report_job(job):
+    file_name = f"reports/{job.content_hash}.pdf"
+    try:
+        if not is_report_file_fresh(file_name):
+            pdf = write_report_pdf(job.html, job.base_url, job.stylesheets)
+            if default_storage.exists(file_name):
+                default_storage.delete(file_name)
+            file_name = default_storage.save(file_name, ContentFile(pdf))
+        job.file.name = file_name
+        job.status = 'done'
+        job.html = ''
+    except Exception as e:
+        logger.exception("Error al renderizar el reporte %s", job.uuid)
+        job.status = 'failed'
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['file', 'status', 'html', 'error', 'finished_at'])
+    return job
+
+
+def purge_expired_reports():
+    """
+    Borra los trabajos terminados (o fallidos) antes de REPORT_CACHE_TIMEOUT y
+    los PDF de reports/ que ya no referencia ningún trabajo vigente. Regresa
+    (trabajos borrados, archivos borrados).
+    """
+    cache_limit = get_report_cache_limit()
+    expired = ReportJob.objects.filter(status__in=['done', 'failed'], finished_at__lt=cache_limit)
+    file_names = set(expired.exclude(file='').exclude(file__isnull=True).values_list('file', flat=True))
+    deleted_jobs, _ = expired.delete()
+
+    try:
+        _, stored_files = default_storage.listdir('reports')
+        file_names.update(
+            f'reports/{name}' for name in stored_files
+            if default_storage.get_modified_time(f'reports/{name}') < cache_limit
+        )
+    except (FileNotFoundError, NotImplementedError):
+        pass
+
+    in_use = set(ReportJob.objects.filter(file__in=file_names).values_list('file', flat=True))
+    deleted_files = 0
+    for file_name in file_names - in_use:
+        if default_storage.exists(file_name):
+            default_storage.delete(file_name)
+            deleted_files += 1
+    return deleted_jobs, deleted_files
+
+
+def process_report_queue():
+    """
+    Procesa trabajos hasta vaciar la cola. Regresa cuántos procesó.
+    """
+    processed = 0
+    while True:
+        close_old_connections()
+        job = claim_next_report_job()
+        if job is None:
+            return processed
+        process_report_job(job)
+        processed += 1
+
+
+def _run_embedded_worker():
+    while True:
+        try:
+            process_report_queue()
+        except Exception:
+            logger.exception("Error en el worker local de reportes")
+        finally:
+            close_old_connections()
+        _worker_wakeup.wait(settings.REPORT_WORKER_POLL_INTERVAL)
+        _worker_wakeup.clear()
+
+
+def wake_report_worker():
+    """
+    Despierta el worker local del proceso (lo inicia la primera vez). Si
+    REPORT_WORKER_EMBEDDED es False la cola la atiende el comando
+    run_report_worker en un proceso aparte.
+    """
+    global _worker_thread
+    if not settings.REPORT_WORKER_EMBEDDED:
+        return
+    with _worker_lock:
+        if _worker_thread is None or not _worker_thread.is_alive():
+            _worker_thread = threading.Thread(target=_run_embedded_worker, name='report-worker', daemon=True)
+            _worker_thread.start()
+    _worker_wakeup.set()
@@ -0,0 +1,142 @@
+from django.db import connection, transaction
+from django.db.models import Max
+from .models import OoidCounter
+
+
+def _get_sequence(model, scope):
+    if len(scope) != 1:
+        raise ValueError("Exactly one scope field is required, e.g. organization_id=...")
+    (field, scope_id), = scope.items()
+    return f"{model._meta.label_lower}:{field}", field, scope_id
+
+
+def _increment_counter(sequence, scope_id, count):
+    table = connection.ops.quote_name(OoidCounter._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET last_value = last_value + %s WHERE sequence = %s AND scope_id = %s RETURNING last_value",
+            [count, sequence, scope_id or 0],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def allocate_ooids(model, count=1, **scope):
+    """
+    Reserva `count` folios consecutivos de la secuencia del modelo en el
+    alcance dado (p. ej. organization_id=...) con un solo UPDATE ... RETURNING
+    sobre OoidCounter. El contador se crea la primera vez a partir del máximo
+    ooid existente.
+
+    El UPDATE bloquea la fila del contador hasta que termina la transacción del
+    llamador, así que el folio sólo se consume si esa transacción confirma: se
+    debe llamar dentro del mismo transaction.atomic() que guarda los registros
+    para que la secuencia no tenga huecos.
+
+    Regresa un range con los folios reservados.
+    """
+    sequence, field, scope_id = _get_sequence(model, scope)
+    with transaction.atomic():
+        last_value = _increment_counter(sequence, scope_id, count)
+        if last_value is None:
+            current = model._default_manager.filter(**{field: scope_id}).aggregate(Max('ooid'))['ooid__max'] or 0
+            OoidCounter.objects.bulk_create(
+                [OoidCounter(sequence=sequence, scope_id=scope_id or 0, last_value=current)],
+                ignore_conflicts=True,
+            )
+            last_value = _increment_counter(sequence, scope_id, count)
+    return range(last_value - count + 1, last_value + 1)
+
+
+def allocate_ooid(model, **scope):
+    return allocate_ooids(model, 1, **scope)[0]
+
+
+def lock_ooid_counter(model, **scope):
+    """
+    Bloquea (select_for_update) la fila del contador de la secuencia en el
+    alcance, creándola si no existe. Debe llamarse dentro de una transacción y
+    antes de tocar los registros de la secuencia, para que altas, bajas y
+    renumeraciones del mismo alcance se serialicen en el mismo orden.
+    """
+    sequence, field, scope_id = _get_sequence(model, scope)
+    counters = OoidCounter.objects.select_for_update().filter(sequence=sequence, scope_id=scope_id or 0)
+    counter = counters.first()
+    if counter is None:
+        current = model._default_manager.filter(**{field: scope_id}).aggregate(Max('ooid'))['ooid__max'] or 0
+        OoidCounter.objects.bulk_create(
+            [OoidCounter(sequence=sequence, scope_id=scope_id or 0, last_value=current)],
+            ignore_conflicts=True,
+        )
+        counter = counters.get()
+    return counter
+
+
+def reset_ooid_counter(model, **scope):
+    """
+    Sincroniza el contador con el máximo ooid actual del alcance, para
+    secuencias que se renumeran al borrar registros. El máximo se lee con el
+    contador ya bloqueado: un alta concurrente que ya reservó folio termina
+    antes y su folio entra en el máximo.
+    """
+    sequence, field, scope_id = _get_sequence(model, scope)
+    with transaction.atomic():
+        counter = lock_ooid_counter(model, **scope)
+        current = model._default_manager.filter(**{field: scope_id}).aggregate(Max('ooid'))['ooid__max'] or 0
+        if counter.last_value != current:
+            OoidCounter.objects.filter(pk=counter.pk).update(last_value=current)
+
+
+def _renumber_with_row_number(model, field, scope_id, order_by):
+    table = connection.ops.quote_name(model._meta.db_table)
+    pk_column = connection.ops.quote_name(model._meta.pk.column)
+    scope_column = connection.ops.quote_name(model._meta.get_field(field).column)
+    ordering = ', '.join(
+        f"{connection.ops.quote_name(model._meta.get_field(name.lstrip('-')).column)} "
+        f"{'DESC' if name.startswith('-') else 'ASC'}"
+        for name in order_by
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET ooid = numbered.position "
+            f"FROM (SELECT {pk_column} AS child_id, row_number() OVER (ORDER BY {ordering}) AS position "
+            f"FROM {table} WHERE {scope_column} = %s) AS numbered "
+            f"WHERE {table}.{pk_column} = numbered.child_id AND {table}.ooid IS DISTINCT FROM numbered.position",
+            [scope_id],
+        )
+        return cursor.rowcount
+
+
+def _renumber_with_bulk_update(model, field, scope_id, order_by):
+    children = list(model._default_manager.filter(**{field: scope_id}).order_by(*order_by).only('pk', 'ooid'))
+    changed = []
+    for position, child in enumerate(children, start=1):
+        if child.ooid != position:
+            child.ooid = position
+            changed.append(child)
+    model._default_manager.bulk_update(changed, ['ooid'])
+    return len(changed)
+
+
+def renumber_ooids(model, order_by=('pk',), **scope):
+    """
+    Renumera 1..n los ooid de los hijos de un alcance (p. ej.
+    incoming_product_id=...) según order_by y sincroniza el contador.
+
+    En PostgreSQL es un solo UPDATE ... FROM (SELECT row_number() ...) que sólo
+    toca las filas fuera de secuencia; en otros motores (SpatiaLite en
+    desarrollo) se calcula en Python y se aplica con bulk_update. El contador
+    se bloquea antes de renumerar, así que las altas y bajas concurrentes del
+    alcance esperan a que termine (o ésta a ellas). No debe usarse
+    en secuencias con un UniqueConstraint sobre (alcance, ooid), porque el
+    corrimiento puede chocar fila por fila.
+
+    Regresa cuántos registros cambiaron de folio.
+    """
+    sequence, field, scope_id = _get_sequence(model, scope)
+    renumber = _renumber_with_row_number if connection.vendor == 'postgresql' else _renumber_with_bulk_update
+    with transaction.atomic():
+        lock_ooid_counter(model, **scope)
+        updated = renumber(model, field, scope_id, order_by)
+        reset_ooid_counter(model, **scope)
+    return updated
@@ -62,3 +62,10 @@ SUPPLY_TRANSACTION_CATEGORY_CHOICES = [
     ('return', _('Return')),
     ('other', _('Other')),
 ]
+
+REPORT_JOB_STATUS_CHOICES = [
+    ('pending', _('Pending')),
+    ('running', _('Running')),
+    ('done', _('Done')),
+    ('failed', _('Failed')),
+]
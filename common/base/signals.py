@@ -1,6 +1,9 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save
+from organizations.models import Organization, OrganizationUser
 from .models import CertificationFormat
+from .tenancy import invalidate_tenant_hostnames, invalidate_tenant_for_organization, invalidate_membership
+from common.profiles.models import PackhouseExporterProfile, PackhouseExporterSetting
 from packhouses.certifications.models import Format, Certification
 
 @receiver(post_save, sender=CertificationFormat)
@@ -11,3 +14,31 @@ def add_requirement_to_certification(sender, **kwargs):
     ids = Certification.objects.filter(certification_entity_id=id_certification_entity).values_list('id', flat=True)
     certications = [Format(certification_format_id=id_requeriment, certification_id=id_cert) for id_cert in ids]
     Format.objects.bulk_create(certications)
+
+
+@receiver(pre_save, sender=PackhouseExporterSetting)
+def remember_previous_tenant_hostname(sender, instance, **kwargs):
+    instance._previous_hostname = None
+    if instance.pk:
+        instance._previous_hostname = sender.objects.filter(pk=instance.pk).values_list('hostname', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=PackhouseExporterSetting)
+def invalidate_tenant_setting_cache(sender, instance, **kwargs):
+    invalidate_tenant_hostnames(instance.hostname, getattr(instance, '_previous_hostname', None))
+
+
+@receiver([post_save, post_delete], sender=PackhouseExporterProfile)
+def invalidate_tenant_profile_cache(sender, instance, **kwargs):
+    if instance.organization_id:
+        invalidate_tenant_for_organization(instance.organization_id)
+
+
+@receiver([post_save, post_delete], sender=Organization)
+def invalidate_tenant_organization_cache(sender, instance, **kwargs):
+    invalidate_tenant_for_organization(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=OrganizationUser)
+def invalidate_tenant_membership_cache(sender, instance, **kwargs):
+    invalidate_membership(instance.organization_id, instance.user_id)
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from organizations.models import OrganizationUser
+
+from common.profiles.models import PackhouseExporterSetting
+
+
+TENANT_HOSTNAME_CACHE_KEY = 'tenant:hostname:{hostname}'
+TENANT_MEMBERSHIP_CACHE_KEY = 'tenant:membership:{organization_id}:{user_id}'
+
+# Marca en caché los hostnames que no tienen PackhouseExporterSetting,
+# para no volver a consultarlos en cada request.
+TENANT_NOT_FOUND = 'not-found'
+
+
+def get_tenant_for_hostname(hostname):
+    """
+    Return the (PackhouseExporterSetting, Organization) pair for the hostname,
+    or None if there is no setting registered for it.
+
+    The pair is resolved with a single query and cached by hostname until one
+    of the related models changes (see common.base.signals).
+    """
+    key = TENANT_HOSTNAME_CACHE_KEY.format(hostname=hostname)
+    tenant = cache.get(key)
+    if tenant is None:
+        requested_settings = PackhouseExporterSetting.objects.select_related(
+            'profile__organization'
+        ).filter(hostname=hostname).first()
+        if requested_settings is None or requested_settings.profile.organization is None:
+            tenant = TENANT_NOT_FOUND
+        else:
+            tenant = (requested_settings, requested_settings.profile.organization)
+        cache.set(key, tenant, settings.TENANT_CACHE_TIMEOUT)
+
+    if tenant == TENANT_NOT_FOUND:
+        return None
+    return tenant
+
+
+def is_user_in_organization(user, organization):
+    """
+    Query if the 'User' is member of the 'Organization' using
+    'OrganizationUser' information, cached per (organization, user).
+    """
+    key = TENANT_MEMBERSHIP_CACHE_KEY.format(organization_id=organization.pk, user_id=user.pk)
+    is_member = cache.get(key)
+    if is_member is None:
+        is_member = OrganizationUser.objects.filter(organization=organization, user=user).exists()
+        cache.set(key, is_member, settings.TENANT_CACHE_TIMEOUT)
+    return is_member
+
+
+def invalidate_tenant_hostnames(*hostnames):
+    cache.delete_many([
+        TENANT_HOSTNAME_CACHE_KEY.format(hostname=hostname) for hostname in hostnames if hostname
+    ])
+
+
+def invalidate_tenant_for_organization(organization_id):
+    hostnames = PackhouseExporterSetting.objects.filter(
+        profile__organization_id=organization_id
+    ).values_list('hostname', flat=True)
+    invalidate_tenant_hostnames(*hostnames)
+
+
+def invalidate_membership(organization_id, user_id):
+    cache.delete(TENANT_MEMBERSHIP_CACHE_KEY.format(organization_id=organization_id, user_id=user_id))
@@ -1,3 +1,82 @@
-from django.test import TestCase
+import threading
+from collections import defaultdict
+from unittest import skipUnless
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+
+from packhouses.receiving.models import Batch, WeighingSet
+from .models import OoidCounter
+from .sequences import allocate_ooids
+
+
+class RolledBack(Exception):
+    pass
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Requires row locks across connections (PostgreSQL).')
+class AllocateOoidsConcurrencyTests(TransactionTestCase):
+    """
+    Varios hilos (cada uno con su conexión) reservan folios a la vez; los que
+    confirman deben quedar únicos y sin huecos por alcance.
+    """
+    workers = 8
+    allocations_per_worker = 10
+    folios_per_allocation = 2
+
+    def allocate_in_parallel(self, model, scopes, rollback_every=0):
+        barrier = threading.Barrier(self.workers)
+        lock = threading.Lock()
+        committed = defaultdict(list)
+        errors = []
+
+        def worker(index):
+            scope = scopes[index % len(scopes)]
+            try:
+                barrier.wait()
+                for allocation in range(self.allocations_per_worker):
+                    try:
+                        with transaction.atomic():
+                            folios = allocate_ooids(model, self.folios_per_allocation, **scope)
+                            if rollback_every and allocation % rollback_every == 0:
+                                raise RolledBack
+                    except RolledBack:
+                        continue
+                    with lock:
+                        committed[tuple(scope.items())].extend(folios)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return committed
+
+    def assertUniqueWithoutGaps(self, model, committed):
+        for scope, folios in committed.items():
+            with self.subTest(scope=scope):
+                self.assertEqual(sorted(folios), list(range(1, len(folios) + 1)))
+                (field, scope_id), = scope
+                counter = OoidCounter.objects.get(sequence=f'{model._meta.label_lower}:{field}', scope_id=scope_id)
+                self.assertEqual(counter.last_value, len(folios))
+
+    def test_per_organization(self):
+        scopes = [{'organization_id': 1}, {'organization_id': 2}]
+        committed = self.allocate_in_parallel(Batch, scopes)
+        self.assertEqual(len(committed), len(scopes))
+        self.assertUniqueWithoutGaps(Batch, committed)
+
+    def test_per_parent(self):
+        scopes = [{'incoming_product_id': 1}, {'incoming_product_id': 2}, {'incoming_product_id': 3}]
+        committed = self.allocate_in_parallel(WeighingSet, scopes)
+        self.assertEqual(len(committed), len(scopes))
+        self.assertUniqueWithoutGaps(WeighingSet, committed)
+
+    def test_rolled_back_allocations_leave_no_gaps(self):
+        committed = self.allocate_in_parallel(Batch, [{'organization_id': 1}], rollback_every=3)
+        self.assertUniqueWithoutGaps(Batch, committed)
@@ -1,6 +1,15 @@
+import json
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
 from django.contrib import admin
+from django.http import FileResponse
+from django.utils import timezone
+from django.utils.encoding import force_str
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
 from import_export.admin import ExportMixin
-from import_export.formats.base_formats import JSON, XLSX
+from import_export.formats.base_formats import XLSX
 from import_export import resources
 from django.core.exceptions import PermissionDenied
 from django.core.exceptions import FieldDoesNotExist
@@ -168,17 +177,146 @@ def prettify_filter_names(filters, model, request=None):
     return pretty
 
 
+EXPORT_CHUNK_SIZE = 2000
+
+
+class ExportRows:
+    """
+    Encabezados y filas de una exportación. Las filas se generan al iterar,
+    así que sólo se recorren una vez (por el template del reporte).
+    """
+
+    def __init__(self, headers, rows):
+        self.headers = headers
+        self.rows = rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+def get_report_rows(export_data):
+    """
+    Regresa (headers, rows) para los report_function; acepta ExportRows o el
+    JSON de get_export_data que se usaba antes.
+    """
+    if isinstance(export_data, ExportRows):
+        return export_data.headers, export_data
+    json_data = json.loads(export_data)
+    headers = list(json_data[0].keys()) if json_data else []
+    return headers, [[item.get(header) for header in headers] for item in json_data]
+
+
+def get_export_prefetch_plan(resource, model):
+    """
+    Deriva los select_related/prefetch_related de los campos declarados en el
+    resource: cada campo que apunte a una relación del modelo (por su attribute
+    o por su nombre, como los dehydrate_* de DehydrationResource) se carga por
+    join si es a-uno o con prefetch si es a-muchos. El resource puede agregar
+    rutas extra con export_select_related y export_prefetch_related.
+    """
+    select_related = list(getattr(resource, 'export_select_related', ()))
+    prefetch_related = list(getattr(resource, 'export_prefetch_related', ()))
+    export_fields = resource.get_export_fields()
+
+    for name, field in resource.fields.items():
+        if field not in export_fields:
+            continue
+        current_model = model
+        path = []
+        for part in (field.attribute or name).split('__'):
+            try:
+                model_field = current_model._meta.get_field(part)
+            except FieldDoesNotExist:
+                break
+            if not model_field.is_relation or model_field.related_model is None:
+                break
+            path.append(part)
+            if model_field.many_to_many or model_field.one_to_many:
+                prefetch_related.append('__'.join(path))
+                path = []
+                break
+            current_model = model_field.related_model
+        if path:
+            select_related.append('__'.join(path))
+
+    return list(dict.fromkeys(select_related)), list(dict.fromkeys(prefetch_related))
+
+
+def _sheet_value(value):
+    if value is None or isinstance(value, (bool, int, float, Decimal, date)):
+        if isinstance(value, datetime) and timezone.is_aware(value):
+            return timezone.localtime(value).replace(tzinfo=None)
+        return value
+    return ILLEGAL_CHARACTERS_RE.sub('', force_str(value))
+
+
+def sheet_file_response(headers, rows, filename):
+    """
+    Escribe las filas en un XLSX write-only conforme se generan y lo envía
+    como descarga; el archivo se arma en disco, no en memoria.
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append([force_str(header) for header in headers])
+    for row in rows:
+        worksheet.append([_sheet_value(value) for value in row])
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=filename,
+        content_type=XLSX().get_content_type(),
+    )
+
+
+class StreamingExportMixin:
+    """
+    Motor de exportación compartido por los mixins de reportes: arma el
+    queryset con el plan de prefetch del resource, lo recorre por bloques con
+    iterator() y genera las filas una sola vez, ya sea hacia un XLSX en modo
+    write-only o directo al template del PDF.
+    """
+    export_chunk_size = EXPORT_CHUNK_SIZE
+
+    def get_export_resource(self, request):
+        resource_class = self.get_export_resource_classes(request)[0]
+        return resource_class(**self.get_export_resource_kwargs(request))
+
+    def get_export_rows(self, request, queryset):
+        resource = self.get_export_resource(request)
+        select_related, prefetch_related = get_export_prefetch_plan(resource, self.model)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        resource.before_export(queryset)
+
+        def rows():
+            for obj in queryset.iterator(chunk_size=self.export_chunk_size):
+                yield resource.export_resource(obj)
+
+        return ExportRows([force_str(header) for header in resource.get_export_headers()], rows())
+
+    def export_sheet_response(self, request, queryset):
+        export_rows = self.get_export_rows(request, queryset)
+        return sheet_file_response(
+            export_rows.headers, export_rows, self.get_export_filename(request, queryset, XLSX())
+        )
+
+
 # Para exportar solo a PDF
-class ReportExportAdminMixin(ExportMixin):
+class ReportExportAdminMixin(StreamingExportMixin, ExportMixin):
     import_export_change_list_template = "admin/export/export_pdf/change_list_export.html"
     report_function = None
 
     def export_action(self, request):
         if not self.has_export_permission(request):
             raise PermissionDenied
-        formats = [JSON]
         queryset = self.get_export_queryset(request)
-        export_data = self.get_export_data(formats[0](), request, queryset)
+        export_data = self.get_export_rows(request, queryset)
         model_name = self.model._meta.verbose_name
         model_key = self.model.__name__
 
@@ -195,18 +333,15 @@ class ReportExportAdminMixin(ExportMixin):
         return kwargs
 
 # Para exportar solo a excel
-class SheetExportAdminMixin(ExportMixin):
+class SheetExportAdminMixin(StreamingExportMixin, ExportMixin):
     import_export_change_list_template = "admin/export/export_sheet/change_list_export.html"
 
     def export_action(self, request):
         if not self.has_export_permission(request):
             raise PermissionDenied
 
-        formats = [XLSX]
         queryset = self.get_export_queryset(request)
-        export_data = self.get_export_data(formats[0](), request, queryset)
-        model_name = self.model._meta.verbose_name
-        return self._do_file_export(formats[0](), request, queryset)
+        return self.export_sheet_response(request, queryset)
 
     def get_export_resource_kwargs(self, request, *args, **kwargs):
         kwargs = super().get_export_resource_kwargs(request, *args, **kwargs)
@@ -214,7 +349,7 @@ class SheetExportAdminMixin(ExportMixin):
         return kwargs
 
 # Para exportar a excel y PDF
-class SheetReportExportAdminMixin(ExportMixin):
+class SheetReportExportAdminMixin(StreamingExportMixin, ExportMixin):
     import_export_change_list_template = "admin/export/export_pdf_sheet/change_list_export.html"
     report_function = None
 
@@ -236,13 +371,10 @@ class SheetReportExportAdminMixin(ExportMixin):
         model_key = self.model.__name__
 
         if action == "export-sheet":
-            formats = [XLSX]
-            export_data = self.get_export_data(formats[0](), request, queryset)
-            return self._do_file_export(formats[0](), request, queryset)
+            return self.export_sheet_response(request, queryset)
 
         elif action == "export-pdf":
-            formats = [JSON]
-            export_data = self.get_export_data(formats[0](), request, queryset)
+            export_data = self.get_export_rows(request, queryset)
             if self.report_function is None:
                 raise NotImplementedError("A report for this model is not available at the moment.")
             model = self.model
@@ -1,10 +1,14 @@
-from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse
+from django.shortcuts import render, get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response
 # from django_countries import countries
 from .serializers import CountrySerializer
 from rest_framework.permissions import AllowAny
 from django.utils import translation
+from .models import ReportJob
+from .reports import report_file_response
 
 # Create your views here.
 
@@ -23,3 +27,34 @@ class CountryListView(APIView):
         serializer = CountrySerializer(country_list, many=True)
         return Response(serializer.data)
 """
+
+
+@login_required
+def report_job_status(request, uuid):
+    """
+    Página de espera de un reporte en cola: se recarga sola hasta que el PDF
+    está listo y entonces lo entrega. Con ?format=json responde el estado
+    para clientes que hacen polling.
+    """
+    job = get_object_or_404(ReportJob, uuid=uuid)
+    organization = getattr(request, 'organization', None)
+    if job.organization_id and (organization is None or job.organization_id != organization.id):
+        raise Http404
+    # Los trabajos sin organización sólo los ve quien los pidió
+    if job.organization_id is None and job.requested_by_id != request.user.id:
+        raise Http404
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'status': job.status,
+            'url': request.path if job.status == 'done' else None,
+            'error': job.error or None,
+        })
+
+    if job.status == 'done':
+        return report_file_response(job)
+    return render(request, 'admin/report_job_status.html', {
+        'job': job,
+        'title': job.filename,
+        'refresh_seconds': 2 if job.status != 'failed' else None,
+    }, status=500 if job.status == 'failed' else 200)
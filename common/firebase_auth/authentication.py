@@ -5,7 +5,8 @@ Authorization header, verifying, and locally authenticating
 
 """
 
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Optional
+from datetime import timedelta
 import logging
 import firebase_admin
 from firebase_admin import auth as firebase_auth
@@ -16,7 +17,7 @@ from rest_framework import authentication, exceptions
 from .settings import api_settings
 from django.conf import settings
 from .models import FirebaseUser, FirebaseUserProvider
-from .utils import get_firebase_user_email
+from .utils import get_firebase_user_email, get_token_hash, get_token_audience, DecodedTokenCache
 from . import __title__
 import json
 
@@ -25,6 +26,11 @@ User = get_user_model()
 
 firebase_instances = {}
 
+decoded_token_cache = DecodedTokenCache(
+    max_size=api_settings.FIREBASE_TOKEN_CACHE_SIZE,
+    ttl=api_settings.FIREBASE_TOKEN_CACHE_TTL,
+)
+
 for index, project in enumerate(api_settings.FIREBASE_AUTH_PROJECTS):  # 22 may 2025
     service_account = project['SERVICE_ACCOUNT']
     if isinstance(service_account, str):
@@ -50,9 +56,11 @@ class FirebaseAuthentication(authentication.TokenAuthentication):
     def authenticate_credentials(self, token: str) -> Tuple[AnonymousUser, Dict]:
         try:
             decoded_token = self._decode_token(token)
-            firebase_user = self._authenticate_token(decoded_token)
-            local_user = self._get_or_create_local_user(firebase_user)
-            self._create_local_firebase_user(local_user, firebase_user)
+            local_user = self._get_recently_synced_user(decoded_token)
+            if local_user is None:
+                firebase_user = self._authenticate_token(decoded_token)
+                local_user = self._get_or_create_local_user(firebase_user)
+                self._create_local_firebase_user(local_user, firebase_user)
             return local_user, decoded_token
         except Exception as e:
             if settings.DEBUG:
@@ -60,13 +68,28 @@ class FirebaseAuthentication(authentication.TokenAuthentication):
 
     def _decode_token(self, token: str) -> Dict:
         """
-        Attempt to verify JWT from Authorization header with Firebase and return the decoded token
+        Attempt to verify JWT from Authorization header with Firebase and return the decoded token.
+        Verified tokens are kept in decoded_token_cache, and the Firebase app that verifies the
+        token is picked from its 'aud' claim instead of trying every configured project.
         """
-        for account in api_settings.FIREBASE_AUTH_PROJECTS:
+        token_hash = get_token_hash(token)
+        decoded_token = decoded_token_cache.get(token_hash)
+        if decoded_token is not None:
+            self.current_firebase_user_app = firebase_instances.get(decoded_token.get('aud'))
+            return decoded_token
+
+        audience_app = firebase_instances.get(get_token_audience(token))
+        if audience_app is not None:
+            candidate_apps = [audience_app]
+        else:
+            candidate_apps = [firebase_instances[account['PROJECT_ID']] for account in api_settings.FIREBASE_AUTH_PROJECTS]
+
+        for app in candidate_apps:
             try:
-                self.current_firebase_user_app = firebase_instances[account['PROJECT_ID']]
+                self.current_firebase_user_app = app
                 decoded_token = firebase_auth.verify_id_token(token, app=self.current_firebase_user_app, check_revoked=api_settings.FIREBASE_CHECK_JWT_REVOKED)
                 log.info(f'_decode_token - decoded_token: {decoded_token}')
+                decoded_token_cache.set(token_hash, decoded_token)
                 return decoded_token
             except Exception as e:
                 log.error(f'_decode_token - Exception: {e}')
@@ -75,6 +98,29 @@ class FirebaseAuthentication(authentication.TokenAuthentication):
             log.error(f'Invalid AccessToken')
             raise Exception("Invalid AccessToken")
 
+    @staticmethod
+    def _get_recently_synced_user(decoded_token: Dict) -> Optional[User]:
+        """
+        Returns the local user linked to the token uid when it was synced with Firebase
+        (last_login and providers) less than FIREBASE_USER_SYNC_INTERVAL minutes ago,
+        so the Firebase user lookup and the local writes can be skipped.
+        """
+        local_firebase_user = FirebaseUser.objects.select_related('user').filter(
+            uid=decoded_token.get('uid')
+        ).first()
+        if not local_firebase_user:
+            return None
+
+        user = local_firebase_user.user
+        sync_interval = timedelta(minutes=api_settings.FIREBASE_USER_SYNC_INTERVAL)
+        if not user.last_login or user.last_login < timezone.now() - sync_interval:
+            return None
+        if not user.is_active:
+            return None
+        if api_settings.FIREBASE_AUTH_EMAIL_VERIFICATION and not decoded_token.get('email_verified'):
+            return None
+        return user
+
     def _authenticate_token(self, decoded_token: Dict) -> firebase_auth.UserRecord:
         """ Returns firebase user if token is authenticated """
         try:
@@ -108,7 +154,7 @@ class FirebaseAuthentication(authentication.TokenAuthentication):
                 if settings.DEBUG:
                     raise Exception('User account is not currently active.')
             user.last_login = timezone.now()
-            user.save()
+            user.save(update_fields=['last_login'])
         except User.DoesNotExist:
             log.error(
                 f'_get_or_create_local_user - User.DoesNotExist: {email}'
@@ -159,28 +205,23 @@ class FirebaseAuthentication(authentication.TokenAuthentication):
             local_firebase_user.save()
 
         # store FirebaseUserProvider data
-        for provider in firebase_user.provider_data:
-            local_provider = FirebaseUserProvider.objects.filter(
+        local_provider_ids = set(FirebaseUserProvider.objects.filter(
+            firebase_user=local_firebase_user
+        ).values_list('provider_id', flat=True))
+        current_providers = [x.provider_id for x in firebase_user.provider_data]
+
+        FirebaseUserProvider.objects.bulk_create([
+            FirebaseUserProvider(
                 provider_id=provider.provider_id,
-                firebase_user=local_firebase_user
-            ).first()
-            if not local_provider:
-                new_local_provider = FirebaseUserProvider.objects.create(
-                    provider_id=provider.provider_id,
-                    uid=provider.uid,
-                    firebase_user=local_firebase_user,
-                )
-                new_local_provider.save()
+                uid=provider.uid,
+                firebase_user=local_firebase_user,
+            )
+            for provider in firebase_user.provider_data
+            if provider.provider_id not in local_provider_ids
+        ])
 
         # catch locally stored providers no longer associated at Firebase
-        local_providers = FirebaseUserProvider.objects.filter(
-            firebase_user=local_firebase_user
-        )
-        if len(local_providers) != len(firebase_user.provider_data):
-            current_providers = \
-                [x.provider_id for x in firebase_user.provider_data]
-            for provider in local_providers:
-                if provider.provider_id not in current_providers:
-                    FirebaseUserProvider.objects.filter(
-                        id=provider.id
-                    ).delete()
+        if local_provider_ids - set(current_providers):
+            FirebaseUserProvider.objects.filter(
+                firebase_user=local_firebase_user
+            ).exclude(provider_id__in=current_providers).delete()
@@ -32,6 +32,12 @@ DEFAULT_FIREBASE_AUTH_CONFIG = {
     'FIREBASE_AUTH_EMAIL_VERIFICATION': os.getenv('FIREBASE_AUTH_EMAIL_VERIFICATION', False),
     # function should accept firebase_admin.auth.UserRecord as argument and return str
     'FIREBASE_USERNAME_MAPPING_FUNC': map_firebase_uid_to_username,
+    # max number of verified tokens kept in the per-process cache
+    'FIREBASE_TOKEN_CACHE_SIZE': int(os.getenv('FIREBASE_TOKEN_CACHE_SIZE', 1024)),
+    # seconds a verified token is trusted without re-verifying (never beyond its exp claim)
+    'FIREBASE_TOKEN_CACHE_TTL': int(os.getenv('FIREBASE_TOKEN_CACHE_TTL', 300)),
+    # minutes between Firebase user/provider syncs and last_login updates for the same user
+    'FIREBASE_USER_SYNC_INTERVAL': int(os.getenv('FIREBASE_USER_SYNC_INTERVAL', 15)),
     # Project ID and Service Account Keyfile JSON: Loads json from env var or gets object from settings
     'FIREBASE_AUTH_PROJECTS':  getattr(settings, 'FIREBASE_AUTH_PROJECTS', []),
 }
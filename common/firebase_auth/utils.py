@@ -7,7 +7,13 @@ Authors: ['César Benjamín García Martínez <mathereall@gmail.com>', ]
 License: Apache 2.0
 """
 
+import base64
+import hashlib
+import json
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from firebase_admin import auth
 
 
@@ -60,3 +66,59 @@ def map_uuid_to_username(_: auth.UserRecord) -> str:
         return str(uuid.uuid4())
     except Exception as e:
         raise Exception(e)
+
+
+def get_token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def get_token_audience(token: str):
+    """
+    Read the 'aud' claim (Firebase project id) from the JWT payload without
+    verifying it, only to pick which Firebase app must verify the token.
+    """
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload)).get('aud')
+    except Exception:
+        return None
+
+
+class DecodedTokenCache:
+    """
+    Thread safe LRU cache with TTL for decoded (already verified) tokens.
+    Entries never outlive the 'exp' claim of the token.
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, decoded_token = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return decoded_token
+
+    def set(self, key: str, decoded_token: dict):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        expires_at = min(time.time() + self.ttl, decoded_token.get('exp', 0))
+        with self._lock:
+            self._entries[key] = (expires_at, decoded_token)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
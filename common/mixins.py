@@ -587,6 +587,67 @@ class CleanDocumentsMixin(models.Model):
         abstract = True
 
 
+class TrackedFieldsMixin(models.Model):
+    """
+    Conserva los valores con que se cargó la instancia (from_db) de los campos en
+    `tracked_fields`, para saber si cambiaron al guardar sin volver a leer la fila:
+    has_changed('status') y previous('status').
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def _tracked_attname(self, field_name):
+        return self._meta.get_field(field_name).attname
+
+    def _snapshot_tracked_fields(self, field_names=None):
+        if not hasattr(self, '_tracked_values'):
+            self._tracked_values = {}
+        for field_name in field_names or self.tracked_fields:
+            if field_name not in self.tracked_fields:
+                continue
+            attname = self._tracked_attname(field_name)
+            # Los campos diferidos (only/defer) no se conocen hasta que se piden
+            if attname in self.__dict__:
+                self._tracked_values[field_name] = self.__dict__[attname]
+
+    def previous(self, field_name):
+        """
+        Valor guardado del campo; None si la instancia aún no existe en la base de datos.
+        """
+        if self._state.adding or self.pk is None:
+            return None
+        tracked_values = getattr(self, '_tracked_values', {})
+        if field_name not in tracked_values:
+            # Campo diferido o instancia construida a mano: se lee una sola vez
+            tracked_values[field_name] = (
+                type(self)._base_manager.filter(pk=self.pk)
+                .values_list(self._tracked_attname(field_name), flat=True).first()
+            )
+            self._tracked_values = tracked_values
+        return tracked_values[field_name]
+
+    def has_changed(self, field_name):
+        if self._state.adding or self.pk is None:
+            return False
+        return self.previous(field_name) != getattr(self, self._tracked_attname(field_name))
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._snapshot_tracked_fields(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._snapshot_tracked_fields(kwargs.get('fields'))
+
+    class Meta:
+        abstract = True
+
+
 class OrganizationRoleMixin:
 
     def get_org_user(self, request, user):
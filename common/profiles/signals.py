@@ -1,6 +1,7 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from .models import PackhouseExporterSetting, PackhouseExporterProfile, OrganizationProfile
+from .utils import invalidate_report_header
 from organizations.models import Organization, OrganizationOwner
 from django.db.models.signals import m2m_changed
 
@@ -31,3 +32,13 @@ def change_name(sender, instance, **kwargs):
             ).update(
                 name=instance.name,
             )
+
+
+def invalidate_organization_report_header(sender, instance, **kwargs):
+    invalidate_report_header(instance.organization_id)
+
+
+# Los perfiles polimórficos envían la señal con su subclase como sender
+for profile_model in (OrganizationProfile, *OrganizationProfile.__subclasses__()):
+    post_save.connect(invalidate_organization_report_header, sender=profile_model)
+    post_delete.connect(invalidate_organization_report_header, sender=profile_model)
@@ -0,0 +1,93 @@
+import base64
+import logging
+import mimetypes
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from .models import OrganizationProfile
+
+logger = logging.getLogger(__name__)
+
+REPORT_HEADER_CACHE_KEY = 'report_header:{organization_id}'
+
+
+def get_report_header_cache_key(organization_id):
+    return REPORT_HEADER_CACHE_KEY.format(organization_id=organization_id)
+
+
+def _location_name(location, default):
+    return location.name if location else f"{default} not specified"
+
+
+def _inline_logo(logo):
+    """
+    Regresa el logo como data URI para que el PDF no dependa de la URL firmada
+    del storage (que además cambia en cada llamada).
+    """
+    if not logo:
+        return None
+    try:
+        with logo.open('rb') as logo_file:
+            content = logo_file.read()
+    except Exception:
+        logger.warning("No se pudo leer el logo %s", logo.name, exc_info=True)
+        return None
+    mime_type = mimetypes.guess_type(logo.name)[0] or 'image/png'
+    return f"data:{mime_type};base64,{base64.b64encode(content).decode('ascii')}"
+
+
+def build_report_header(organization_id):
+    if not organization_id:
+        return {'name': '', 'address': '', 'logo_url': None}
+    profile = (
+        OrganizationProfile.objects
+        .non_polymorphic()
+        .select_related('country', 'state', 'city', 'district')
+        .filter(organization_id=organization_id)
+        .first()
+    )
+    if profile is None:
+        return build_report_header(None)
+
+    address = ", ".join([
+        profile.address or '',
+        _location_name(profile.district, "District"),
+        _location_name(profile.city, "City"),
+        _location_name(profile.state, "State"),
+        _location_name(profile.country, "Country"),
+    ])
+    return {
+        'name': profile.name,
+        'address': address,
+        'logo_url': _inline_logo(profile.logo),
+    }
+
+
+def get_report_header(organization_id):
+    """
+    Encabezado de los reportes PDF de la organización: nombre, dirección
+    formateada y logo embebido. Se guarda en cache por organización y se
+    invalida desde signals al cambiar su OrganizationProfile.
+    """
+    cache_key = get_report_header_cache_key(organization_id)
+    header = cache.get(cache_key)
+    if header is None:
+        header = build_report_header(organization_id)
+        cache.set(cache_key, header, settings.REPORT_HEADER_CACHE_TIMEOUT)
+    return header
+
+
+def get_request_report_header(request):
+    """
+    Encabezado de la organización del request (resuelta por subdominio); 404 si
+    el request no tiene organización.
+    """
+    organization = getattr(request, 'organization', None)
+    if organization is None:
+        raise Http404
+    return get_report_header(organization.id)
+
+
+def invalidate_report_header(organization_id):
+    if organization_id:
+        cache.delete(get_report_header_cache_key(organization_id))
@@ -0,0 +1,286 @@
+import base64
+import datetime
+import hashlib
+import json
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.utils.module_loading import import_string
+from shapely.geometry import shape, Polygon as ShapelyPolygon, MultiPolygon as ShapelyMultiPolygon
+
+logger = logging.getLogger(__name__)
+
+IMAGERY_CACHE_KEY = 'eudr_thumbnail:{geometry}:{periods}:{product}:{dimensions}'
+
+# Al fallar getThumbURL por tamaño se reintenta con una dimensión menor
+THUMBNAIL_MAX_DIMENSIONS = 2600
+THUMBNAIL_MIN_DIMENSIONS = 100
+THUMBNAIL_DIMENSIONS_STEP = 200
+
+NDVI_PALETTE = ['red', 'orange', 'yellow', 'green', 'darkgreen']
+NDVI_DIFFERENCE_PALETTE = ['#d7191c ', '#fdae61', '#fcfbbf', '#43a2ca', '#0868ac']
+RGB_BANDS = ['B4', 'B3', 'B2']
+
+# product: 'ndvi', 'rgb' o 'ndvi_difference'; periods: ((inicio, fin), ...) como fechas ISO,
+# ambas incluidas. ndvi_difference usa dos periodos: base y actual
+ImageryRequest = namedtuple('ImageryRequest', ['product', 'bbox', 'periods', 'dimensions'])
+# Sólo la imagen: las URLs de getThumbURL caducan y no se guardan ni se entregan
+Thumbnail = namedtuple('Thumbnail', ['content', 'content_type'])
+
+
+def _iso_date(value):
+    return value.date().isoformat() if isinstance(value, datetime.datetime) else value.isoformat()
+
+
+def _next_day(iso_date):
+    return (datetime.date.fromisoformat(iso_date) + datetime.timedelta(days=1)).isoformat()
+
+
+def thumbnail_data_url(thumbnail):
+    """
+    Data URL con el contenido del thumbnail, para usarla como src de una imagen.
+    """
+    return f'data:{thumbnail.content_type};base64,{base64.b64encode(thumbnail.content).decode("ascii")}'
+
+
+def imagery_request(product, bbox, *periods, dimensions=THUMBNAIL_MAX_DIMENSIONS):
+    """
+    Construye un ImageryRequest normalizando los periodos a fechas, para que
+    peticiones del mismo día compartan la entrada en cache.
+    """
+    return ImageryRequest(
+        product=product,
+        bbox=tuple(bbox),
+        periods=tuple((_iso_date(start), _iso_date(end)) for start, end in periods),
+        dimensions=dimensions,
+    )
+
+
+def get_imagery_cache_key(request):
+    geometry = hashlib.sha256(json.dumps(request.bbox).encode('utf-8')).hexdigest()
+    return IMAGERY_CACHE_KEY.format(
+        geometry=geometry,
+        periods=','.join(f'{start}/{end}' for start, end in request.periods),
+        product=request.product,
+        dimensions=request.dimensions,
+    )
+
+
+class EarthEngineBackend:
+    """
+    Backend real: arma las imágenes de Sentinel-2 con la librería ee y regresa
+    la URL del thumbnail. `transport` es None para usar el transporte HTTP real.
+    """
+    transport = None
+
+    def __init__(self):
+        import ee
+        self.ee = ee
+
+    def median_image(self, region, start, end):
+        # filterDate excluye el fin: se consulta hasta el día siguiente para incluir el día completo
+        return (
+            self.ee.ImageCollection('COPERNICUS/S2_SR')
+            .filterBounds(region)
+            .filterDate(start, _next_day(end))
+            .filterMetadata('CLOUDY_PIXEL_PERCENTAGE', 'less_than', 12)
+            .sort('CLOUD_COVER', True)
+            .median()
+            .clip(region)
+        )
+
+    def ndvi(self, region, start, end, name='NDVI'):
+        return self.median_image(region, start, end).normalizedDifference(['B8', 'B4']).rename(name)
+
+    def build_image(self, request):
+        region = self.ee.Geometry.Rectangle(*request.bbox)
+        if request.product == 'rgb':
+            (start, end), = request.periods
+            return self.median_image(region, start, end).select(RGB_BANDS), region
+        if request.product == 'ndvi':
+            (start, end), = request.periods
+            return self.ndvi(region, start, end), region
+        if request.product == 'ndvi_difference':
+            (past_start, past_end), (current_start, current_end) = request.periods
+            past_ndvi = self.ndvi(region, past_start, past_end, 'PAST_NDVI')
+            current_ndvi = self.ndvi(region, current_start, current_end, 'CURRENT_NDVI')
+            return current_ndvi.subtract(past_ndvi).rename('NDVI'), region
+        raise ValueError(f"Unknown imagery product: {request.product}")
+
+    def visualize(self, request, image, region):
+        # Los rangos se calculan una sola vez, no en cada reintento de dimensión
+        image_stats = image.reduceRegion(self.ee.Reducer.minMax(), region, scale=10)
+        if request.product == 'rgb':
+            minimum = self.ee.List([image_stats.get(f'{band}_min') for band in RGB_BANDS]).reduce(self.ee.Reducer.min())
+            maximum = self.ee.List([image_stats.get(f'{band}_max') for band in RGB_BANDS]).reduce(self.ee.Reducer.max())
+            return image.visualize(min=minimum, max=maximum, bands=RGB_BANDS), {'min': 1, 'max': 100}
+        stats = image_stats.getInfo()
+        palette = NDVI_DIFFERENCE_PALETTE if request.product == 'ndvi_difference' else NDVI_PALETTE
+        return image.visualize(min=stats['NDVI_min'], max=stats['NDVI_max'], palette=palette), {'min': 1, 'max': 300}
+
+    def thumbnail_url(self, request):
+        image, region = self.build_image(request)
+        visualized, params = self.visualize(request, image, region)
+        for dimensions in range(request.dimensions, THUMBNAIL_MIN_DIMENSIONS, -THUMBNAIL_DIMENSIONS_STEP):
+            try:
+                return visualized.getThumbURL({**params, 'dimensions': dimensions, 'region': region})
+            except self.ee.EEException as e:
+                logger.info("getThumbURL failed at %s px, retrying smaller: %s", dimensions, e)
+        raise ValidationError("Error al obtener la imagen de Earth Engine")
+
+    def ndvi_difference_areas(self, request, geom, threshold):
+        """
+        Vectoriza las áreas de la diferencia de NDVI (producto 'ndvi_difference')
+        menores o iguales a threshold dentro de geom. Regresa el WKT del
+        MultiPolygon, o None si no hay áreas.
+        """
+        ndvi_difference, region = self.build_image(request)
+        ee_geom = self.ee.Geometry.MultiPolygon(geom.coords)
+
+        # Calculate degradation difference and connected components
+        degradation_areas = ndvi_difference.lte(threshold).connectedComponents(self.ee.Kernel.plus(1), 256)
+        vectorized_polygons = degradation_areas.clip(region).reduceToVectors(
+            geometryType='polygon',
+            eightConnected=False,
+            labelProperty='label',
+            reducer=self.ee.Reducer.max(),
+            scale=10
+        )
+        filtered_polygons = vectorized_polygons.filter(self.ee.Filter.gte('max', 1))
+
+        # Clip the polygons to the specified geom with an error margin
+        clipped_polygons = filtered_polygons.map(
+            lambda feature: feature.intersection(ee_geom, self.ee.ErrorMargin(1))
+        )
+        clipping_geom = shape(ee_geom.getInfo())
+
+        geometries = []
+        for feature in self.ee.FeatureCollection(clipped_polygons).getInfo()['features']:
+            feat = shape(feature['geometry'])
+            if isinstance(feat, ShapelyPolygon):
+                if not feat.equals(clipping_geom):
+                    geometries.append(feat)
+            elif isinstance(feat, ShapelyMultiPolygon):
+                if not feat.equals(clipping_geom):
+                    geometries.extend(feat.geoms)
+            else:
+                logger.warning("Unsupported geometry type: %s", feature['geometry']['type'])
+
+        return ShapelyMultiPolygon(geometries).wkt if geometries else None
+
+
+class FakeEarthEngineBackend:
+    """
+    Backend local sin Earth Engine ni red, para pruebas y desarrollo: la URL
+    codifica la petición y el transporte responde un PNG de 1x1.
+    """
+    PNG = base64.b64decode(
+        'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+    )
+
+    def __init__(self):
+        self.requests = []
+        self.transport = httpx.MockTransport(
+            lambda http_request: httpx.Response(200, content=self.PNG, headers={'Content-Type': 'image/png'})
+        )
+
+    @staticmethod
+    def url_for(request):
+        return f'https://earthengine.local/thumbnails/{get_imagery_cache_key(request).replace(":", "/")}'
+
+    def thumbnail_url(self, request):
+        self.requests.append(request)
+        return self.url_for(request)
+
+    def ndvi_difference_areas(self, request, geom, threshold):
+        # Sin Earth Engine no hay áreas degradadas que vectorizar
+        self.requests.append(request)
+        return None
+
+
+class ImageryFetcher:
+    """
+    Descarga thumbnails de Earth Engine en paralelo (un ThreadPoolExecutor y un
+    httpx.Client con pool de conexiones compartidos) y los guarda en cache por
+    (geometría, periodos, producto, dimensión). Sólo se guarda el contenido, y
+    no si pasa de EE_IMAGERY_CACHE_MAX_BYTES.
+    """
+
+    def __init__(self, backend=None, max_workers=None, timeout=None):
+        self.backend = backend or import_string(settings.EE_IMAGERY_BACKEND)()
+        max_workers = max_workers or settings.EE_IMAGERY_MAX_WORKERS
+        self.client = httpx.Client(
+            transport=self.backend.transport,
+            timeout=timeout or settings.EE_IMAGERY_TIMEOUT,
+            limits=httpx.Limits(max_connections=max_workers, max_keepalive_connections=max_workers),
+        )
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='eudr-imagery')
+
+    def _fetch(self, request):
+        url = self.backend.thumbnail_url(request)
+        response = self.client.get(url)
+        if response.status_code != 200:
+            raise ValidationError("Error al obtener la imagen de Earth Engine")
+        return Thumbnail(content=response.content, content_type=response.headers.get('Content-Type', 'image/png'))
+
+    def submit(self, request):
+        """
+        Regresa un Future con el Thumbnail; si está en cache el Future ya está resuelto.
+        """
+        return self.submit_many([request])[0]
+
+    def submit_many(self, requests):
+        cached = cache.get_many([get_imagery_cache_key(request) for request in requests])
+        futures = []
+        for request in requests:
+            cache_key = get_imagery_cache_key(request)
+            if cache_key in cached:
+                future = Future()
+                future.set_result(cached[cache_key])
+            else:
+                future = self.executor.submit(self._fetch_and_cache, request, cache_key)
+            futures.append(future)
+        return futures
+
+    def _fetch_and_cache(self, request, cache_key):
+        thumbnail = self._fetch(request)
+        if len(thumbnail.content) <= settings.EE_IMAGERY_CACHE_MAX_BYTES:
+            cache.set(cache_key, thumbnail, settings.EE_IMAGERY_CACHE_TIMEOUT)
+        else:
+            logger.info("Thumbnail %s not cached: %s bytes", cache_key, len(thumbnail.content))
+        return thumbnail
+
+    def fetch(self, request):
+        return self.submit(request).result()
+
+    def fetch_many(self, requests):
+        """
+        Descarga varias imágenes a la vez; regresa los Thumbnail en el mismo orden.
+        """
+        return [future.result() for future in self.submit_many(requests)]
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.client.close()
+
+
+_fetcher_lock = threading.Lock()
+_fetcher = None
+
+
+def get_imagery_fetcher():
+    """
+    Fetcher compartido del proceso (se crea la primera vez con el backend de
+    EE_IMAGERY_BACKEND).
+    """
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = ImageryFetcher()
+    return _fetcher
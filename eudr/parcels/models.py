@@ -1,14 +1,14 @@
-import os
 import json
 import uuid
 from django.conf import settings
 from django.contrib.gis.db import models
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.dispatch import receiver
 from django.db.models.signals import post_save, pre_save
-from .utils import (uuid_file_path, validate_geom_vector_file, fix_format, fix_crs, to_polygon,
-                    to_multipolygon, get_geom_from_file)
+from .utils import uuid_file_path, validate_geom_vector_file, ingest_geom_file, remove_geom_file
 from django.contrib.gis.geos import GEOSGeometry
+from common.base.sequences import allocate_ooid
 from common.profiles.models import ProducerProfile
 from cities_light.models import City, Region, Country, SubRegion
 
@@ -49,11 +49,11 @@ class Parcel(models.Model):
         if self.pk is None and bool(self.file) == bool(self.geom):
             raise ValidationError("Must provide either a file or a geometry. Not both or none.")
 
-        if not self.ooid:
-            # Obtener el último pseudo_id del mismo producer
-            last_ooid = Parcel.objects.filter(producer=self.producer).aggregate(models.Max('ooid'))[
-                'ooid__max']
-            self.ooid = (last_ooid or 0) + 1
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if not self.ooid:
+                self.ooid = allocate_ooid(Parcel, producer_id=self.producer_id)
+            super().save(*args, **kwargs)
 
     @receiver(post_save, sender='parcels.Parcel')
     def set_geom_from_file(sender, instance, created, **kwargs):
@@ -67,25 +67,15 @@ class Parcel(models.Model):
 
         try:
             if instance.file and not instance.save_due_to_update_geom:
-                fix_format(instance)
-                fix_crs(instance)
-                to_polygon(instance)
-                to_multipolygon(instance)
-
-                instance.geom = get_geom_from_file(instance)
-                buffer_extent = GEOSGeometry(instance.geom).buffer(0.002)
+                instance.geom = GEOSGeometry(ingest_geom_file(instance), srid=settings.EUDR_DATA_FEATURES_SRID)
+                buffer_extent = instance.geom.buffer(0.002)
                 instance.buffer_extent = str(list(buffer_extent.extent))
-                print("instance.geom", instance.geom)
                 instance.save_due_to_update_geom = True
-                instance.save()
-            else:
-                print("instance.save_due_to_update_geom", instance.save_due_to_update_geom)
+                instance.save(update_fields=['file', 'geom', 'buffer_extent'])
 
         except Exception as e:
-            instance.file.close()
+            remove_geom_file(instance)
             instance.delete_due_to_exception = True
-            if os.path.exists(instance.file.path):
-                os.remove(instance.file.path)
             raise ValidationError(e)
 
     class Meta:
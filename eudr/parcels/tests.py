@@ -1,3 +1,102 @@
-from django.test import TestCase
+import datetime
+import time
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from eudr.imagery import FakeEarthEngineBackend, ImageryFetcher, get_imagery_cache_key, imagery_request
+from . import gee
+
+BBOX = [-102.4284588567301, 19.39364355991117, -102.40229546836717, 19.418225860404355]
+TODAY = datetime.date(2025, 3, 1)
+THUMBNAIL_DIMENSIONS = [100, 300, 500, 700, 900, 1100]
+
+
+class SlowFirstEarthEngineBackend(FakeEarthEngineBackend):
+    """
+    Las primeras peticiones tardan más, para que terminen después de las últimas.
+    Cada imagen es la URL que se pidió, para saber a qué petición corresponde.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.transport = httpx.MockTransport(
+            lambda http_request: httpx.Response(200, content=self.content_for(http_request.url),
+                                                headers={'Content-Type': 'image/png'})
+        )
+
+    @staticmethod
+    def content_for(url):
+        return str(url).encode('utf-8')
+
+    def expected_content(self, request):
+        return self.content_for(httpx.URL(self.url_for(request)))
+
+    def thumbnail_url(self, request):
+        time.sleep(max(THUMBNAIL_DIMENSIONS[-1] - request.dimensions, 0) / 10000)
+        return super().thumbnail_url(request)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ImageryFetcherTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.backend = SlowFirstEarthEngineBackend()
+        self.fetcher = ImageryFetcher(backend=self.backend, max_workers=4, timeout=5)
+        self.addCleanup(self.fetcher.close)
+
+    def build_requests(self):
+        return [
+            imagery_request('ndvi', BBOX, (TODAY - datetime.timedelta(days=20), TODAY), dimensions=dimensions)
+            for dimensions in THUMBNAIL_DIMENSIONS
+        ]
+
+    def test_fetch_many_keeps_request_order(self):
+        requests = self.build_requests()
+        thumbnails = self.fetcher.fetch_many(requests)
+
+        self.assertEqual(len(thumbnails), len(requests))
+        for request, thumbnail in zip(requests, thumbnails):
+            self.assertEqual(thumbnail.content, self.backend.expected_content(request))
+            self.assertEqual(thumbnail.content_type, 'image/png')
+            # En cache sólo queda la imagen, no la URL de Earth Engine
+            self.assertEqual(cache.get(get_imagery_cache_key(request)), thumbnail)
+
+    def test_cached_thumbnails_skip_the_backend(self):
+        requests = self.build_requests()
+        first = self.fetcher.fetch_many(requests)
+        self.assertEqual(len(self.backend.requests), len(requests))
+
+        # Mismo día con otra hora: misma entrada en cache
+        same_day = imagery_request(
+            'ndvi', BBOX,
+            (datetime.datetime.combine(TODAY - datetime.timedelta(days=20), datetime.time(8)),
+             datetime.datetime.combine(TODAY, datetime.time(17))),
+            dimensions=THUMBNAIL_DIMENSIONS[0],
+        )
+        second = self.fetcher.fetch_many(requests + [same_day])
+
+        self.assertEqual(second, first + [first[0]])
+        self.assertEqual(len(self.backend.requests), len(requests))
+        self.assertTrue(self.fetcher.submit(requests[0]).done())
+
+    def test_thumbnails_over_the_size_limit_are_not_cached(self):
+        request, = self.build_requests()[:1]
+        with override_settings(EE_IMAGERY_CACHE_MAX_BYTES=len(self.backend.expected_content(request)) - 1):
+            self.fetcher.fetch(request)
+            self.fetcher.fetch(request)
+
+        self.assertIsNone(cache.get(get_imagery_cache_key(request)))
+        self.assertEqual(self.backend.requests, [request, request])
+
+    def test_ndvi_difference_uses_the_configured_backend(self):
+        with mock.patch.object(gee, 'get_imagery_fetcher', return_value=self.fetcher):
+            thumbnail, difference_vectors = gee.get_ndvi_difference_image(BBOX, geom=None)
+
+        self.assertEqual(thumbnail.content, self.backend.expected_content(self.backend.requests[0]))
+        self.assertIsNone(difference_vectors)
+        self.assertEqual([request.product for request in self.backend.requests],
+                         ['ndvi_difference', 'ndvi_difference'])
@@ -7,6 +7,7 @@ from django.conf import settings
 import os
 from shapely.geometry import shape
 from functools import wraps
+from contextlib import contextmanager
 from fiona.io import ZipMemoryFile
 from django.core.files.storage import default_storage
 from fiona.io import MemoryFile
@@ -58,196 +59,102 @@ def validate_geom_vector_file(value):
         raise ValidationError(f"El archivo no es un archivo espacial válido: {ex}")
 
 
-def to_multipolygon(instance):
-    try:
-        file_content = default_storage.open(instance.file.name).read()
-
+@contextmanager
+def open_geom_collection(file_content, file_extension):
+    """
+    Abre en memoria la colección de features del archivo subido, sin importar
+    su formato (gpkg, geojson, shp en zip, kml o kmz).
+    """
+    if file_extension in ['zip', 'kmz']:
+        open_kwargs = {'driver': 'LIBKML'} if file_extension == 'kmz' else {}
+        with ZipMemoryFile(file_content) as memfile:
+            layers = memfile.listlayers()
+            with memfile.open(layer=layers[0], **open_kwargs) as src:
+                yield src
+    elif file_extension == 'kml':
+        with fiona.BytesCollection(file_content, driver='LIBKML') as src:
+            yield src
+    elif file_extension in ['gpkg', 'geojson', 'shp']:
         with fiona.BytesCollection(file_content) as src:
-            schema = src.schema.copy()
-            schema['geometry'] = 'MultiPolygon'
-
-            with MemoryFile() as memfile:
-                with memfile.open(
-                    mode="w",
-                    driver=src.driver,
-                    schema=schema,
-                    crs=src.crs
-                ) as dst:
-                    single_feature = {
-                        'type': 'Feature',
-                        'properties': {},
-                        'geometry': {
-                            'type': 'MultiPolygon',
-                            'coordinates': []
-                        }
-                    }
-                    for index, feature in enumerate(src):
-                        if index == 0:
-                            single_feature['properties'] = feature['properties']
-                        if feature['geometry']['type'] == 'Polygon':
-                            single_feature['geometry']['coordinates'].append(feature['geometry']['coordinates'])
-                        else:
-                            raise ValidationError("Geometría inválida")
-                    if len(single_feature['geometry']['coordinates']) == 0:
-                        raise ValidationError("No se encontraron polígonos")
-                    else:
-                        dst.write(single_feature)
+            yield src
+    else:
+        raise ValidationError(f"formato inválido: {file_extension}")
+
+
+def ingest_geom_file(instance):
+    """
+    Procesa el archivo vectorial de la instancia en una sola pasada: lo lee una
+    vez del storage, reproyecta a EUDR_DATA_FEATURES_SRID, separa los
+    MultiPolygon en polígonos y los une en un único MultiPolygon, todo en
+    memoria. Sólo se guarda el artefacto final (GPKG) en el storage y se
+    reemplaza el archivo original en instance.file; el modelo no se guarda
+    aquí, el llamador decide cuándo hacerlo.
+
+    Regresa el WKT del MultiPolygon resultante.
+    """
+    original_name = instance.file.name
+    file_extension = original_name.split('.')[-1].lower()
+    crs_dst = from_epsg(settings.EUDR_DATA_FEATURES_SRID)
 
-                generated_file = memfile.read()
-                new_file_path = default_storage.get_available_name(instance.file.name)
-                default_storage.save(new_file_path, ContentFile(generated_file))
-
-                instance.file.name = new_file_path
-
-    except fiona.errors.DriverError as e:
-        raise ValidationError("Error al abrir el archivo con Fiona: {}".format(str(e)))
-    except Exception as e:
-        raise ValidationError("Error al procesar el archivo: {}".format(str(e)))
-
-
-def to_polygon(instance):
     try:
-        file_content = default_storage.open(instance.file.name).read()
+        with default_storage.open(original_name) as stored_file:
+            file_content = stored_file.read()
 
-        with fiona.BytesCollection(file_content) as src:
+        polygons = []
+        properties = None
+        with open_geom_collection(file_content, file_extension) as src:
             schema = src.schema.copy()
-            schema['geometry'] = 'Polygon'
-
-            with MemoryFile() as memfile:
-                with memfile.open(
-                    mode="w",
-                    driver=src.driver,
-                    schema=schema,
-                    crs=src.crs
-                ) as dst:
-                    for feature in src:
-                        if feature['geometry']['type'] == 'Polygon':
-                            dst.write(feature)
-                        elif feature['geometry']['type'] == 'MultiPolygon':
-                            for coordinates in feature['geometry']['coordinates']:
-                                dst.write({
-                                    'type': 'Feature',
-                                    'properties': feature['properties'],
-                                    'geometry': {
-                                        'type': 'Polygon',
-                                        'coordinates': coordinates
-                                    }
-                                })
-                        else:
-                            raise ValidationError("Geometría inválida")
+            for feature in src:
+                geometry = transform_geom(src.crs, crs_dst, feature['geometry'])
+                if properties is None:
+                    properties = dict(feature['properties'])
+                if geometry['type'] == 'Polygon':
+                    polygons.append(geometry['coordinates'])
+                elif geometry['type'] == 'MultiPolygon':
+                    polygons.extend(geometry['coordinates'])
+                else:
+                    raise ValidationError("Geometría inválida")
 
-                generated_file = memfile.read()
-                new_file_path = default_storage.get_available_name(instance.file.name)
-                default_storage.save(new_file_path, ContentFile(generated_file))
+        if not polygons:
+            raise ValidationError("No se encontraron polígonos")
 
-                print("polygon new_file_path", new_file_path)
+        multipolygon = {'type': 'MultiPolygon', 'coordinates': polygons}
+        schema['geometry'] = 'MultiPolygon'
 
-                instance.file.name = new_file_path
+        with MemoryFile() as memfile:
+            with memfile.open(driver="GPKG", schema=schema, crs=crs_dst) as dst:
+                dst.write({
+                    'type': 'Feature',
+                    'properties': properties,
+                    'geometry': multipolygon,
+                })
+            generated_file = memfile.read()
 
     except fiona.errors.DriverError as e:
-        raise ValidationError("to_polygon() fiona DriverError: {}".format(str(e)))
-    except Exception as e:
-        raise ValidationError("to_polygon() Error al procesar el archivo: {}".format(str(e)))
-
-
-def fix_format(instance):
-    try:
-        file_content = default_storage.open(instance.file.name).read()
-        file_extension = instance.file.name.split('.')[-1].lower()
-
-        # Si ya está en un formato válido, no hagas nada
-        if file_extension in ['gpkg', 'geojson', 'zip', 'shp']:
-            print(f"Archivo ya está en formato válido: {file_extension}")
-            return
-
-        elif file_extension == 'kml':
-            with fiona.BytesCollection(file_content, driver='LIBKML') as src:
-                with MemoryFile() as memfile:
-                    with memfile.open(
-                        driver="GPKG",
-                        schema=src.schema,
-                        crs=src.crs
-                    ) as dst:
-                        for feature in src:
-                            dst.write(feature)
-
-                    generated_file = memfile.read()
-                    new_file_path = default_storage.get_available_name(instance.file.name.replace('.kml', '.gpkg'))
-                    default_storage.save(new_file_path, ContentFile(generated_file))
-                    instance.file.name = new_file_path
-
-        elif file_extension == 'kmz':
-            with ZipMemoryFile(file_content) as src:
-                layers = src.listlayers()
-                layer = src.open(layer=layers[0], driver='LIBKML')
-
-                with MemoryFile() as memfile:
-                    with memfile.open(
-                        driver="GPKG",
-                        schema=layer.schema,
-                        crs=layer.crs
-                    ) as dst:
-                        for feature in layer:
-                            dst.write(feature)
-
-                    generated_file = memfile.read()
-                    new_file_path = default_storage.get_available_name(instance.file.name.replace('.kmz', '.gpkg'))
-                    default_storage.save(new_file_path, ContentFile(generated_file))
-                    instance.file.name = new_file_path
-
-        else:
-            raise ValidationError(f"formato inválido: {file_extension}")
-
+        raise ValidationError("ingest_geom_file() fiona DriverError: {}".format(str(e)))
+    except ValidationError:
+        raise
     except Exception as e:
-        raise ValidationError(f"fix_format Error al procesar el formato: {str(e)}")
-
-
-
-def fix_crs(instance):
-    try:
-        file_content = default_storage.open(instance.file.name).read()
+        raise ValidationError("ingest_geom_file() Error al procesar el archivo: {}".format(str(e)))
 
-        with fiona.BytesCollection(file_content) as src:
-            crs_dst = from_epsg(settings.EUDR_DATA_FEATURES_SRID)
-
-            with MemoryFile() as memfile:
-                with memfile.open(
-                    mode="w",
-                    driver=src.driver,
-                    schema=src.schema.copy(),
-                    crs=crs_dst
-                ) as dst:
-                    for feature in src:
-                        geometry = feature['geometry']
-                        reprojected_geometry = transform_geom(src.crs, crs_dst, geometry)
-                        feature['geometry'] = reprojected_geometry
-                        dst.write(feature)
-
-                generated_file = memfile.read()
-                new_file_path = default_storage.get_available_name(instance.file.name)
-                default_storage.save(new_file_path, ContentFile(generated_file))
-
-                instance.file.name = new_file_path
-
-    except fiona.errors.DriverError as e:
-        raise ValidationError("fix_crs() fiona DriverError: {}".format(str(e)))
-    except Exception as e:
-        raise ValidationError("fix_crs() Error al procesar el archivo: {}".format(str(e)))
+    final_name = default_storage.save(f"{os.path.splitext(original_name)[0]}.gpkg", ContentFile(generated_file))
+    if final_name != original_name:
+        default_storage.delete(original_name)
+    instance.file.name = final_name
 
+    return shape(multipolygon).wkt
 
-def get_geom_from_file(instance):
-    try:
-        file_content = default_storage.open(instance.file.name).read()
 
-        with fiona.BytesCollection(file_content) as src:
-            for feature in src:
-                fiona_geometry = feature['geometry']
-                shapely_geometry = shape(fiona_geometry)
-                wkt_representation = shapely_geometry.wkt
-                print("wkt_representation", wkt_representation)
-                return wkt_representation
-    except Exception as e:
-        raise ValidationError("Error al leer archivo: {}".format(str(e)))
+def remove_geom_file(instance):
+    """
+    Elimina del storage el archivo de la instancia cuando su procesamiento
+    falla.
+    """
+    if not instance.file:
+        return
+    instance.file.close()
+    if default_storage.exists(instance.file.name):
+        default_storage.delete(instance.file.name)
 
 
 def uuid_file_path(instance, filename):
@@ -273,15 +180,3 @@ def set_year_path(path):
         return wrapper
 
     return decorator
-
-def test_open_file(instance):
-    try:
-        file_content = default_storage.open(instance.file.name).read()
-        with fiona.BytesCollection(file_content) as src:
-            print('Número de features:', len(src))
-    except Exception as e:
-        print('Error abriendo archivo con Fiona:', e)
-
-
-
-
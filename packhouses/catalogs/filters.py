@@ -8,6 +8,7 @@ from .models import (Product, ProductVariety, Market, ProductHarvestSizeKind, Pr
                      ProductKindCountryStandardPackaging
                      )
 from common.base.models import ProductKind, SupplyKind
+from common.base.filters import CachedLookupFilter
 from django.utils.translation import gettext_lazy as _
 
 
@@ -28,271 +29,172 @@ class ProductKindForPackagingFilter(admin.SimpleListFilter):
         return queryset
 
 
-class ByProductForOrganizationFilter(admin.SimpleListFilter):
+class ByProductForOrganizationFilter(CachedLookupFilter):
     title = _('Product')
     parameter_name = 'product'
-
-    def lookups(self, request, model_admin):
-        products = Product.objects.none()
-        if hasattr(request, 'organization'):
-            products = Product.objects.filter(organization=request.organization)
-        return [(product.id, product.name) for product in products]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(product__id=self.value())
-        return queryset
+    lookup_model = Product
+    filter_field = 'product__id'
+    invalidate_on = (Product,)
 
 
 class ByProductForOrganizationProductSizeFilter(ByProductForOrganizationFilter):
-    def lookups(self, request, model_admin):
-        products = Product.objects.none()
-        if hasattr(request, 'organization'):
-            productsize_relatedlist = list(ProductSize.objects.filter(product__organization=request.organization).values_list('product', flat=True).distinct())
-            products = Product.objects.filter(id__in=productsize_relatedlist).order_by('name')
-        return [(product.id, product.name) for product in products]
+    lookup_model = None
+    lookup_field = 'product'
+    filter_field = None
+    organization_field = 'product__organization'
+    invalidate_on = (ProductSize, Product)
 
 
-class ByProductSizeForOrganizationFilter(admin.SimpleListFilter):
+class ByProductSizeForOrganizationFilter(CachedLookupFilter):
     title = _('Product size')
     parameter_name = 'product_size'
-
-    def lookups(self, request, model_admin):
-        product_size_relatedlist = ProductSize.objects.filter(organization=request.organization)
-        return [(product_size.id, product_size.name) for product_size in product_size_relatedlist]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(product_size__id=self.value())
-        return queryset
+    lookup_model = ProductSize
+    filter_field = 'product_size__id'
+    organization_field = 'product__organization'
+    invalidate_on = (ProductSize,)
 
 
 class ByProductSizeForOrganizationSizePackagingFilter(ByProductSizeForOrganizationFilter):
-    def lookups(self, request, model_admin):
-        product_sizes = ProductSize.objects.none()
-        if hasattr(request, 'organization'):
-            product_size_relatedlist = list(SizePackaging.objects.filter(organization=request.organization).values_list('product_size', flat=True).distinct())
-            product_sizes = ProductSize.objects.filter(id__in=product_size_relatedlist).order_by('name')
-        return [(product_size.id, f"{product_size.name} ({product_size.product.name}: {product_size.market.alias})") for product_size in product_sizes]
+    lookup_model = None
+    lookup_field = 'product_size'
+    filter_field = None
+    organization_field = 'organization'
+    label_fields = ('name', 'product__name', 'market__alias')
+    label_template = '{0} ({1}: {2})'
+    invalidate_on = (SizePackaging, ProductSize, Product, Market)
 
 
-class ByProductSizeForProductOrganizationFilter(admin.SimpleListFilter):
+class ByProductSizeForProductOrganizationFilter(CachedLookupFilter):
     title = _('Product Size')
     parameter_name = 'product_size'
+    lookup_model = ProductSize
+    filter_field = 'product_size__id'
+    organization_field = 'product__organization'
+    label_fields = ('name', 'product__name', 'market__alias')
+    label_template = '{0} ({1}: {2})'
+    invalidate_on = (ProductSize, Product, Market)
 
-    def lookups(self, request, model_admin):
-        product_sizes = ProductSize.objects.filter(product__organization=request.organization)
-        return [(product_size.id, f"{product_size.name} ({product_size.product.name}: {product_size.market.alias})") for product_size in product_sizes]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(product_size__id=self.value())
-        return queryset
 
-
-class ByPackagingForOrganizationFilter(admin.SimpleListFilter):
+class ByPackagingForOrganizationFilter(CachedLookupFilter):
     title = _('Packaging')
     parameter_name = 'packaging'
-
-    def lookups(self, request, model_admin):
-        packagings = ProductPackaging.objects.filter(organization=request.organization)
-        return [(packaging.id, packaging.name) for packaging in packagings]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(packaging__id=self.value())
-        return queryset
+    lookup_model = ProductPackaging
+    filter_field = 'packaging__id'
+    invalidate_on = (ProductPackaging,)
 
 
-class ByPackagingForOrganizationSizePackagingFilter(admin.SimpleListFilter):
+class ByPackagingForOrganizationSizePackagingFilter(CachedLookupFilter):
     title = _('Product Packaging')
     parameter_name = 'product_packaging'
+    lookup_field = 'product_packaging'
+    label_fields = ('name', 'country_standard_packaging__standard__name', 'country_standard_packaging__name')
+    lookup_ordering = ('name', 'country_standard_packaging__standard__name', 'country_standard_packaging__name')
+    invalidate_on = (SizePackaging, ProductPackaging, ProductKindCountryStandardPackaging)
 
-    def lookups(self, request, model_admin):
-        packagings = ProductPackaging.objects.none()
-        if hasattr(request, 'organization'):
-            packaging_relatedlist = list(
-                SizePackaging.objects.filter(organization=request.organization)
-                .values_list('product_packaging', flat=True)
-                .distinct()
-            )
-            packagings = ProductPackaging.objects.filter(id__in=packaging_relatedlist).order_by('name')
-
-        return [
-            (
-                packaging.id,
-                f"{packaging.name} - ({packaging.country_standard_packaging.standard.name if packaging.country_standard_packaging and packaging.country_standard_packaging.standard and packaging.country_standard_packaging.standard.name else '-'}: {packaging.country_standard_packaging})"
-            )
-            for packaging in packagings
-        ]
+    def get_label(self, value, name, standard_name, country_standard_packaging_name):
+        return f"{name} - ({standard_name or '-'}: {country_standard_packaging_name})"
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(product_packaging_id=self.value())
-        return queryset
 
-
-
-class ByProductPresentationForOrganizationSizePackagingFilter(admin.SimpleListFilter):
+class ByProductPresentationForOrganizationSizePackagingFilter(CachedLookupFilter):
     title = _('Product Presentation')
     parameter_name = 'product_presentation'
+    lookup_field = 'product_presentation'
+    invalidate_on = (SizePackaging, ProductPresentation)
 
-    def lookups(self, request, model_admin):
-        presentations = ProductPresentation.objects.none()
-        if hasattr(request, 'organization'):
-            presentation_ids = list(
-                SizePackaging.objects.filter(organization=request.organization)
-                .values_list('product_presentation', flat=True)
-                .distinct()
-            )
-            presentations = ProductPresentation.objects.filter(id__in=presentation_ids).order_by('name')
 
-        return [(presentation.id, presentation.name) for presentation in presentations]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(product_presentation_id=self.value())
-        return queryset
-
-
-class ByProductVarietiesForOrganizationFilter(admin.SimpleListFilter):
+class ByProductVarietiesForOrganizationFilter(CachedLookupFilter):
     title = _('Variety')
     parameter_name = 'product_varieties'
+    lookup_model = ProductVariety
+    filter_field = 'product_varieties__id'
+    organization_field = 'product__organization'
+    label_fields = ('product__name', 'name')
+    label_template = '{0}: {1}'
+    invalidate_on = (ProductVariety, Product)
 
-    def lookups(self, request, model_admin):
-        product_varietieses = ProductVariety.objects.filter(product__organization=request.organization)
-        return [(product_variety.id, f"{product_variety.product.name}: {product_variety.name}") for product_variety in product_varietieses]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(product_varieties__id=self.value())
-        return queryset
-
-
-class ByProductVarietiesForOrganizationProductSizeFilter(admin.SimpleListFilter):
+class ByProductVarietiesForOrganizationProductSizeFilter(CachedLookupFilter):
     title = _('Variety')
     parameter_name = 'product_variety'
-    
-    def lookups(self, request, model_admin):
-        varieties = ProductVariety.objects.none()
-        if hasattr(request, 'organization'):
-            varieties_ids = ProductSize.objects.filter(
-                product__organization=request.organization
-            ).values_list('varieties', flat=True).distinct()
-            varieties = ProductVariety.objects.filter(id__in=varieties_ids).order_by('name')
-        return [(variety.id, f"{variety.product.name}: {variety.name}") for variety in varieties]
+    lookup_field = 'varieties'
+    organization_field = 'product__organization'
+    label_fields = ('product__name', 'name')
+    label_template = '{0}: {1}'
+    lookup_ordering = ('name', 'product__name')
+    invalidate_on = (ProductSize, ProductVariety, Product)
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(varieties__id=self.value())
-        return queryset
 
-
-class ByProductVarietyForOrganizationFilter(admin.SimpleListFilter):
+class ByProductVarietyForOrganizationFilter(CachedLookupFilter):
     title = _('Product Variety')
     parameter_name = 'product_variety'
+    lookup_model = ProductVariety
+    filter_field = 'product_variety__id'
+    organization_field = 'product__organization'
+    label_fields = ('product__name', 'name')
+    label_template = '{0}: {1}'
+    invalidate_on = (ProductVariety, Product)
 
-    def lookups(self, request, model_admin):
-        product_varieties = ProductVariety.objects.filter(product__organization=request.organization)
-        return [(product_variety.id, f"{product_variety.product.name}: {product_variety.name}") for product_variety in product_varieties]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(product_variety__id=self.value())
-        return queryset
-
-
-class ByMarketForOrganizationFilter(admin.SimpleListFilter):
+class ByMarketForOrganizationFilter(CachedLookupFilter):
     title = _('Market')
     parameter_name = 'markets'
+    lookup_model = Market
+    filter_field = 'market__id'
+    invalidate_on = (Market,)
 
-    def lookups(self, request, model_admin):
-        markets = Market.objects.filter(organization=request.organization)
-        return [(market.id, market.name) for market in markets]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(market__id=self.value())
-        return queryset
 
-class ByMarketsForOrganizationFilter(admin.SimpleListFilter):
+class ByMarketsForOrganizationFilter(CachedLookupFilter):
     title = _('Market')
     parameter_name = 'markets'
-
-    def lookups(self, request, model_admin):
-        markets = Market.objects.filter(organization=request.organization)
-        return [(market.id, market.name) for market in markets]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(markets__id=self.value())
-        return queryset
+    lookup_model = Market
+    filter_field = 'markets__id'
+    invalidate_on = (Market,)
 
 
 class ByMarketForOrganizationProductSizeFilter(ByMarketForOrganizationFilter):
-    def lookups(self, request, model_admin):
-        markets = Product.objects.none()
-        if hasattr(request, 'organization'):
-            productsize_relatedlist = list(ProductSize.objects.filter(product__organization=request.organization).values_list('market', flat=True).distinct())
-            markets = Market.objects.filter(id__in=productsize_relatedlist).order_by('name')
-        return [(market.id, market.name) for market in markets]
+    lookup_model = None
+    lookup_field = 'market'
+    filter_field = None
+    organization_field = 'product__organization'
+    invalidate_on = (ProductSize, Market)
 
 
-class ByClientCapitalFrameworkForOrganizationFilter(admin.SimpleListFilter):
+class ByClientCapitalFrameworkForOrganizationFilter(CachedLookupFilter):
     title = _('Capital framework')
     parameter_name = 'capital_framework'
+    lookup_field = 'capital_framework'
+    label_fields = ('code',)
+    invalidate_on = (Client, CapitalFramework)
 
-    def lookups(self, request, model_admin):
-        clients_capital_frameworks = list(Client.objects.filter(organization=request.organization).values_list('capital_framework', flat=True).distinct())
-        capital_frameworks = CapitalFramework.objects.filter(id__in=clients_capital_frameworks)
-        return [(capital_framework.id, capital_framework.code) for capital_framework in capital_frameworks]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(capital_framework__id=self.value())
-        return queryset
 
-
-class ByPaymentKindForOrganizationFilter(admin.SimpleListFilter):
+class ByPaymentKindForOrganizationFilter(CachedLookupFilter):
     title = _('Payment kind')
     parameter_name = 'payment_kind'
+    lookup_model = PaymentKind
+    filter_field = 'payment_kind__id'
+    invalidate_on = (PaymentKind,)
 
-    def lookups(self, request, model_admin):
-        payment_kinds = PaymentKind.objects.filter(organization=request.organization)
-        return [(payment_kind.id, payment_kind.name) for payment_kind in payment_kinds]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(payment_kind__id=self.value())
-        return queryset
-
-
-class ByProductHarvestSizeKindForOrganizationFilter(admin.SimpleListFilter):
+class ByProductHarvestSizeKindForOrganizationFilter(CachedLookupFilter):
     title = _('Harvest size kind')
     parameter_name = 'product_harvest_size_kind'
+    lookup_model = ProductHarvestSizeKind
+    filter_field = 'product_harvest_size_kind'
+    organization_field = 'product__organization'
+    label_fields = ('product__name', 'name')
+    label_template = '{0}: {1}'
+    invalidate_on = (ProductHarvestSizeKind, Product)
 
-    def lookups(self, request, model_admin):
-        product_harvest_size_kinds = ProductHarvestSizeKind.objects.filter(product__organization=request.organization)
-        return [(product_harvest_size_kind.id, f"{product_harvest_size_kind.product.name}: {product_harvest_size_kind.name}") for product_harvest_size_kind in product_harvest_size_kinds]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(product_harvest_size_kind=self.value())
-        return queryset
-
-
-class ByProductSeasonKindForOrganizationFilter(admin.SimpleListFilter):
+class ByProductSeasonKindForOrganizationFilter(CachedLookupFilter):
     title = _('Phenology')
     parameter_name = 'product_phenology_kind'
-
-    def lookups(self, request, model_admin):
-        product_phenology_kinds = ProductPhenologyKind.objects.filter(product__organization=request.organization)
-        return [(product_phenology_kind.id, f"{product_phenology_kind.product.name}: {product_phenology_kind.name}") for product_phenology_kind in product_phenology_kinds]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(size_kind=self.value())
-        return queryset
+    lookup_model = ProductPhenologyKind
+    filter_field = 'size_kind'
+    organization_field = 'product__organization'
+    label_fields = ('product__name', 'name')
+    label_template = '{0}: {1}'
+    invalidate_on = (ProductPhenologyKind, Product)
 
 
 class StatesForOrganizationCountryFilter(admin.SimpleListFilter):
@@ -313,169 +215,96 @@ class StatesForOrganizationCountryFilter(admin.SimpleListFilter):
         return queryset
 
 
-class ByCountryForOrganizationMarketsFilter(admin.SimpleListFilter):
+class ByCountryForOrganizationMarketsFilter(CachedLookupFilter):
     title = _('Country')
     parameter_name = 'countries'
+    lookup_model = Country
+    filter_field = 'countries__id'
+    organization_field = None
+    invalidate_on = (Market,)
 
-    def lookups(self, request, model_admin):
-        countries = Country.objects.all()
+    def get_lookup_queryset(self, request, model_admin):
+        queryset = super().get_lookup_queryset(request, model_admin)
         if hasattr(request, 'organization'):
-            organization_markets_country_ids = list(
-                Market.objects.filter(organization=request.organization).values_list('countries', flat=True).distinct())
-            countries = countries.filter(id__in=organization_markets_country_ids)
-        return [(country.id, country.name) for country in countries]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(countries__id=self.value())
+            queryset = queryset.filter(market__organization=request.organization)
         return queryset
 
 
-class ByCountryForOrganizationProvidersFilter(admin.SimpleListFilter):
+class ByCountryForOrganizationProvidersFilter(CachedLookupFilter):
     title = _('Country')
     parameter_name = 'country'
+    lookup_field = 'country'
+    invalidate_on = (Provider,)
 
-    def lookups(self, request, model_admin):
-        countries = Country.objects.all()
-        if hasattr(request, 'organization'):
-            organization_providers_country_ids = list(
-                Provider.objects.filter(organization=request.organization).values_list('country', flat=True).distinct())
-            countries = countries.filter(id__in=organization_providers_country_ids).order_by('name')
-        return [(country.id, country.name) for country in countries]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(country__id=self.value())
-        return queryset
 
-
-class ByStateForOrganizationProvidersFilter(admin.SimpleListFilter):
+class ByStateForOrganizationProvidersFilter(CachedLookupFilter):
     title = _('State')
     parameter_name = 'state'
+    lookup_field = 'state'
+    label_fields = ('country__name', 'name')
+    label_template = '{0}: {1}'
+    lookup_ordering = ('country__name', 'name')
+    invalidate_on = (Provider,)
 
-    def lookups(self, request, model_admin):
-        states = Region.objects.all()
-        if hasattr(request, 'organization'):
-            organization_providers_state_ids = list(
-                Provider.objects.filter(organization=request.organization).values_list('state', flat=True).distinct())
-            states = states.filter(id__in=organization_providers_state_ids).order_by('country__name', 'name')
-        return [(state.id, f"{state.country.name}: {state.name}") for state in states]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(state__id=self.value())
-        return queryset
-
-
-class ByCityForOrganizationProvidersFilter(admin.SimpleListFilter):
+class ByCityForOrganizationProvidersFilter(CachedLookupFilter):
     title = _('City')
     parameter_name = 'city'
-
-    def lookups(self, request, model_admin):
-        cities = SubRegion.objects.all()
-        if hasattr(request, 'organization'):
-            organization_providers_city_ids = list(
-                Provider.objects.filter(organization=request.organization).values_list('city', flat=True).distinct())
-            cities = cities.filter(id__in=organization_providers_city_ids).order_by('country__name', 'region__name', 'name')
-        return [(city.id, f"{city.country.name}: {city.region.name}: {city.name}") for city in cities]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(city__id=self.value())
-        return queryset
+    lookup_field = 'city'
+    label_fields = ('country__name', 'region__name', 'name')
+    label_template = '{0}: {1}: {2}'
+    lookup_ordering = ('country__name', 'region__name', 'name')
+    invalidate_on = (Provider,)
 
 
 # Clientes
 
 
-class ByCountryForOrganizationClientsFilter(admin.SimpleListFilter):
+class ByCountryForOrganizationClientsFilter(CachedLookupFilter):
     title = _('Country')
     parameter_name = 'country'
+    lookup_field = 'country'
+    invalidate_on = (Client,)
 
-    def lookups(self, request, model_admin):
-        countries = Country.objects.all()
-        if hasattr(request, 'organization'):
-            country_ids = list(
-                Client.objects.filter(organization=request.organization).values_list('country', flat=True).distinct())
-            countries = countries.filter(id__in=country_ids).order_by('name')
-        return [(country.id, country.name) for country in countries]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(country__id=self.value())
-        return queryset
-
-
-class ByStateForOrganizationClientsFilter(admin.SimpleListFilter):
+class ByStateForOrganizationClientsFilter(CachedLookupFilter):
     title = _('State')
     parameter_name = 'state'
-
-    def lookups(self, request, model_admin):
-        states = Region.objects.all()
-        if hasattr(request, 'organization'):
-            state_ids = list(
-                Client.objects.filter(organization=request.organization).values_list('state', flat=True).distinct())
-            states = states.filter(id__in=state_ids).order_by('country__name', 'name')
-        return [(state.id, f"{state.country.name}: {state.name}") for state in states]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(state__id=self.value())
-        return queryset
+    lookup_field = 'state'
+    label_fields = ('country__name', 'name')
+    label_template = '{0}: {1}'
+    lookup_ordering = ('country__name', 'name')
+    invalidate_on = (Client,)
 
 
-class ByCityForOrganizationClientsFilter(admin.SimpleListFilter):
+class ByCityForOrganizationClientsFilter(CachedLookupFilter):
     title = _('City')
     parameter_name = 'city'
+    lookup_field = 'city'
+    label_fields = ('country__name', 'region__name', 'name')
+    label_template = '{0}: {1}: {2}'
+    lookup_ordering = ('country__name', 'region__name', 'name')
+    invalidate_on = (Client,)
 
-    def lookups(self, request, model_admin):
-        cities = SubRegion.objects.all()
-        if hasattr(request, 'organization'):
-            organization_providers_city_ids = list(
-                Client.objects.filter(organization=request.organization).values_list('city', flat=True).distinct())
-            cities = cities.filter(id__in=organization_providers_city_ids).order_by('country__name', 'region__name', 'name')
-        return [(city.id, f"{city.country.name}: {city.region.name}: {city.name}") for city in cities]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(city__id=self.value())
-        return queryset
 
 # /Clientes
 
 
-class ByStateForOrganizationGathererFilter(admin.SimpleListFilter):
+class ByStateForOrganizationGathererFilter(CachedLookupFilter):
     title = _('State')
     parameter_name = 'state'
+    lookup_field = 'state'
+    invalidate_on = (Gatherer,)
 
-    def lookups(self, request, model_admin):
-        states = Region.objects.all()
-        if hasattr(request, 'organization'):
-            organization_gatherers_state_ids = list(Gatherer.objects.filter(organization=request.organization).values_list('state', flat=True).distinct())
-            states = states.filter(id__in=organization_gatherers_state_ids).order_by('name')
-        return [(state.id, state.name) for state in states]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(state__id=self.value())
-        return queryset
-
-
-class ByCityForOrganizationGathererFilter(admin.SimpleListFilter):
+class ByCityForOrganizationGathererFilter(CachedLookupFilter):
     title = _('City')
     parameter_name = 'city'
-
-    def lookups(self, request, model_admin):
-        cities = SubRegion.objects.all()
-        if hasattr(request, 'organization'):
-            organization_gatherers_city_ids = list(Gatherer.objects.filter(organization=request.organization).values_list('city', flat=True).distinct())
-            cities = cities.filter(id__in=organization_gatherers_city_ids).order_by('region__name', 'name')
-        return [(city.id, f"{city.region.name}: {city.name}") for city in cities]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(city__id=self.value())
-        return queryset
+    lookup_field = 'city'
+    label_fields = ('region__name', 'name')
+    label_template = '{0}: {1}'
+    lookup_ordering = ('region__name', 'name')
+    invalidate_on = (Gatherer,)
 
 
 class ByStateForOrganizationFilter(admin.SimpleListFilter):
@@ -531,297 +360,137 @@ class ByDistrictForOrganizationFilter(admin.SimpleListFilter):
             return queryset.filter(district__id=self.value())
         return queryset
 
-class ByStateForOrganizationMaquiladoraFilter(admin.SimpleListFilter):
+class ByStateForOrganizationMaquiladoraFilter(CachedLookupFilter):
     title = _('State')
     parameter_name = 'state'
+    lookup_field = 'state'
+    invalidate_on = (Maquiladora,)
 
-    def lookups(self, request, model_admin):
-        states = Region.objects.all()
-        if hasattr(request, 'organization'):
-            organization_maquiladora_state_ids = list(
-                Maquiladora.objects.filter(organization=request.organization).values_list('state', flat=True).distinct())
-            states = states.filter(id__in=organization_maquiladora_state_ids).order_by('country__name', 'name')
-        return [(state.id, state.name) for state in states]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(state__id=self.value())
-        return queryset
-
-
-class ByCityForOrganizationMaquiladoraFilter(admin.SimpleListFilter):
+class ByCityForOrganizationMaquiladoraFilter(CachedLookupFilter):
     title = _('City')
     parameter_name = 'city'
+    lookup_field = 'city'
+    label_fields = ('region__name', 'name')
+    label_template = '{0}: {1}'
+    lookup_ordering = ('region__name', 'name')
+    invalidate_on = (Maquiladora,)
 
-    def lookups(self, request, model_admin):
-        cities = SubRegion.objects.all()
-        if hasattr(request, 'organization'):
-            organization_maquiladora_city_ids = list(
-                Maquiladora.objects.filter(organization=request.organization).values_list('city', flat=True).distinct())
-            cities = cities.filter(id__in=organization_maquiladora_city_ids).order_by('country__name', 'region__name', 'name')
-        return [(city.id, f" {city.region.name}: {city.name}") for city in cities]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(city__id=self.value())
-        return queryset
-
-class ByServiceProviderForOrganizationServiceFilter(admin.SimpleListFilter):
+class ByServiceProviderForOrganizationServiceFilter(CachedLookupFilter):
     title = _('Provider')
     parameter_name = 'provider'
+    lookup_model = Provider
+    filter_field = 'service_provider'
+    invalidate_on = (Provider,)
 
-    def lookups(self, request, model_admin):
-        providers = Provider.objects.filter(organization=request.organization, category="service_provider")
-        return [(provider.id, provider.name) for provider in providers]
+    def get_lookup_queryset(self, request, model_admin):
+        return super().get_lookup_queryset(request, model_admin).filter(category="service_provider")
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(service_provider=self.value())
-        return queryset
 
-class ByStateForOrganizationWeighingScaleFilter(admin.SimpleListFilter):
+class ByStateForOrganizationWeighingScaleFilter(CachedLookupFilter):
     title = _('State')
     parameter_name = 'state'
+    lookup_field = 'state'
+    invalidate_on = (WeighingScale,)
 
-    def lookups(self, request, model_admin):
-        states = Region.objects.all()
-        if hasattr(request, 'organization'):
-            organization_maquiladora_state_ids = list(
-                WeighingScale.objects.filter(organization=request.organization).values_list('state', flat=True).distinct())
-            states = states.filter(id__in=organization_maquiladora_state_ids).order_by('country__name', 'name')
-        return [(state.id, state.name) for state in states]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(state__id=self.value())
-        return queryset
-
-class ByCityForOrganizationWeighingScaleFilter(admin.SimpleListFilter):
+class ByCityForOrganizationWeighingScaleFilter(CachedLookupFilter):
     title = _('City')
     parameter_name = 'city'
+    lookup_field = 'city'
+    label_fields = ('region__name', 'name')
+    label_template = '{0}: {1}'
+    lookup_ordering = ('region__name', 'name')
+    invalidate_on = (WeighingScale,)
 
-    def lookups(self, request, model_admin):
-        cities = SubRegion.objects.all()
-        if hasattr(request, 'organization'):
-            organization_maquiladora_city_ids = list(
-                WeighingScale.objects.filter(organization=request.organization).values_list('city', flat=True).distinct())
-            cities = cities.filter(id__in=organization_maquiladora_city_ids).order_by('country__name', 'region__name', 'name')
-        return [(city.id, f" {city.region.name}: {city.name}") for city in cities]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(city__id=self.value())
-        return queryset
-
-
-class ByCountryForOrganizationExportingCompaniesFilter(admin.SimpleListFilter):
+class ByCountryForOrganizationExportingCompaniesFilter(CachedLookupFilter):
     title = _('Country')
     parameter_name = 'country'
+    lookup_field = 'country'
+    invalidate_on = (ExportingCompany,)
 
-    def lookups(self, request, model_admin):
-        countries = Country.objects.all()
-        if hasattr(request, 'organization'):
-            country_ids = list(
-                ExportingCompany.objects.filter(organization=request.organization).values_list('country', flat=True).distinct())
-            countries = countries.filter(id__in=country_ids).order_by('name')
-        return [(country.id, country.name) for country in countries]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(country__id=self.value())
-        return queryset
 
-class ByStateForOrganizationExportingCompaniesFilter(admin.SimpleListFilter):
+class ByStateForOrganizationExportingCompaniesFilter(CachedLookupFilter):
     title = _('State')
     parameter_name = 'state'
+    lookup_field = 'state'
+    label_fields = ('country__name', 'name')
+    label_template = '{0}: {1}'
+    lookup_ordering = ('country__name', 'name')
+    invalidate_on = (ExportingCompany,)
 
-    def lookups(self, request, model_admin):
-        states = Region.objects.all()
-        if hasattr(request, 'organization'):
-            state_ids = list(
-                ExportingCompany.objects.filter(organization=request.organization).values_list('state', flat=True).distinct())
-            states = states.filter(id__in=state_ids).order_by('country__name', 'name')
-        return [(state.id, f"{state.country.name}: {state.name}") for state in states]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(state__id=self.value())
-        return queryset
-
-
-class ByCityForOrganizationExportingCompaniesFilter(admin.SimpleListFilter):
+class ByCityForOrganizationExportingCompaniesFilter(CachedLookupFilter):
     title = _('City')
     parameter_name = 'city'
+    lookup_field = 'city'
+    label_fields = ('country__name', 'region__name', 'name')
+    label_template = '{0}: {1}: {2}'
+    lookup_ordering = ('country__name', 'region__name', 'name')
+    invalidate_on = (ExportingCompany,)
 
-    def lookups(self, request, model_admin):
-        cities = SubRegion.objects.all()
-        if hasattr(request, 'organization'):
-            organization_providers_city_ids = list(
-                ExportingCompany.objects.filter(organization=request.organization).values_list('city', flat=True).distinct())
-            cities = cities.filter(id__in=organization_providers_city_ids).order_by('country__name', 'region__name', 'name')
-        return [(city.id, f"{city.country.name}: {city.region.name}: {city.name}") for city in cities]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(city__id=self.value())
-        return queryset
 
-class ByCountryForOrganizationCustomsBrokersFilter(admin.SimpleListFilter):
+class ByCountryForOrganizationCustomsBrokersFilter(CachedLookupFilter):
     title = _('Country')
     parameter_name = 'country'
+    lookup_field = 'country'
+    invalidate_on = (CustomsBroker,)
 
-    def lookups(self, request, model_admin):
-        countries = Country.objects.all()
-        if hasattr(request, 'organization'):
-            country_ids = list(
-                CustomsBroker.objects.filter(organization=request.organization).values_list('country', flat=True).distinct())
-            countries = countries.filter(id__in=country_ids).order_by('name')
-        return [(country.id, country.name) for country in countries]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(country__id=self.value())
-        return queryset
-
-
-class BySupplyKindForPackagingFilter(admin.SimpleListFilter):
+class BySupplyKindForPackagingFilter(CachedLookupFilter):
     title = _('Supply Kind')
     parameter_name = 'supply_kind'
+    lookup_field = 'packaging_supply_kind'
+    invalidate_on = (ProductPackaging, SupplyKind)
 
-    def lookups(self, request, model_admin):
-        supply_kinds = SupplyKind.objects.all()
-        if hasattr(request, 'organization'):
-            main_supply_kind_ids = list(ProductPackaging.objects.filter(organization=request.organization).values_list(
-                'packaging_supply_kind', flat=True).distinct())
-            supply_kinds = supply_kinds.filter(id__in=main_supply_kind_ids)
-        return [(supply_kind.id, supply_kind.name) for supply_kind in supply_kinds]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(packaging_supply_kind__id=self.value())
-        return queryset
-
-
-class BySupplyForOrganizationPackagingFilter(admin.SimpleListFilter):
+class BySupplyForOrganizationPackagingFilter(CachedLookupFilter):
     title = _('Supply')
     parameter_name = 'supply'
-
-    def lookups(self, request, model_admin):
-        supplies = Supply.objects.all()
-        if hasattr(request, 'organization'):
-            supply_ids = list(ProductPackaging.objects.filter(organization=request.organization).values_list(
-                'packaging_supply', flat=True).distinct())
-            supplies = supplies.filter(id__in=supply_ids)
-        return [(supply.id, supply.name) for supply in supplies]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(packaging_supply__id=self.value())
-        return queryset
+    lookup_field = 'packaging_supply'
+    invalidate_on = (ProductPackaging, Supply)
 
 
-class ByProductForOrganizationPackagingFilter(admin.SimpleListFilter):
+class ByProductForOrganizationPackagingFilter(CachedLookupFilter):
     title = _('Product')
     parameter_name = 'product'
-
-    def lookups(self, request, model_admin):
-        products = Product.objects.all()
-        if hasattr(request, 'organization'):
-            product_ids = list(
-                ProductPackaging.objects.filter(organization=request.organization).values_list('product', flat=True).distinct())
-            products = products.filter(id__in=product_ids).order_by('name')
-        return [(product.id, product.name) for product in products]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(product__id=self.value())
-        return queryset
+    lookup_field = 'product'
+    invalidate_on = (ProductPackaging, Product)
 
 
-class ByMarketForOrganizationPackagingFilter(admin.SimpleListFilter):
+class ByMarketForOrganizationPackagingFilter(CachedLookupFilter):
     title = _('Market')
     parameter_name = 'market'
-
-    def lookups(self, request, model_admin):
-        markets = Market.objects.all()
-        if hasattr(request, 'organization'):
-            market_ids = list(set(ProductPackaging.objects.filter(organization=request.organization).values_list('market', flat=True).distinct()))
-            markets = markets.filter(id__in=market_ids).order_by('name')
-        return [(market.id, market.name) for market in markets]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(market__id=self.value())
-        return queryset
+    lookup_field = 'market'
+    invalidate_on = (ProductPackaging, Market)
 
 
-class ByProductKindCountryStandardPackagingForOrganizationPackagingFilter(admin.SimpleListFilter):
+class ByProductKindCountryStandardPackagingForOrganizationPackagingFilter(CachedLookupFilter):
     title = _('Country standard packaging')
     parameter_name = 'country_standard_packaging'
-
-    def lookups(self, request, model_admin):
-        country_standard_packaging = ProductKindCountryStandardPackaging.objects.all()
-        if hasattr(request, 'organization'):
-            market_ids = list(set(ProductPackaging.objects.filter(organization=request.organization).values_list('country_standard_packaging', flat=True).distinct()))
-            country_standard_packaging = country_standard_packaging.filter(id__in=market_ids).order_by('name')
-        return [(country_standard_packaging.id, country_standard_packaging.name) for country_standard_packaging in country_standard_packaging]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(market__id=self.value())
-        return queryset
+    lookup_field = 'country_standard_packaging'
+    invalidate_on = (ProductPackaging, ProductKindCountryStandardPackaging)
 
 
 # TODO: remover jul25
-class ByProductForOrganizationProductPackagingPalletFilter(admin.SimpleListFilter):
+class ByProductForOrganizationProductPackagingPalletFilter(CachedLookupFilter):
     title = _('Product')
     parameter_name = 'product'
+    lookup_field = 'product'
+    invalidate_on = (Pallet, Product)
 
-    def lookups(self, request, model_admin):
-        products = Product.objects.all()
-        if hasattr(request, 'organization'):
-            product_ids = list(
-                Pallet.objects.filter(organization=request.organization).values_list('product', flat=True).distinct())
-            products = products.filter(id__in=product_ids).order_by('name')
-        return [(product.id, product.name) for product in products]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(product__id=self.value())
-        return queryset
-
-
-
-class ByMarketForOrganizationPalletFilter(admin.SimpleListFilter):
+class ByMarketForOrganizationPalletFilter(CachedLookupFilter):
     title = _('Market')
     parameter_name = 'markets'
-
-    def lookups(self, request, model_admin):
-        markets = Market.objects.none()
-        if hasattr(request, 'organization'):
-            market_ids = list(Pallet.objects.filter(organization=request.organization).values_list('market', flat=True).distinct())
-            markets = Market.objects.filter(id__in=market_ids).order_by('name')
-        return [(market.id, market.name) for market in markets]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(market__id=self.value())
-        return queryset
+    lookup_field = 'market'
+    invalidate_on = (Pallet, Market)
 
 
-class BySupplyForOrganizationPalletFilter(admin.SimpleListFilter):
+class BySupplyForOrganizationPalletFilter(CachedLookupFilter):
     title = _('Supply')
     parameter_name = 'supply'
-
-    def lookups(self, request, model_admin):
-        supplies = Supply.objects.all()
-        if hasattr(request, 'organization'):
-            distinct_supplies = list(
-                Pallet.objects.filter(organization=request.organization).values_list('supply', flat=True).distinct())
-            supplies = supplies.filter(id__in=distinct_supplies).order_by('name')
-        return [(supply.id, supply.name) for supply in supplies]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(supply__id=self.value())
-        return queryset
+    lookup_field = 'supply'
+    invalidate_on = (Pallet, Supply)
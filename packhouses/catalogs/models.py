@@ -28,10 +28,8 @@ from .settings import (CLIENT_KIND_CHOICES, ORCHARD_PRODUCT_CLASSIFICATION_CHOIC
                        PRODUCT_PRICE_MEASURE_UNIT_CATEGORY_CHOICES, PRODUCT_SIZE_CATEGORY_CHOICES)
 from common.base.models import FoodSafetyProcedure
 from django.utils import timezone
-from eudr.parcels.utils import (uuid_file_path, validate_geom_vector_file, fix_format, fix_crs, to_polygon,
-                                get_geom_from_file, to_multipolygon, test_open_file)
+from eudr.parcels.utils import validate_geom_vector_file, ingest_geom_file, remove_geom_file
 from django.contrib.gis.geos import GEOSGeometry
-import os
 from django.dispatch import receiver
 from django.db.models.signals import post_save, pre_save
 import uuid
@@ -752,20 +750,11 @@ def set_geom_from_file(sender, instance, created, **kwargs):
 
     if instance.file and not instance.geom:
         try:
-            fix_format(instance)
-            fix_crs(instance)
-            to_polygon(instance)
-            to_multipolygon(instance)
-
-            geom = get_geom_from_file(instance)
-            instance.geom = GEOSGeometry(geom, srid=4326)
+            instance.geom = GEOSGeometry(ingest_geom_file(instance), srid=settings.EUDR_DATA_FEATURES_SRID)
             instance.save_due_to_update_geom = True
-            instance.save(update_fields=['geom'])
+            instance.save(update_fields=['file', 'geom'])
         except Exception as e:
-            if hasattr(instance.file, 'close'):
-                instance.file.close()
-            if hasattr(instance.file, 'path') and os.path.exists(instance.file.path):
-                os.remove(instance.file.path)
+            remove_geom_file(instance)
             raise ValidationError(f"Error procesando archivo: {e}")
 
 
@@ -1,10 +1,10 @@
 from django.http import JsonResponse
 from django.http import HttpResponse
-from .models import (Country, Region, SubRegion, City)
-from django.template.loader import render_to_string
-from weasyprint import HTML, CSS
 from datetime import datetime
 from import_export.admin import BaseExportMixin, ExportMixin
+from common.base.utils import get_report_rows
+from common.base.reports import render_pdf_response
+from common.profiles.utils import get_request_report_header
 import json 
 import os
 
@@ -13,63 +13,36 @@ import os
 
 def basic_report(request, json_data, model_name, model_key, pretty_filters):
     # prepare data
-    json_data = json.loads(json_data)
-    base_url = request.build_absolute_uri('/')
+    headers, data = get_report_rows(json_data)
 
-    if json_data: 
-        headers = list(json_data[0].keys()) 
-    else: 
-        headers = [] 
-     
-    data = [[item.get(header) for header in headers] for item in json_data]
-
-    if hasattr(request, 'organization'):
-        organization = request.organization.organizationprofile.name
-        add =  request.organization.organizationprofile.address
-        organization_profile = request.organization.organizationprofile
-        def get_name(model, obj_id, default):
-            if obj_id:
-                try:
-                    return model.objects.get(id=obj_id).name
-                except model.DoesNotExist:
-                    return f"{default} does not exist"
-            return f"{default} not specified"
-
-        # Obtener los nombres de las regiones
-        city_name = get_name(SubRegion, organization_profile.city_id, "Ciudad")
-        country_name = get_name(Country, organization_profile.country_id, "Country")
-        state_name = get_name(Region, organization_profile.state_id, "State")
-        district_name = get_name(City, organization_profile.district_id, "District")
-        if organization_profile.logo:  
-            logo_url = organization_profile.logo.url  
-        else:
-            logo_url = None
+    report_header = get_request_report_header(request)
     pdf_title = model_name
-    packhouse_name = organization
-    company_address = f"{add}, {district_name}, {city_name}, {state_name}, {country_name}"
+    packhouse_name = report_header['name']
+    company_address = report_header['address']
     columns_total = len(headers)
     date = datetime.now()
     year = str(date.year)
     
     # orientation page
     if len(headers) < 10:
-        css = CSS(string='''
+        css = '''
         @page {
             size: letter portrait;
-        }''')
+        }'''
     elif len(headers) < 16: 
-        css = CSS(string='''
+        css = '''
         @page {
             size: letter landscape;
-        }''')
+        }'''
     else:
-        css = CSS(string='''
+        css = '''
         @page {
             size: legal landscape;
-        }''')
+        }'''
 
     # send data to create pdf
-    html_string = render_to_string('admin/packhouses/base-table-report.html',{
+    filename = f"{model_name}.pdf"
+    return render_pdf_response(request, 'admin/packhouses/base-table-report.html',{
         'company_info': 'Certiffy',
         'pdf_title': pdf_title,
         'headers': headers,
@@ -79,13 +52,6 @@ def basic_report(request, json_data, model_name, model_key, pretty_filters):
         'columns_total': columns_total,
         'year': year,
         'date': date, 
-    })
-
-    html = HTML(string=html_string, base_url=base_url)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="{model_name}.pdf"'
-    html.write_pdf(response, stylesheets=[css], )
-
-    return response
+    }, filename, stylesheets=[css])
 
 
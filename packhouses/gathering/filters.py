@@ -1,152 +1,79 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from .models import ScheduleHarvest
-from packhouses.catalogs.models import OrchardCertification
+from packhouses.catalogs.models import (Provider, Orchard, OrchardCertification, HarvestingCrew, Product, ProductVariety,
+                                        ProductPhenologyKind, Gatherer, Maquiladora)
+from packhouses.packhouse_settings.models import OrchardCertificationKind
+from common.base.filters import CachedLookupFilter
 from packhouses.catalogs.settings import ORCHARD_PRODUCT_CLASSIFICATION_CHOICES
 from rangefilter.filters import DateRangeFilter
 
-class ByProductProviderForOrganizationScheduleHarvestFilter(admin.SimpleListFilter):
+class ByProductProviderForOrganizationScheduleHarvestFilter(CachedLookupFilter):
     title = _('Product Prodiver')
     parameter_name = 'scheduleharvest_product_provider'
+    lookup_field = 'product_provider'
+    invalidate_on = (Provider,)
 
     def has_output(self):
         return True
-    
-    def lookups(self, request, model_admin):
-        used_providers = (
-            model_admin.model.objects.filter(
-                product_provider__category='product_provider',
-                product_provider__is_enabled=True,
-                product_provider__organization=request.organization
-            )
-            .values_list('product_provider__id', 'product_provider__name')
-            .distinct()
+
+    def get_lookup_queryset(self, request, model_admin):
+        return super().get_lookup_queryset(request, model_admin).filter(
+            product_provider__category='product_provider',
+            product_provider__is_enabled=True,
         )
-        return used_providers
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(product_provider__id=self.value())
-        return queryset
-    
-class ByOrchardProductProducerForOrganizationScheduleHarvestFilter(admin.SimpleListFilter):
+
+class ByOrchardProductProducerForOrganizationScheduleHarvestFilter(CachedLookupFilter):
     title = _('Product Producer')
     parameter_name = 'scheduleharvest_product_producer'
+    lookup_field = 'orchard__producer'
+    invalidate_on = (Orchard, Provider)
 
     def has_output(self):
         return True
-    
-    def lookups(self, request, model_admin):
-        qs = model_admin.model.objects.filter(
-            orchard__isnull=False,
-            orchard__producer__isnull=False,
-            orchard__organization=request.organization
-        ).values_list('orchard__producer__id', 'orchard__producer__name').distinct()
-        return qs
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(orchard__producer__id=self.value())
-        return queryset
-    
-class ByHarvestingCrewForOrganizationScheduleHarvestFilter(admin.SimpleListFilter):
+
+class ByHarvestingCrewForOrganizationScheduleHarvestFilter(CachedLookupFilter):
     title = _('Harvesting Crew')
     parameter_name = 'harvesting_crew'
-    
-    def lookups(self, request, model_admin):
-        crew_ids = (
-            model_admin.model.objects.filter(
-                scheduleharvestharvestingcrew__harvesting_crew__isnull=False,
-                scheduleharvestharvestingcrew__harvesting_crew__organization=request.organization
-            )
-            .values_list(
-                'scheduleharvestharvestingcrew__harvesting_crew__id',
-                'scheduleharvestharvestingcrew__harvesting_crew__name'
-            )
-            .distinct()
-        )
-        return crew_ids
+    lookup_field = 'scheduleharvestharvestingcrew__harvesting_crew'
+    invalidate_on = (HarvestingCrew,)
 
     def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(
-                scheduleharvestharvestingcrew__harvesting_crew__id=self.value()
-            )
-        return queryset
-    
-class ByProductForOrganizationScheduleHarvestFilter(admin.SimpleListFilter):
+        return super().queryset(request, queryset).distinct()
+
+
+class ByProductForOrganizationScheduleHarvestFilter(CachedLookupFilter):
     title = _('Product')
     parameter_name = 'product'
+    lookup_field = 'product'
+    invalidate_on = (Product,)
 
-    def lookups(self, request, model_admin):
-        qs = model_admin.model.objects.filter(
-            product__isnull=False,
-            product__organization=request.organization
-        ).values_list('product__id', 'product__name').distinct()
-        return qs
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(product__id=self.value())
-        return queryset
-    
-class ByProductVarietyForOrganizationScheduleHarvestFilter(admin.SimpleListFilter):
+class ByProductVarietyForOrganizationScheduleHarvestFilter(CachedLookupFilter):
     title = _('Product Variety')
-    parameter_name = 'product_variety'  
+    parameter_name = 'product_variety'
+    lookup_field = 'product_variety'
+    invalidate_on = (ProductVariety,)
 
-    def lookups(self, request, model_admin):
-        qs = model_admin.model.objects.filter(
-            product_variety__isnull=False,
-            product_variety__product__organization=request.organization  
-        ).values_list('product_variety__id', 'product_variety__name').distinct()
-        return qs
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(product_variety__id=self.value())
-        return queryset
-    
-class ByProductPhenologyForOrganizationScheduleHarvestFilter(admin.SimpleListFilter):
+class ByProductPhenologyForOrganizationScheduleHarvestFilter(CachedLookupFilter):
     title = _('Product Phenology')
-    parameter_name = 'product_phenology'  
+    parameter_name = 'product_phenology'
+    lookup_field = 'product_phenology'
+    invalidate_on = (ProductPhenologyKind,)
 
-    def lookups(self, request, model_admin):
-        qs = model_admin.model.objects.filter(
-            product_phenology__isnull=False,
-            product_phenology__product__organization=request.organization  
-        ).values_list('product_phenology__id', 'product_phenology__name').distinct()
-        return qs
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(product_phenology__id=self.value())
-        return queryset
-    
-   
-class ByOrchardProductCategoryForOrganizationScheduleHarvestFilter(admin.SimpleListFilter):
+class ByOrchardProductCategoryForOrganizationScheduleHarvestFilter(CachedLookupFilter):
     title = _('Product Category')
     parameter_name = 'orchard_product_category'
+    lookup_field = 'orchard__category'
+    label_fields = ()
+    label_choices = dict(ORCHARD_PRODUCT_CLASSIFICATION_CHOICES)
+    invalidate_on = (Orchard,)
 
-    def lookups(self, request, model_admin):
-        # Obtener valores únicos de categoría usados
-        used_categories = (
-            model_admin.model.objects.filter(
-                orchard__isnull=False,
-                orchard__category__isnull=False,
-                orchard__organization=request.organization
-            )
-            .values_list('orchard__category', flat=True)
-            .distinct()
-        )
-
-        choices_dict = dict(ORCHARD_PRODUCT_CLASSIFICATION_CHOICES)
-        return [(cat, choices_dict.get(cat, cat)) for cat in used_categories]
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(orchard__category=self.value())
-        return queryset
-    
 class HarvestingCategoryFilter(admin.SimpleListFilter):
     title = _('Harvesting Category') 
     parameter_name = 'category'     
@@ -159,35 +86,18 @@ class HarvestingCategoryFilter(admin.SimpleListFilter):
             return queryset.filter(category=self.value())
         return queryset
 
-class GathererFilter(admin.SimpleListFilter):
+class GathererFilter(CachedLookupFilter):
     title = _('Gatherer')
     parameter_name = 'gatherer'
+    lookup_field = 'gatherer'
+    invalidate_on = (Gatherer,)
 
-    def lookups(self, request, model_admin):
-        qs = model_admin.model.objects.filter(
-            gatherer__isnull=False
-        ).values_list('gatherer__id', 'gatherer__name').distinct()
-        return qs
 
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(gatherer__id=self.value())
-        return queryset
-    
-class MaquiladoraFilter(admin.SimpleListFilter):
+class MaquiladoraFilter(CachedLookupFilter):
     title = _('Maquiladora')
     parameter_name = 'maquiladora'
-
-    def lookups(self, request, model_admin):
-        qs = model_admin.model.objects.filter(
-            maquiladora__isnull=False
-        ).values_list('maquiladora__id', 'maquiladora__name').distinct()
-        return qs
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(maquiladora__id=self.value())
-        return queryset
+    lookup_field = 'maquiladora'
+    invalidate_on = (Maquiladora,)
 
 class SchedulingTypeFilter(admin.SimpleListFilter):
     title = _('Scheduling Type')
@@ -206,27 +116,14 @@ class SchedulingTypeFilter(admin.SimpleListFilter):
             return queryset.filter(is_scheduled=False)
         return queryset
 
-class ByOrchardCertificationForOrganizationScheduleHarvestFilter(admin.SimpleListFilter):
+class ByOrchardCertificationForOrganizationScheduleHarvestFilter(CachedLookupFilter):
     title = _('Orchard Certification')
     parameter_name = 'orchard_certification'
-
-    def lookups(self, request, model_admin):
-        certs = OrchardCertification.objects.filter(
-            orchard__scheduleharvest__isnull=False,
-            orchard__organization=request.organization
-        ).values_list(
-            'certification_kind__id',
-            'certification_kind__name'
-        ).distinct()
-
-        return list(certs)
+    lookup_field = 'orchard__orchardcertification__certification_kind'
+    invalidate_on = (OrchardCertification, OrchardCertificationKind)
 
     def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(
-                orchard__orchardcertification__certification_kind__id=self.value()
-            ).distinct()
-        return queryset
+        return super().queryset(request, queryset).distinct()
 
 class GatheringDateRangeFilter(DateRangeFilter):
     template = "admin/rangefilter/date_filter_4_0.html"
\ No newline at end of file
@@ -17,6 +17,7 @@ from packhouses.catalogs.utils import vehicle_year_choices, vehicle_validate_yea
     get_vehicle_category_choices, get_provider_categories_choices, get_harvest_cutting_categories_choices
 from django.core.exceptions import ValidationError
 from common.base.models import ProductKind, CapitalFramework, LegalEntityCategory
+from common.base.sequences import allocate_ooid
 from packhouses.packhouse_settings.models import (Bank, VehicleOwnershipKind,
                                                   PaymentKind, VehicleFuelKind, VehicleKind, VehicleBrand,
                                                   OrchardCertificationVerifier,
@@ -75,15 +76,11 @@ class ScheduleHarvest(models.Model):
         return f"{self.ooid}"
 
     def save(self, *args, **kwargs):
-        if not self.ooid:
-            # Usar transacción y bloqueo de fila para evitar condiciones de carrera
-            with transaction.atomic():
-                last_order = ScheduleHarvest.objects.select_for_update().filter(organization=self.organization).order_by('-ooid').first()
-                if last_order:
-                    self.ooid = last_order.ooid + 1
-                else:
-                    self.ooid = 1
-        super().save(*args, **kwargs)
+        # El folio se reserva en la misma transacción del guardado para no dejar huecos
+        with transaction.atomic():
+            if not self.ooid:
+                self.ooid = allocate_ooid(ScheduleHarvest, organization_id=self.organization_id)
+            super().save(*args, **kwargs)
 
     def recalc_weight_expected(self):
         total = Decimal('0')
@@ -2,12 +2,9 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.urls import reverse
 from django.utils.translation import gettext as _
-from .models import (ScheduleHarvest, ScheduleHarvestHarvestingCrew, ScheduleHarvestVehicle, ScheduleHarvestContainerVehicle, Country, Region, SubRegion, City)
+from .models import (ScheduleHarvest, ScheduleHarvestHarvestingCrew, ScheduleHarvestVehicle, ScheduleHarvestContainerVehicle)
 from packhouses.catalogs.models import HarvestingCrew, OrchardCertification
-from django.template.loader import render_to_string
 from django.http import HttpResponse, HttpResponseForbidden
-from weasyprint import HTML, CSS
-from io import BytesIO
 from datetime import datetime
 from django.db.models import Prefetch
 from django.utils.text import capfirst
@@ -16,6 +13,9 @@ from django.urls import reverse
 from django.http import HttpResponseForbidden
 from django.http import JsonResponse
 from packhouses.receiving.models import IncomingProduct
+from common.base.utils import get_report_rows
+from common.base.reports import render_pdf_response
+from common.profiles.utils import get_report_header, get_request_report_header
 from django.contrib.auth.decorators import login_required
 from itertools import chain
 import json 
@@ -44,27 +44,12 @@ def harvest_order_pdf(request, uuid):
     # Obtener el registro
     harvest = get_object_or_404(ScheduleHarvest, uuid=uuid)
 
-    organization_profile = harvest.orchard.organization.organizationprofile
-    organization = organization_profile.name
-    add = organization_profile.address
-
-    def get_name(model, obj_id, default):
-        if obj_id:
-            try:
-                return model.objects.get(id=obj_id).name
-            except model.DoesNotExist:
-                return f"{default} does not exist"
-        return f"{default} not specified"
-
-    city_name = get_name(SubRegion, organization_profile.city_id, "City")
-    country_name = get_name(Country, organization_profile.country_id, "Country")
-    state_name = get_name(Region, organization_profile.state_id, "State")
-    district_name = get_name(City, organization_profile.district_id, "District")
-    logo_url = organization_profile.logo.url if organization_profile.logo else None
+    report_header = get_report_header(harvest.orchard.organization_id)
 
     pdf_title = _("Schedule Harvest Order")
-    packhouse_name = organization
-    company_address = f"{add}, {district_name}, {city_name}, {state_name}, {country_name}"
+    packhouse_name = report_header['name']
+    company_address = report_header['address']
+    logo_url = report_header['logo_url']
     date = datetime.now()
     year = str(date.year)
 
@@ -84,11 +69,10 @@ def harvest_order_pdf(request, uuid):
     logger.debug(f"Orchard certifications: {orchard_certifications}")
 
     # CSS
-    base_url = request.build_absolute_uri('/')
-    css = CSS(string='''
+    css = '''
         @page {
             size: letter portrait;
-        }''')
+        }'''
 
     report_url = request.build_absolute_uri(
         reverse("harvest_order_pdf", args=[harvest.uuid])
@@ -97,7 +81,8 @@ def harvest_order_pdf(request, uuid):
     qr_image = generate_qr_base64(qr_data)
 
     # Renderizar el template HTML
-    html_string = render_to_string('admin/packhouses/gathering/schedule-harvest-report.html', {
+    filename = f"{_('harvest_order')}_{harvest.ooid}.pdf"
+    return render_pdf_response(request, 'admin/packhouses/gathering/schedule-harvest-report.html', {
         'packhouse_name': packhouse_name,
         'company_address': company_address,
         'pdf_title': pdf_title,
@@ -110,21 +95,7 @@ def harvest_order_pdf(request, uuid):
         'year': year,
         'date': date,
         'printed_by': user,
-    })
-
-    # Convertir el HTML a PDF
-    html = HTML(string=html_string, base_url=base_url)
-    pdf_buffer = BytesIO()
-    html.write_pdf(pdf_buffer, stylesheets=[css],)
-
-    # Traducir el nombre del archivo manualmente
-    filename = f"{_('harvest_order')}_{harvest.ooid}.pdf"
-
-    # Devolver el PDF como respuesta
-    pdf_buffer.seek(0)
-    response = HttpResponse(pdf_buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="{filename}"'
-    return response
+    }, filename, stylesheets=[css], synchronous=True)
 
 
 def good_harvest_practices_format(request, uuid):
@@ -136,31 +107,11 @@ def good_harvest_practices_format(request, uuid):
     # Obtener el registro
     harvest = get_object_or_404(ScheduleHarvest, uuid=uuid)
 
-    # Obtener Datos de la Organización
-    if hasattr(request, 'organization'):
-        organization = request.organization.organizationprofile.name
-        add =  request.organization.organizationprofile.address
-        organization_profile = request.organization.organizationprofile
-        def get_name(model, obj_id, default):
-            if obj_id:
-                try:
-                    return model.objects.get(id=obj_id).name
-                except model.DoesNotExist:
-                    return f"{default} does not exist"
-            return f"{default} not specified"
-
-        # Obtener los nombres de las regiones
-        city_name = get_name(SubRegion, organization_profile.city_id, "City")
-        country_name = get_name(Country, organization_profile.country_id, "Country")
-        state_name = get_name(Region, organization_profile.state_id, "State")
-        district_name = get_name(City, organization_profile.district_id, "District")
-        if organization_profile.logo:
-            logo_url = organization_profile.logo.url
-        else:
-            logo_url = None
+    report_header = get_request_report_header(request)
     pdf_title = _("Verification Record of Hygiene and Safety Compliance in Harvest Activities (BIT-BPHS-01)")
-    packhouse_name = organization
-    company_address = f"{add}, {district_name}, {city_name}, {state_name}, {country_name}"
+    packhouse_name = report_header['name']
+    company_address = report_header['address']
+    logo_url = report_header['logo_url']
     date = datetime.now()
     year = str(date.year)
 
@@ -176,11 +127,10 @@ def good_harvest_practices_format(request, uuid):
     vehicles = ScheduleHarvestVehicle.objects.filter(schedule_harvest=harvest)
 
     # CSS
-    base_url = request.build_absolute_uri('/')
-    css = CSS(string='''
+    css = '''
         @page {
             size: legal portrait;
-        }''')
+        }'''
 
     orchard_certifications = OrchardCertification.objects.filter(
         orchard=harvest.orchard,
@@ -193,7 +143,8 @@ def good_harvest_practices_format(request, uuid):
     logger.debug(f"Orchard certifications: {orchard_certifications}")
 
     # Renderizar el template HTML
-    html_string = render_to_string('admin/packhouses/gathering/safety-guidelines-report.html', {
+    filename = f"{_('good_harvest_practices')}_{harvest.ooid}.pdf"
+    return render_pdf_response(request, 'admin/packhouses/gathering/safety-guidelines-report.html', {
         'packhouse_name': packhouse_name,
         'company_address': company_address,
         'pdf_title': pdf_title,
@@ -205,21 +156,7 @@ def good_harvest_practices_format(request, uuid):
         'scheduleharvestharvestingcrewinline': scheduleharvestharvestingcrewinline,
         'year': year,
         'date': date,
-    })
-
-    # Convertir el HTML a PDF
-    html = HTML(string=html_string, base_url=base_url)
-    pdf_buffer = BytesIO()
-    html.write_pdf(pdf_buffer, stylesheets=[css],)
-
-    # Traducir el nombre del archivo manualmente
-    filename = f"{_('good_harvest_practices')}_{harvest.ooid}.pdf"
-
-    # Devolver el PDF como respuesta
-    pdf_buffer.seek(0)
-    response = HttpResponse(pdf_buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="{filename}"'
-    return response
+    }, filename, stylesheets=[css])
 
 def cancel_schedule_harvest(request, pk):
     schedule_harvest = get_object_or_404(ScheduleHarvest, pk=pk)
@@ -278,43 +215,13 @@ def set_scheduleharvest_ready(request, harvest_id):
 def basic_report(request, json_data, model_verbose_name, model_key, pretty_filters):
     user = request.user
     # prepare data
-    json_data = json.loads(json_data)
-    base_url = request.build_absolute_uri('/')
+    headers, data = get_report_rows(json_data)
 
-    if json_data:
-        headers = list(json_data[0].keys())
-    else:
-        headers = []
-
-    data = [[item.get(header) for header in headers] for item in json_data]
-
-    if hasattr(request, 'organization'):
-        organization = request.organization.organizationprofile.name
-        add = request.organization.organizationprofile.address
-        organization_profile = request.organization.organizationprofile
-
-        def get_name(model, obj_id, default):
-            if obj_id:
-                try:
-                    return model.objects.get(id=obj_id).name
-                except model.DoesNotExist:
-                    return f"{default} does not exist"
-            return f"{default} not specified"
-
-        # Obtener los nombres de las regiones
-        city_name = get_name(SubRegion, organization_profile.city_id, "Ciudad")
-        country_name = get_name(Country, organization_profile.country_id, "Country")
-        state_name = get_name(Region, organization_profile.state_id, "State")
-        district_name = get_name(City, organization_profile.district_id, "District")
-
-        if organization_profile.logo:
-            logo_url = organization_profile.logo.url
-        else:
-            logo_url = None
+    report_header = get_request_report_header(request)
 
     pdf_title = model_verbose_name
-    packhouse_name = organization
-    company_address = f"{add}, {district_name}, {city_name}, {state_name}, {country_name}"
+    packhouse_name = report_header['name']
+    company_address = report_header['address']
     columns_total = len(headers)
     date = datetime.now()
     year = str(date.year)
@@ -333,24 +240,26 @@ def basic_report(request, json_data, model_verbose_name, model_key, pretty_filte
     col_count = 4
     # orientation page
     if len(headers) < 10:
-        css = CSS(string='''
+        css = '''
         @page {
             size: letter portrait;
-        }''')
+        }'''
         col_count = 3
     elif len(headers) < 16:
-        css = CSS(string='''
+        css = '''
         @page {
             size: letter landscape;
-        }''')
+        }'''
     else:
-        css = CSS(string='''
+        css = '''
         @page {
             size: 18in 11in;
-        }''')
+        }'''
 
     # send data to create pdf
-    html_string = render_to_string(
+    filename = f"{model_verbose_name}.pdf"
+    return render_pdf_response(
+        request,
         "admin/packhouses/base-table-report.html",
         {
             "company_info":    "Certiffy",
@@ -367,12 +276,7 @@ def basic_report(request, json_data, model_verbose_name, model_key, pretty_filte
             'col_count': col_count,
             'printed_by': user,
         },
+        filename,
+        stylesheets=[css],
     )
 
-    html = HTML(string=html_string, base_url=base_url)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="{model_verbose_name}.pdf"'
-    html.write_pdf(response, stylesheets=[css])
-
-    return response
-
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_save, post_delete
+from packhouses.receiving.models import Batch, IncomingProduct, FoodSafety
+from packhouses.gathering.models import ScheduleHarvest
+from packhouses.sales.models import Order
+from packhouses.certifications.models import Certification, CertificationDocument
+from packhouses.purchases.models import Requisition, PurchaseOrder, ServiceOrder
+from packhouses.storehouse.models import AdjustmentInventory, StorehouseEntry
+from .utils import invalidate_dashboard
+
+# Modelos contados en el dashboard; cualquier alta, cambio de estado o baja invalida
+# los contadores en cache de su organización
+DASHBOARD_MODELS = (Order, ScheduleHarvest, IncomingProduct, Batch, FoodSafety, Certification, Requisition,
+                    ServiceOrder, PurchaseOrder, AdjustmentInventory, StorehouseEntry)
+
+
+def invalidate_dashboard_counters(sender, instance, **kwargs):
+    if instance.organization_id:
+        invalidate_dashboard(instance.organization_id)
+
+
+def invalidate_dashboard_certifications(sender, instance, **kwargs):
+    organization_id = Certification.objects.filter(pk=instance.certification_id).values_list(
+        'organization_id', flat=True
+    ).first()
+    if organization_id:
+        invalidate_dashboard(organization_id)
+
+
+for model in DASHBOARD_MODELS:
+    dispatch_uid = f'member_dashboard:{model._meta.label_lower}'
+    post_save.connect(invalidate_dashboard_counters, sender=model, dispatch_uid=dispatch_uid)
+    post_delete.connect(invalidate_dashboard_counters, sender=model, dispatch_uid=dispatch_uid)
+
+post_save.connect(invalidate_dashboard_certifications, sender=CertificationDocument,
+                  dispatch_uid='member_dashboard:certificationdocument')
+post_delete.connect(invalidate_dashboard_certifications, sender=CertificationDocument,
+                    dispatch_uid='member_dashboard:certificationdocument')
@@ -1,6 +1,9 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
 from django.urls import reverse
 from django.utils.http import urlencode
-from django.utils.translation import gettext_lazy as _
+from django.utils.translation import gettext_lazy as _, get_language
 from django.utils import timezone
 from datetime import timedelta
 from packhouses.receiving.models import Batch, IncomingProduct, FoodSafety
@@ -53,7 +56,7 @@ def get_order_block(title, status, organization, changelist_url):
 
         return {
             "title": _(label),
-            "count": Order.objects.filter(**f).count(),
+            "filters": f,
             "url": f"{changelist_url}?{urlencode({**f_url})}"
         }
 
@@ -98,7 +101,7 @@ def get_scheduleharvest_block(title, status, organization, changelist_url):
 
         return {
             "title": _(label),
-            "count": ScheduleHarvest.objects.filter(**f).count(),
+            "filters": f,
             "url": f"{changelist_url}?{urlencode({**f_url})}"
         }
 
@@ -134,7 +137,7 @@ def get_incomingproduct_block(title, status, is_quarantined, organization, chang
 
         return {
             "title": _(label),
-            "count": IncomingProduct.objects.filter(**f).count(),
+            "filters": f,
             "url": f"{changelist_url}?{urlencode({**f})}"
         }
 
@@ -162,7 +165,7 @@ def get_batch_block(title, status, is_available_for_processing, organization, ch
 
         return {
             "title": _(label),
-            "count": Batch.objects.filter(**f).count(),
+            "filters": f,
             "url": f"{changelist_url}?{urlencode({**f})}"
         }
 
@@ -188,7 +191,7 @@ def get_foodsafety_block(title, status, organization, changelist_url):
 
         return {
             "title": _(label),
-            "count": FoodSafety.objects.filter(**f).count(),
+            "filters": f,
             "url": f"{changelist_url}?{urlencode({**f})}"
         }
 
@@ -206,25 +209,29 @@ def get_foodsafety_block(title, status, organization, changelist_url):
     }
 
 def get_certification_block(title, organization, changelist_url):
-    filters = {"certification__organization": organization}
-
-    def get_item(label, filter_key, filter_value_end, filter_value_start):
-        f = filters.copy()
-        f[filter_key] = (filter_value_start, filter_value_end)
-        certification_ids = CertificationDocument.objects.filter(**f).values_list('certification', flat=True).distinct()
+    periods = get_common_periods()
+    # Una sola consulta con el rango más amplio; cada periodo se filtra en Python
+    expirations = list(CertificationDocument.objects.filter(
+        certification__organization=organization,
+        expiration_date__range=(periods["today"], periods["next_three_month"]),
+    ).values_list('certification', 'expiration_date').distinct())
+
+    def get_item(label, filter_value_end):
+        certification_ids = sorted({
+            certification_id for certification_id, expiration_date in expirations
+            if expiration_date <= filter_value_end
+        })
 
         return {
             "title": _(label),
-            "count": certification_ids.count(),
+            "count": len(certification_ids),
             "url": f"{changelist_url}?{urlencode({'id__in': ','.join(str(id) for id in certification_ids)})}"
         }
 
-    periods = get_common_periods()
-
     items = [
-        get_item(periods["next_month_title"], "expiration_date__range", periods["next_month"], periods["today"]),
-        get_item(periods["next_two_month_title"], "expiration_date__range", periods["next_two_month"], periods["today"]),
-        get_item(periods["next_three_month_title"], "expiration_date__range", periods["next_three_month"], periods["today"]),
+        get_item(periods["next_month_title"], periods["next_month"]),
+        get_item(periods["next_two_month_title"], periods["next_two_month"]),
+        get_item(periods["next_three_month_title"], periods["next_three_month"]),
     ]
 
     return {
@@ -252,7 +259,7 @@ def get_requisition_block(title, status, past, parment_date, organization, chang
 
         return {
             "title": _(label),
-            "count": Requisition.objects.filter(**f).count(),
+            "filters": f,
             "url": f"{changelist_url}?{urlencode({**f})}"
         }
 
@@ -306,7 +313,7 @@ def get_service_block(title, status, filter_field, past, parment_date, organizat
 
         return {
             "title": _(label),
-            "count": ServiceOrder.objects.filter(**f).count(),
+            "filters": f,
             "url": f"{changelist_url}?{urlencode({**f_url})}"
         }
 
@@ -357,7 +364,7 @@ def get_purchase_block(title, status, past, parment_date, organization, changeli
 
         return {
             "title": _(label),
-            "count": PurchaseOrder.objects.filter(**f).count(),
+            "filters": f,
             "url": f"{changelist_url}?{urlencode({**f})}"
         }
 
@@ -397,7 +404,7 @@ def get_adjustment_block(title, bound, organization, changelist_url):
 
         return {
             "title": _(label),
-            "count": AdjustmentInventory.objects.filter(**f).count(),
+            "filters": f,
             "url": f"{changelist_url}?{urlencode({**f})}"
         }
 
@@ -423,7 +430,7 @@ def get_storehouse_block(title, organization, changelist_url):
 
         return {
             "title": _(label),
-            "count": StorehouseEntry.objects.filter(**f).count(),
+            "filters": f,
             "url": f"{changelist_url}?{urlencode({**f})}"
         }
 
@@ -438,4 +445,172 @@ def get_storehouse_block(title, organization, changelist_url):
     return {
         "block_name": _(title),
         "items": items
-    }
\ No newline at end of file
+    }
+
+
+DASHBOARD_CACHE_KEY = 'member_dashboard:{organization_id}:{language}:{today}:{version}'
+DASHBOARD_VERSION_KEY = 'member_dashboard_version:{organization_id}'
+
+
+def count_section_items(model, blocks, organization):
+    """
+    Llena el conteo de todos los items de los bloques de una sección con una
+    sola consulta de agregación condicional (Count con filter=Q por item).
+    """
+    items = [item for block in blocks for item in block["items"] if "filters" in item]
+    if items:
+        counts = model.objects.filter(organization=organization).aggregate(**{
+            f"item_{index}": Count('pk', filter=Q(**item["filters"]))
+            for index, item in enumerate(items)
+        })
+        for index, item in enumerate(items):
+            item["count"] = counts[f"item_{index}"]
+            del item["filters"]
+    return blocks
+
+
+def build_dashboard_sections(organization):
+    sections = []
+
+    changelist_url_order = reverse("admin:sales_order_changelist")
+    sections.append({
+        "section_name": _("Orders"),
+        "blocks": count_section_items(Order, [
+            get_order_block("Ready", "ready", organization, changelist_url_order),
+            get_order_block("Open", "open", organization, changelist_url_order),
+            # get_order_block("Close", "closed", organization, changelist_url_order),
+            get_order_block("Canceled", "canceled", organization, changelist_url_order),
+        ], organization)
+    })
+
+    changelist_url_scheduleharvest = reverse("admin:gathering_scheduleharvest_changelist")
+    sections.append({
+        "section_name": _("Schedule Harvests"),
+        "blocks": count_section_items(ScheduleHarvest, [
+            get_scheduleharvest_block("Open", "open", organization, changelist_url_scheduleharvest),
+            get_scheduleharvest_block("Ready(Harvest date)", "ready", organization, changelist_url_scheduleharvest),
+            get_scheduleharvest_block("Closed", "closed", organization, changelist_url_scheduleharvest),
+            get_scheduleharvest_block("Canceled", "canceled", organization, changelist_url_scheduleharvest),
+        ], organization)
+    })
+
+    changelist_url_incomigproduct = reverse("admin:receiving_incomingproduct_changelist")
+    sections.append({
+        "section_name": _("Incoming Product"),
+        "blocks": count_section_items(IncomingProduct, [
+            get_incomingproduct_block("Open", "open", None, organization, changelist_url_incomigproduct),
+            get_incomingproduct_block("Ready", "ready", False, organization, changelist_url_incomigproduct),
+            get_incomingproduct_block("In quarantined", "ready", True, organization, changelist_url_incomigproduct),
+            get_incomingproduct_block("Closed", "closed", None, organization, changelist_url_incomigproduct),
+            get_incomingproduct_block("Canceled", "canceled", None, organization, changelist_url_incomigproduct),
+        ], organization)
+    })
+
+    changelist_url_batch = reverse("admin:receiving_batch_changelist")
+    sections.append({
+        "section_name": _("Batches"),
+        "blocks": count_section_items(Batch, [
+            get_batch_block("Open", "open", None, organization, changelist_url_batch),
+            get_batch_block("Ready", "ready", False, organization, changelist_url_batch),
+            get_batch_block("For processing", "ready", True, organization, changelist_url_batch),
+            get_batch_block("Closed", "closed", None, organization, changelist_url_batch),
+            get_batch_block("Canceled", "canceled", None, organization, changelist_url_batch),
+        ], organization)
+    })
+
+    changelist_url_foodsafety = reverse("admin:receiving_foodsafety_changelist")
+    sections.append({
+        "section_name": _("Food Safeties"),
+        "blocks": count_section_items(FoodSafety, [
+            get_foodsafety_block("Open", "open", organization, changelist_url_foodsafety),
+            get_foodsafety_block("Closed", "closed", organization, changelist_url_foodsafety),
+        ], organization)
+    })
+
+    changelist_url_certification = reverse("admin:certifications_certification_changelist")
+    sections.append({
+        "section_name": _("Certifications"),
+        "blocks": [
+            get_certification_block("Expiration", organization, changelist_url_certification),
+        ]
+    })
+
+    changelist_url_requisition = reverse("admin:purchases_requisition_changelist")
+    sections.append({
+        "section_name": _("Requisition"),
+        "blocks": count_section_items(Requisition, [
+            get_requisition_block("Ready", "ready", True, False, organization, changelist_url_requisition),
+        ], organization)
+    })
+
+    changelist_url_serviceorder = reverse("admin:purchases_serviceorder_changelist")
+    sections.append({
+        "section_name": _("Service Order"),
+        "blocks": count_section_items(ServiceOrder, [
+            get_service_block("Created", "open", "service", True, True, organization, changelist_url_serviceorder),
+            get_service_block("Paid", "open", None, True, True, organization, changelist_url_serviceorder),
+            get_service_block("To be paid", "open", None, False, True, organization, changelist_url_serviceorder),
+        ], organization)
+    })
+
+    changelist_url_purchaseorder = reverse("admin:purchases_purchaseorder_changelist")
+    sections.append({
+        "section_name": _("Purchase Order"),
+        "blocks": count_section_items(PurchaseOrder, [
+            get_purchase_block("Created", "open", True, False, organization, changelist_url_purchaseorder),
+        ], organization)
+    })
+
+    changelist_url_adjustmentinventory = reverse("admin:storehouse_adjustmentinventory_changelist")
+    sections.append({
+        "section_name": _("Adjustment Inventory"),
+        "blocks": count_section_items(AdjustmentInventory, [
+            get_adjustment_block("Inbound", "inbound", organization, changelist_url_adjustmentinventory),
+            get_adjustment_block("Outbound", "outbound", organization, changelist_url_adjustmentinventory),
+        ], organization)
+    })
+
+    changelist_url_storehouseentry = reverse("admin:storehouse_storehouseentry_changelist")
+    sections.append({
+        "section_name": _("Storehouse Entry"),
+        "blocks": count_section_items(StorehouseEntry, [
+            get_storehouse_block("Storehouse Entry", organization, changelist_url_storehouseentry),
+        ], organization)
+    })
+
+    return sections
+
+
+def get_dashboard_version_key(organization_id):
+    return DASHBOARD_VERSION_KEY.format(organization_id=organization_id)
+
+
+def invalidate_dashboard(organization_id):
+    """
+    Invalida los contadores en cache del dashboard de la organización:
+    incrementa su versión, que forma parte de la llave de cache.
+    """
+    key = get_dashboard_version_key(organization_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_dashboard_sections(organization):
+    """
+    Secciones del dashboard de la organización, en cache por
+    MEMBER_DASHBOARD_CACHE_TIMEOUT segundos. La llave incluye la fecha para
+    que los periodos (hoy, últimos 7 días...) no queden desfasados.
+    """
+    cache_key = DASHBOARD_CACHE_KEY.format(
+        organization_id=organization,
+        language=get_language(),
+        today=timezone.now().date().isoformat(),
+        version=cache.get(get_dashboard_version_key(organization), 0),
+    )
+    sections = cache.get(cache_key)
+    if sections is None:
+        sections = build_dashboard_sections(organization)
+        cache.set(cache_key, sections, settings.MEMBER_DASHBOARD_CACHE_TIMEOUT)
+    return sections
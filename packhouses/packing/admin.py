@@ -22,6 +22,8 @@ from .filters import (ByBatchForOrganizationPackingPackageFilter, ByMarketForOrg
 from common.utils import is_instance_used
 from organizations.models import Organization
 from .forms import PackingPackageInlineFormSet, PackingPackageInlineForm
+from .utils import packing_posting
+from django.db import transaction
 
 # Register your models here.
 
@@ -114,7 +116,7 @@ class PackingPackageInline(admin.StackedInline):
         organization = request.organization if hasattr(request, 'organization') else None
 
         if db_field.name == "batch":
-            kwargs["queryset"] = Batch.objects.filter(organization=organization, status='ready', parent__isnull=True)
+            kwargs["queryset"] = Batch.objects.eligible(organization)
             formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
             return formfield
 
@@ -134,6 +136,9 @@ class PackingPalletAdmin(ByOrganizationAdminMixin):
     fields = ['ooid', 'product', 'market', 'product_sizes', 'pallet', 'status']
     inlines = [PackingPackageInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_list_columns()
+
     def get_action_buttons(self, obj):
         action_set_status_ready = format_html('''
                 <a class="button btn-cancel-confirm" href="javascript:void(0);" data-toggle="tooltip" title="{}"
@@ -161,7 +166,7 @@ class PackingPalletAdmin(ByOrganizationAdminMixin):
     get_action_buttons.short_description = _("Actions")
 
     def get_product_sizes_display(self, obj):
-        return ", ".join([size.name for size in obj.product_sizes.all()]) if obj.product_sizes.exists() else "-"
+        return ", ".join([size.name for size in obj.product_sizes.all()]) or "-"
 
     get_product_sizes_display.short_description = _("Product Sizes")
     get_product_sizes_display.admin_order_field = 'product_sizes__name'
@@ -230,6 +235,11 @@ class PackingPalletAdmin(ByOrganizationAdminMixin):
 
         return super().formfield_for_manytomany(db_field, request, **kwargs)
 
+    def save_related(self, request, form, formsets, change):
+        # Un solo lote de movimientos de peso e insumos para todos los paquetes del pallet
+        with transaction.atomic(), packing_posting():
+            super().save_related(request, form, formsets, change)
+
     class Media:
         js = ('js/admin/forms/packing/packing_pallet.js',)
 
@@ -250,6 +260,9 @@ class PackingPackageAdmin(ByOrganizationAdminMixin):
               'product_presentations_per_packaging', 'product_pieces_per_presentation', 'packaging_quantity',
               'processing_date', 'packing_pallet', 'status']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_list_columns()
+
     def get_readonly_fields(self, request, obj=None):
         readonly_fields = ['ooid']
         if obj and obj.status in ['closed', 'cancelled']:
@@ -4,19 +4,104 @@ from django.core.validators import MinValueValidator
 from django.db import models, transaction
 from organizations.models import Organization
 from ..catalogs.models import Market, ProductSize, ProductPackaging, SizePackaging, ProductMarketClass, ProductRipeness, \
-    ProductPhenologyKind, Product, Pallet
+    ProductPhenologyKind, Product, Pallet, OrchardCertification
 from ..hrm.models import Employee
 from ..receiving.models import Batch
 from django.utils.translation import gettext_lazy as _
 from common.settings import STATUS_CHOICES
+from common.base.sequences import allocate_ooid
+from common.mixins import TrackedFieldsMixin
+from .utils import packing_posting
 import uuid
-from django.db.models import Sum
+from django.db.models import Sum, F, OuterRef, Subquery, Value, Prefetch
+from django.db.models.functions import Coalesce
 from collections import defaultdict
 
 
 # Create your models here.
 
 
+PACKAGE_HARVEST_PATH = 'batch__incomingproduct__scheduleharvest__'
+
+PACKAGE_SUPPLY_RELATIONS = (
+    'size_packaging__product_packaging__packaging_supply',
+    'size_packaging__product_presentation__presentation_supply',
+)
+PACKAGE_COMPLEMENTARY_SUPPLY_RELATIONS = (
+    'size_packaging__product_packaging__productpackagingcomplementarysupply_set__supply',
+    'size_packaging__product_presentation__productpresentationcomplementarysupply_set__supply',
+)
+
+
+def prefetched_or(instance, related_name, queryset):
+    """
+    Registros de la relación ya precargados con prefetch_related, o `queryset`
+    si la instancia no viene de un queryset anotado.
+    """
+    if related_name in getattr(instance, '_prefetched_objects_cache', {}):
+        return getattr(instance, related_name).all()
+    return queryset
+
+
+class PackingPackageQuerySet(models.QuerySet):
+    def with_supplies(self):
+        """
+        Precarga lo que recorre package_supplies: empaque, presentación y sus
+        insumos complementarios.
+        """
+        return self.select_related(*PACKAGE_SUPPLY_RELATIONS).prefetch_related(
+            *PACKAGE_COMPLEMENTARY_SUPPLY_RELATIONS
+        )
+
+    def with_list_columns(self):
+        """
+        Carga en un número fijo de consultas las columnas del changelist, el API
+        y las propiedades de trazabilidad (productor, certificaciones vigentes,
+        cuadrillas e insumos), en lugar de recorrer relaciones por paquete.
+        """
+        active_certifications = OrchardCertification.objects.filter(
+            is_enabled=True, expiration_date__gte=datetime.datetime.today()
+        ).select_related('certification_kind')
+        return self.with_supplies().select_related(
+            'market', 'product_size', 'product_market_class', 'product_ripeness',
+            'batch__weight_ledger',
+            *[PACKAGE_HARVEST_PATH + relation for relation in
+              ('orchard__producer', 'orchard__district', 'orchard__city', 'orchard__state', 'product_provider',
+               'product')],
+        ).prefetch_related(
+            Prefetch('packing_pallet', queryset=PackingPallet.objects.with_list_columns()),
+            Prefetch(PACKAGE_HARVEST_PATH + 'orchard__orchardcertification_set', queryset=active_certifications,
+                     to_attr='active_certifications'),
+            PACKAGE_HARVEST_PATH + 'scheduleharvestharvestingcrew_set__harvesting_crew__crew_chief',
+        )
+
+
+class PackingPalletQuerySet(models.QuerySet):
+    def _packages_total(self, expression, output_field):
+        # Subconsulta por pallet: no se duplica con los joins de los filtros del changelist
+        subquery = (
+            PackingPackage.objects.filter(packing_pallet=OuterRef('pk'))
+            .order_by().values('packing_pallet')
+            .annotate(total=expression)
+            .values('total')
+        )
+        return Coalesce(Subquery(subquery, output_field=output_field), Value(0), output_field=output_field)
+
+    def with_list_columns(self):
+        """
+        Anota la cantidad y el peso de los paquetes del pallet (packages_sum_quantity,
+        packages_sum_weight) y precarga tallas y configuración del pallet, para
+        __str__, el changelist y el API.
+        """
+        return self.select_related('pallet', 'market', 'product').prefetch_related('product_sizes').annotate(
+            packages_sum_quantity=self._packages_total(Sum('packaging_quantity'), models.IntegerField()),
+            packages_sum_weight=self._packages_total(
+                Sum(F('packaging_quantity') * F('product_weight_per_packaging'), output_field=models.FloatField()),
+                models.FloatField(),
+            ),
+        )
+
+
 class PackerLabel(models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     employee = models.ForeignKey(Employee, verbose_name=_('Employee'), on_delete=models.PROTECT)
@@ -30,6 +115,14 @@ class PackerLabel(models.Model):
         scanned_status = "Scanned" if self.scanned_at else "Not Scanned"
         return f"{self.employee.id}-{self.uuid} | {scanned_status}"
 
+    @classmethod
+    def issue(cls, employee, quantity):
+        """
+        Emite `quantity` etiquetas del empleado con un solo INSERT (bulk_create);
+        los uuid se generan en Python, así que no hace falta releer las filas.
+        """
+        return cls.objects.bulk_create([cls(employee=employee) for i in range(quantity)])
+
 
 class PackerEmployeeManager(models.Manager):
     def get_queryset(self):
@@ -81,18 +174,23 @@ class PackingPallet(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     organization = models.ForeignKey(Organization, verbose_name=_('Organization'), on_delete=models.PROTECT)
 
+    objects = PackingPalletQuerySet.as_manager()
+
     def __str__(self):
-        return f"{self.ooid} - {self.market} - {self.pallet.name} (Q:{self.pallet_packages_sum_quantity}|{self.pallet.max_packages_quantity}) - {', '.join(self.product_sizes.all().values_list('name', flat=True))}"
+        return f"{self.ooid} - {self.market} - {self.pallet.name} (Q:{self.pallet_packages_sum_quantity}|{self.pallet.max_packages_quantity}) - {', '.join(size.name for size in self.product_sizes.all())}"
 
     @property
     def pallet_sum_weight(self):
+        annotated = getattr(self, 'packages_sum_weight', None)
+        if annotated is not None:
+            return round(annotated, 2)
         return round(sum(pkg.packing_package_sum_weight for pkg in self.packingpackage_set.all()), 2)
 
     @property
     def pallet_batch_weights(self):
         batch_totals = defaultdict(float)
 
-        for pkg in self.packingpackage_set.select_related('batch').all():
+        for pkg in prefetched_or(self, 'packingpackage_set', self.packingpackage_set.select_related('batch')):
             batch_totals[pkg.batch] += pkg.packing_package_sum_weight
 
         return dict(batch_totals)
@@ -102,13 +200,7 @@ class PackingPallet(models.Model):
         totals = defaultdict(float)
 
         # 1. Sumar insumos de cada paquete
-        packages = self.packingpackage_set.select_related(
-            'size_packaging__product_packaging__packaging_supply',
-            'size_packaging__product_presentation__presentation_supply'
-        ).prefetch_related(
-            'size_packaging__product_packaging__productpackagingcomplementarysupply_set__supply',
-            'size_packaging__product_presentation__productpresentationcomplementarysupply_set__supply'
-        )
+        packages = prefetched_or(self, 'packingpackage_set', self.packingpackage_set.with_supplies())
 
         for pkg in packages:
             for item in pkg.package_supplies:
@@ -122,7 +214,11 @@ class PackingPallet(models.Model):
 
         # 3. Agregar insumos complementarios del pallet
         if self.pallet:
-            for comp in self.pallet.palletcomplementarysupply_set.select_related('supply').all():
+            complementary_supplies = prefetched_or(
+                self.pallet, 'palletcomplementarysupply_set',
+                self.pallet.palletcomplementarysupply_set.select_related('supply')
+            )
+            for comp in complementary_supplies:
                 totals[comp.supply] += float(comp.quantity)
 
         # 4. Aplicar formato final
@@ -130,28 +226,30 @@ class PackingPallet(models.Model):
 
     @property
     def pallet_packages_sum_quantity(self):
+        annotated = getattr(self, 'packages_sum_quantity', None)
+        if annotated is not None:
+            return annotated
         if self.pk:
             return self.packingpackage_set.all().aggregate(total_quantity=Sum('packaging_quantity'))['total_quantity'] or 0
         return 0
 
     def save(self, *args, **kwargs):
-        if self.ooid is None:
-            with transaction.atomic():
-                last = (PackingPallet.objects.filter(organization=self.organization).order_by('-ooid').first())
-                self.ooid = (last.ooid + 1) if last else 1
+        with transaction.atomic():
+            if self.ooid is None:
+                self.ooid = allocate_ooid(PackingPallet, organization_id=self.organization_id)
 
-        if self.id and self.status == 'closed':
-            self.packingpackage_set.all().update(status='closed')
-        if self.id and self.is_repacked:
-            self.packingpackage_set.all().update(is_repacked=True)
-        super().save(*args, **kwargs)
+            if self.id and self.status == 'closed':
+                self.packingpackage_set.all().update(status='closed')
+            if self.id and self.is_repacked:
+                self.packingpackage_set.all().update(is_repacked=True)
+            super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = _('Packing Pallet')
         verbose_name_plural = _('Packing Pallets')
 
 
-class PackingPackage(models.Model):
+class PackingPackage(TrackedFieldsMixin, models.Model):
     ooid = models.PositiveIntegerField(verbose_name=_('Package ID'), null=True, blank=True)
     batch = models.ForeignKey(Batch, verbose_name=_('Batch'), on_delete=models.PROTECT)
     market = models.ForeignKey(Market, verbose_name=_('Market'), on_delete=models.PROTECT)
@@ -177,6 +275,10 @@ class PackingPackage(models.Model):
     created_at = models.DateField(auto_now_add=True)
     organization = models.ForeignKey(Organization, verbose_name=_('Organization'), on_delete=models.PROTECT)
 
+    objects = PackingPackageQuerySet.as_manager()
+
+    tracked_fields = ('status', 'packaging_quantity', 'product_weight_per_packaging')
+
     @property
     def package_supplies(self):
         supplies = []
@@ -204,6 +306,10 @@ class PackingPackage(models.Model):
     def packing_package_sum_weight(self):
         return self.packaging_quantity * self.product_weight_per_packaging
 
+    @property
+    def previous_package_sum_weight(self):
+        return self.previous('packaging_quantity') * self.previous('product_weight_per_packaging')
+
     @property
     def batch_number(self):
         return self.batch.ooid
@@ -227,9 +333,12 @@ class PackingPackage(models.Model):
     @property
     def orchard_certifications(self):
         if self.batch and self.batch.incomingproduct and self.batch.incomingproduct.scheduleharvest and self.batch.incomingproduct.scheduleharvest.orchard:
-            all_certifications = self.batch.incomingproduct.scheduleharvest.orchard.orchardcertification_set.filter(
-                is_enabled=True, expiration_date__gte=datetime.datetime.today())
-            if all_certifications.exists():
+            orchard = self.batch.incomingproduct.scheduleharvest.orchard
+            all_certifications = getattr(orchard, 'active_certifications', None)
+            if all_certifications is None:
+                all_certifications = list(orchard.orchardcertification_set.filter(
+                    is_enabled=True, expiration_date__gte=datetime.datetime.today()).select_related('certification_kind'))
+            if all_certifications:
                 return ", ".join(
                     [f"{certification.certification_kind.name} ({certification.certification_number})" for certification
                      in all_certifications])
@@ -252,8 +361,8 @@ class PackingPackage(models.Model):
     @property
     def harvest_crews(self):
         if self.batch and self.batch.incomingproduct and self.batch.incomingproduct.scheduleharvest:
-            crews = self.batch.incomingproduct.scheduleharvest.scheduleharvestharvestingcrew_set.all()
-            if crews.exists():
+            crews = list(self.batch.incomingproduct.scheduleharvest.scheduleharvestharvestingcrew_set.all())
+            if crews:
                 return ", ".join(
                     [f"{crew.harvesting_crew.name} ({crew.harvesting_crew.crew_chief.name})" for crew in crews])
         return "-"
@@ -263,9 +372,7 @@ class PackingPackage(models.Model):
 
     def clean(self):
         super().clean()
-        packing_package = PackingPackage.objects.get(pk=self.pk) if self.pk else None
-        packaging_quantity = self.packaging_quantity if self.packaging_quantity else (
-            packing_package.packaging_quantity if packing_package else None)
+        packaging_quantity = self.packaging_quantity if self.packaging_quantity else self.previous('packaging_quantity')
         if self.packing_pallet and packaging_quantity:
             if self.packing_pallet.pallet_packages_sum_quantity + packaging_quantity > self.packing_pallet.pallet.max_packages_quantity:
                 remaining_packages_quantity = self.packing_pallet.pallet.max_packages_quantity - self.packing_pallet.pallet_packages_sum_quantity
@@ -277,14 +384,13 @@ class PackingPackage(models.Model):
                                        'packing_pallet': validation_error})
 
     def save(self, *args, **kwargs):
-        if self.ooid is None:
-            with transaction.atomic():
+        # Los movimientos de pre_save y post_save se escriben juntos al terminar
+        with transaction.atomic(), packing_posting():
+            if self.ooid is None:
                 if not self.organization_id:
                     self.organization = self.packing_pallet.organization if self.packing_pallet else None
-                last = (PackingPackage.objects.filter(organization=self.organization).order_by('-ooid').first())
-                self.ooid = (last.ooid + 1) if last else 1
-
-        super().save(*args, **kwargs)
+                self.ooid = allocate_ooid(PackingPackage, organization_id=self.organization_id)
+            super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = _('Packing Package')
@@ -0,0 +1,83 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import transaction
+from packhouses.receiving.models import BatchWeightMovement
+from packhouses.storehouse.models import AdjustmentInventory
+from packhouses.members.utils import invalidate_dashboard
+
+logger = logging.getLogger(__name__)
+
+_active_packing_posting = ContextVar('packing_posting', default=None)
+
+
+class PackingPosting:
+    """
+    Acumula los movimientos de peso de lote y los ajustes de insumos de una
+    operación de empaque para escribirlos juntos: un bulk_create por modelo y un
+    UPDATE por lote en el libro de peso, dentro de una sola transacción.
+    """
+
+    def __init__(self):
+        self.weight_movements = []
+        self.adjustments = []
+
+    def add_weight_movement(self, package, weight, **source):
+        self.weight_movements.append(BatchWeightMovement(
+            batch_id=package.batch_id,
+            weight=weight,
+            source={"model": package.__class__.__name__, "id": package.pk, **source},
+        ))
+
+    def add_supply_adjustments(self, package, transaction_kind, transaction_category):
+        for supply in package.package_supplies:
+            self.adjustments.append(AdjustmentInventory(
+                transaction_kind=transaction_kind,
+                transaction_category=transaction_category,
+                supply=supply['supply'],
+                quantity=supply['quantity'],
+                organization_id=package.organization_id,
+            ))
+
+    def write(self):
+        if not self.weight_movements and not self.adjustments:
+            return
+        with transaction.atomic():
+            BatchWeightMovement.post_many(self.weight_movements)
+            AdjustmentInventory.objects.bulk_create(self.adjustments)
+        # bulk_create no envía post_save: se invalida aquí el dashboard que cuenta los ajustes
+        for organization_id in {adjustment.organization_id for adjustment in self.adjustments}:
+            invalidate_dashboard(organization_id)
+        logger.info(
+            "Packing posting: %s weight movements, %s supply adjustments",
+            len(self.weight_movements), len(self.adjustments),
+            extra={
+                'batch_ids': sorted({movement.batch_id for movement in self.weight_movements}),
+                'supply_adjustments': [
+                    (adjustment.transaction_kind, adjustment.supply_id, adjustment.quantity)
+                    for adjustment in self.adjustments
+                ],
+            },
+        )
+        self.weight_movements, self.adjustments = [], []
+
+
+@contextmanager
+def packing_posting():
+    """
+    Abre (o reutiliza, si ya hay una activa) la PackingPosting de la operación.
+    La más externa escribe todo al salir sin errores; así, guardar un pallet con
+    sus paquetes genera un solo lote de inserts en lugar de uno por insumo.
+    """
+    posting = _active_packing_posting.get()
+    if posting is not None:
+        yield posting
+        return
+
+    posting = PackingPosting()
+    token = _active_packing_posting.set(posting)
+    try:
+        yield posting
+    finally:
+        _active_packing_posting.reset(token)
+    posting.write()
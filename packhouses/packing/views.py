@@ -5,13 +5,57 @@ from django.template.loader import render_to_string
 from .models import PackerEmployee, PackerLabel
 from django.utils.timezone import now
 from django.views.decorators.csrf import csrf_exempt
+from django.conf import settings
+from django.core.cache import cache
 import qrcode
 from io import BytesIO
-import uuid
 import base64
 
 # Create your views here.
 
+def render_label_qr_images(payloads):
+    """
+    PNG en base64 del QR de cada payload de etiqueta. Todas las etiquetas de
+    una hoja tienen la misma longitud de payload, así que la versión del QR se
+    calcula una vez y el mismo QRCode se reutiliza. Las imágenes quedan en cache
+    por payload para las reimpresiones de etiquetas pendientes.
+    """
+    cache_keys = {f"packer_label_qr:{payload}": payload for payload in payloads}
+    qr_images = cache.get_many(list(cache_keys))
+
+    missing = {}
+    qr = None
+    for cache_key, payload in cache_keys.items():
+        if cache_key in qr_images:
+            continue
+        if qr is None:
+            qr = qrcode.QRCode()
+            qr.add_data(payload)
+            qr.make(fit=True)
+        else:
+            qr.clear()
+            qr.add_data(payload)
+            qr.make(fit=False)
+        qr_io = BytesIO()
+        qr.make_image().save(qr_io, format="PNG")
+        missing[cache_key] = qr_images[cache_key] = base64.b64encode(qr_io.getvalue()).decode("utf-8")
+    if missing:
+        cache.set_many(missing, settings.PACKER_LABEL_QR_CACHE_TIMEOUT)
+
+    return [qr_images[cache_key] for cache_key in cache_keys]
+
+
+def get_labels_context(employee, labels):
+    qr_images = render_label_qr_images([f"{employee.id}-{label.uuid}" for label in labels])
+    return [
+        {
+            "label_id": f"E_{employee.id}",
+            "qr_image_base64": qr_base64
+        }
+        for qr_base64 in qr_images
+    ]
+
+
 def generate_label_pdf(request, employee_id):
     employee = get_object_or_404(PackerEmployee, id=employee_id)
 
@@ -20,27 +64,7 @@ def generate_label_pdf(request, employee_id):
 
     current_datetime = now().strftime("%Y-%m-%d %H:%M:%S")
 
-    labels = []
-    for _ in range(quantity):
-        label_uuid = uuid.uuid4()
-
-        label = PackerLabel.objects.create(
-            employee=employee,
-            uuid=label_uuid,
-        )
-
-        qr_data = f"{employee.id}-{label_uuid}"
-        qr_image = qrcode.make(qr_data)
-        qr_label = f"E_{employee.id}"
-
-        qr_io = BytesIO()
-        qr_image.save(qr_io, format="PNG")
-        qr_base64 = base64.b64encode(qr_io.getvalue()).decode("utf-8")
-
-        labels.append({
-            "label_id": qr_label,
-            "qr_image_base64": qr_base64
-        })
+    labels = get_labels_context(employee, PackerLabel.issue(employee, quantity))
 
     html_string = render_to_string(
         "label_pdf.html",
@@ -66,21 +90,7 @@ def generate_pending_label_pdf(request, employee_id):
         return JsonResponse({"status": "error", "message": "No pending labels found"}, status=404)
 
     current_datetime = now().strftime("%Y-%m-%d %H:%M:%S")
-    labels = []
-
-    for label in pending_labels:
-        qr_data = f"{employee.id}-{label.uuid}"
-        qr_image = qrcode.make(qr_data)
-        qr_label = f"E_{employee.id}"
-
-        qr_io = BytesIO()
-        qr_image.save(qr_io, format="PNG")
-        qr_base64 = base64.b64encode(qr_io.getvalue()).decode("utf-8")
-
-        labels.append({
-            "label_id": qr_label,
-            "qr_image_base64": qr_base64
-        })
+    labels = get_labels_context(employee, pending_labels.only('uuid'))
 
     html_string = render_to_string(
         "label_pdf.html",
@@ -16,6 +16,6 @@ class PackingPalletViewSet(viewsets.ModelViewSet):
         if not user.is_authenticated:
             raise NotAuthenticated()
 
-        queryset = PackingPallet.objects.filter(product__organization=self.request.organization)
+        queryset = PackingPallet.objects.filter(product__organization=self.request.organization).with_list_columns()
 
         return queryset
@@ -1274,31 +1274,11 @@ class ServiceOrderAdmin(DisableLinksAdminMixin, ByOrganizationAdminMixin, admin.
             kwargs["queryset"] = Provider.objects.filter(category="service_provider", is_enabled=True)
 
         elif db_field.name == "batch":
-            now = timezone.now()
-            one_month_ago = now - timedelta(days=30)
-
-            # Filtramos los lotes por organización actual
-            org = getattr(request, 'organization', None)
-            if org:
-                batches = Batch.objects.filter(
-                    organization=org,
-                    parent__isnull=True
-                ).select_related('organization')
-            else:
-                batches = Batch.objects.all()
-
-            def is_batch_valid(batch):
-                last_status = batch.last_status_change()
-                if not last_status:
-                    return False  # Si no hay historial quiere decir que esta pendiente (open), entonces pasa
-                if last_status.new_status in ['canceled', 'open']:
-                    return False
-                if last_status.new_status == 'closed' and last_status.created_at < one_month_ago:
-                    return False
-                return True
-
-            valid_batches = [b.pk for b in batches if is_batch_valid(b)]
-            kwargs["queryset"] = Batch.objects.filter(pk__in=valid_batches)
+            # Lotes listos o cerrados durante el último mes
+            kwargs["queryset"] = Batch.objects.eligible(
+                getattr(request, 'organization', None),
+                closed_since=timezone.now() - timedelta(days=30),
+            )
 
         elif db_field.name == "service":
             provider_id = request.GET.get('provider') or request.POST.get('provider')
@@ -1681,35 +1661,13 @@ class FruitPurchaseOrderAdmin(DisableLinksAdminMixin, ByOrganizationAdminMixin,
         Filtra proveedores disponibles según la organización activa y el estado del lote (batch).
         """
         if db_field.name == "batch" and hasattr(request, 'organization'):
-            org = getattr(request, 'organization', None)
-            if org:
-                batches = Batch.objects.filter(
-                    organization=org,
-                    parent__isnull=True
-                ).select_related('organization')
-            else:
-                batches = Batch.objects.all()
-
-            def is_batch_valid(batch):
-                last_status = batch.last_status_change()
-                if not last_status:
-                    return False
-                if last_status.new_status in ['canceled', 'open']:
-                    return False
-                if last_status.new_status == 'closed':
-                    return False
-                return True
-
-            # Batches ya usados por este modelo
-            used_batch_ids = self.model.objects.values_list('batch_id', flat=True)
-
-            # Filtra por estado y uso
-            valid_batch_ids = [
-                b.pk for b in batches
-                if is_batch_valid(b) and b.pk not in used_batch_ids
-            ]
-
-            kwargs["queryset"] = Batch.objects.filter(pk__in=valid_batch_ids)
+            # Lotes listos que aún no tienen orden de compra de fruta
+            kwargs["queryset"] = Batch.objects.eligible(request.organization).exclude(
+                pk__in=self.model.objects.values('batch_id')
+            ).select_related(
+                'incomingproduct__scheduleharvest__product_provider',
+                'incomingproduct__scheduleharvest__orchard__producer',
+            )
 
             formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
 
@@ -21,6 +21,7 @@ from django.contrib.auth import get_user_model
 import datetime
 User = get_user_model()
 from common.base.settings import SUPPLY_MEASURE_UNIT_CATEGORY_CHOICES
+from common.base.sequences import allocate_ooid
 from django.db.models import Sum
 from decimal import Decimal, ROUND_HALF_UP
 from django.core.exceptions import ValidationError
@@ -62,17 +63,14 @@ class Requisition(models.Model):
 
     def save(self, *args, **kwargs):
         user = kwargs.pop('user_id', None)
-        if not self.ooid:
-            # Usar transacción y bloqueo de fila para evitar condiciones de carrera
-            with transaction.atomic():
-                last_order = Requisition.objects.select_for_update().filter(organization=self.organization).order_by(
-                    '-ooid').first()
-                self.ooid = (last_order.ooid + 1) if last_order and last_order.ooid is not None else 1
-
         if user:
             self.user = user
 
-        super().save(*args, **kwargs)
+        # El folio se reserva en la misma transacción del guardado para no dejar huecos
+        with transaction.atomic():
+            if not self.ooid:
+                self.ooid = allocate_ooid(Requisition, organization_id=self.organization_id)
+            super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = _("Requisition")
@@ -201,17 +199,13 @@ class PurchaseOrder(models.Model):
         mediante el parámetro `user_id`.
         """
         user = kwargs.pop('user_id', None)
-        if not self.ooid:
-            with transaction.atomic():
-                last_order = PurchaseOrder.objects.select_for_update().filter(
-                    organization=self.organization
-                ).order_by('-ooid').first()
-                self.ooid = (last_order.ooid + 1) if last_order and last_order.ooid is not None else 1
-
         if user:
             self.user = user
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.ooid:
+                self.ooid = allocate_ooid(PurchaseOrder, organization_id=self.organization_id)
+            super().save(*args, **kwargs)
 
     def simulate_balance(self):
         """
@@ -686,14 +680,10 @@ class ServiceOrder(models.Model):
         Guarda la orden de servicio, asegurando la asignación de un folio único incremental (ooid)
         de manera transaccional por organización.
         """
-        if not self.ooid:
-            with transaction.atomic():
-                last_order = ServiceOrder.objects.select_for_update().filter(
-                    organization=self.organization
-                ).order_by('-ooid').first()
-                self.ooid = (last_order.ooid + 1) if last_order and last_order.ooid is not None else 1
-
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.ooid:
+                self.ooid = allocate_ooid(ServiceOrder, organization_id=self.organization_id)
+            super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         """
@@ -993,14 +983,10 @@ class PurchaseMassPayment(models.Model):
         Guarda la orden de servicio, asegurando la asignación de un folio único incremental (ooid)
         de manera transaccional por organización.
         """
-        if not self.ooid:
-            with transaction.atomic():
-                last_order = PurchaseMassPayment.objects.select_for_update().filter(
-                    organization=self.organization
-                ).order_by('-ooid').first()
-                self.ooid = (last_order.ooid + 1) if last_order and last_order.ooid is not None else 1
-
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.ooid:
+                self.ooid = allocate_ooid(PurchaseMassPayment, organization_id=self.organization_id)
+            super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = _("Mass Payment")
@@ -1052,14 +1038,10 @@ class FruitPurchaseOrder(models.Model):
         return f"{_('Order')} #{self.ooid} – {_('Batch')}: {self.batch.ooid}"
 
     def save(self, *args, **kwargs):
-        if not self.ooid and self.organization:
-            with transaction.atomic():
-                last_order = FruitPurchaseOrder.objects.select_for_update().filter(
-                    organization=self.organization
-                ).order_by('-ooid').first()
-                self.ooid = (last_order.ooid + 1) if last_order and last_order.ooid else 1
-
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.ooid and self.organization_id:
+                self.ooid = allocate_ooid(FruitPurchaseOrder, organization_id=self.organization_id)
+            super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = _("Fruit Purchase Order")
@@ -1221,10 +1203,8 @@ class FruitPurchaseOrderReceipt(models.Model):
             self.total_cost = self.quantity * self.unit_price
 
             if is_new:
-                last_order = FruitPurchaseOrderReceipt.objects.select_for_update().filter(
-                    fruit_purchase_order=self.fruit_purchase_order
-                ).order_by('-ooid').first()
-                self.ooid = (last_order.ooid + 1) if last_order and last_order.ooid is not None else 1
+                self.ooid = allocate_ooid(FruitPurchaseOrderReceipt,
+                                          fruit_purchase_order_id=self.fruit_purchase_order_id)
 
             super().save(*args, **kwargs)  # PRIMERO guarda la instancia
 
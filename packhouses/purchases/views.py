@@ -1,13 +1,12 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils.translation import gettext as _
-from .models import (Requisition, RequisitionSupply, Country, Region, SubRegion, City, PurchaseOrder, PurchaseOrderSupply,
+from .models import (Requisition, RequisitionSupply, PurchaseOrder, PurchaseOrderSupply,
                      PurchaseOrderCharge, PurchaseOrderDeduction, FruitPurchaseOrderReceipt)
 from packhouses.catalogs.models import HarvestingCrew
-from django.template.loader import render_to_string
 from django.http import HttpResponse
-from weasyprint import HTML, CSS
-from io import BytesIO
+from common.base.reports import render_pdf_response
+from common.profiles.utils import get_request_report_header
 from datetime import datetime
 from django.db.models import Prefetch
 from django.utils.text import capfirst
@@ -20,7 +19,6 @@ from django.views import View
 from django.db import transaction
 from django.utils import timezone
 from .models import PurchaseMassPayment, PurchaseOrderPayment, ServiceOrderPayment
-from .utils import get_name
 
 def requisition_pdf(request, requisition_id):
     # Redirige al login del admin usando 'reverse' si el usuario no está autenticado.
@@ -35,24 +33,11 @@ def requisition_pdf(request, requisition_id):
         organization=request.organization
     )
 
-    # Obtener Datos de la Organización
-    if hasattr(request, 'organization'):
-        organization = request.organization.organizationprofile.name
-        add =  request.organization.organizationprofile.address
-        organization_profile = request.organization.organizationprofile
-
-        # Obtener los nombres de las regiones
-        city_name = get_name(SubRegion, organization_profile.city_id, "City")
-        country_name = get_name(Country, organization_profile.country_id, "Country")
-        state_name = get_name(Region, organization_profile.state_id, "State")
-        district_name = get_name(City, organization_profile.district_id, "District")
-        if organization_profile.logo:
-            logo_url = organization_profile.logo.url
-        else:
-            logo_url = None
+    report_header = get_request_report_header(request)
     pdf_title = f"{capfirst(Requisition._meta.verbose_name)}"
-    packhouse_name = organization
-    company_address = f"{add}, {district_name}, {city_name}, {state_name}, {country_name}"
+    packhouse_name = report_header['name']
+    company_address = report_header['address']
+    logo_url = report_header['logo_url']
     date = datetime.now()
     year = date.year
 
@@ -60,11 +45,10 @@ def requisition_pdf(request, requisition_id):
     requisitionsupplyinline = RequisitionSupply.objects.filter(requisition=requisition)
 
     # CSS
-    base_url = request.build_absolute_uri('/')
-    css = CSS(string='''
+    css = '''
         @page {
             size: letter portrait;
-        }''')
+        }'''
 
     request_text = _("We hereby request the Purchasing Operations Department to acquire the necessary supplies as detailed in this document.")
 
@@ -72,7 +56,8 @@ def requisition_pdf(request, requisition_id):
     applicant_email = requisition.user.email or ""
 
     # Renderizar el template HTML
-    html_string = render_to_string('admin/packhouses/sales-order-requisition-report.html', {
+    filename = f"{_('requisition')}_{requisition.ooid}.pdf"
+    return render_pdf_response(request, 'admin/packhouses/sales-order-requisition-report.html', {
         'packhouse_name': packhouse_name,
         'company_address': company_address,
         'pdf_title': pdf_title,
@@ -84,21 +69,7 @@ def requisition_pdf(request, requisition_id):
         'request_text': request_text,
         'applicant_name': applicant_name,
         'applicant_email': applicant_email,
-    })
-
-    # Convertir el HTML a PDF
-    html = HTML(string=html_string, base_url=base_url)
-    pdf_buffer = BytesIO()
-    html.write_pdf(pdf_buffer, stylesheets=[css],)
-
-    # Traducir el nombre del archivo manualmente
-    filename = f"{_('requisition')}_{requisition.ooid}.pdf"
-
-    # Devolver el PDF como respuesta
-    pdf_buffer.seek(0)
-    response = HttpResponse(pdf_buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="{filename}"'
-    return response
+    }, filename, stylesheets=[css])
 
 
 def set_requisition_ready(request, requisition_id):
@@ -135,24 +106,11 @@ def purchase_order_supply_pdf(request, purchase_order_supply_id):
         pk=purchase_order_supply_id,
         organization=request.organization
     )
-    # Obtener Datos de la Organización
-    if hasattr(request, 'organization'):
-        organization = request.organization.organizationprofile.name
-        add = request.organization.organizationprofile.address
-        organization_profile = request.organization.organizationprofile
-
-        # Obtener los nombres de las regiones
-        city_name = get_name(SubRegion, organization_profile.city_id, "City")
-        country_name = get_name(Country, organization_profile.country_id, "Country")
-        state_name = get_name(Region, organization_profile.state_id, "State")
-        district_name = get_name(City, organization_profile.district_id, "District")
-        if organization_profile.logo:
-            logo_url = organization_profile.logo.url
-        else:
-            logo_url = None
+    report_header = get_request_report_header(request)
     pdf_title = f"{capfirst(PurchaseOrder._meta.verbose_name)}"
-    packhouse_name = organization
-    company_address = f"{add}, {district_name}, {city_name}, {state_name}, {country_name}"
+    packhouse_name = report_header['name']
+    company_address = report_header['address']
+    logo_url = report_header['logo_url']
     date = datetime.now()
     year = date.year
 
@@ -211,11 +169,10 @@ def purchase_order_supply_pdf(request, purchase_order_supply_id):
     currency = purchase_order_supply.currency.code
 
     # CSS
-    base_url = request.build_absolute_uri('/')
-    css = CSS(string='''
+    css = '''
         @page {
             size: letter portrait;
-        }''')
+        }'''
 
 
     applicant_name = f"{purchase_order_supply.user.first_name or ''} {purchase_order_supply.user.last_name or ''}".strip()
@@ -226,7 +183,8 @@ def purchase_order_supply_pdf(request, purchase_order_supply_id):
     order_date_text = _("Order date")
 
     # Renderizar el template HTML
-    html_string = render_to_string('admin/packhouses/purchase-order-supply.html', {
+    filename = f"{_('purchase_order')}_{purchase_order_supply.ooid}.pdf"
+    return render_pdf_response(request, 'admin/packhouses/purchase-order-supply.html', {
         'packhouse_name': packhouse_name,
         'company_address': company_address,
         'pdf_title': pdf_title,
@@ -249,21 +207,7 @@ def purchase_order_supply_pdf(request, purchase_order_supply_id):
         'order_date_text': order_date_text,
         'formatted_charge_values': formatted_charge_values,
         'formatted_deduction_values': formatted_deduction_values,
-    })
-
-    # Convertir el HTML a PDF
-    html = HTML(string=html_string, base_url=base_url)
-    pdf_buffer = BytesIO()
-    html.write_pdf(pdf_buffer, stylesheets=[css], )
-
-    # Traducir el nombre del archivo manualmente
-    filename = f"{_('purchase_order')}_{purchase_order_supply.ooid}.pdf"
-
-    # Devolver el PDF como respuesta
-    pdf_buffer.seek(0)
-    response = HttpResponse(pdf_buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="{filename}"'
-    return response
+    }, filename, stylesheets=[css])
 
 def set_purchase_order_supply_ready(request, purchase_order_supply_id):
     # Obtener el registro
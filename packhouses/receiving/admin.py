@@ -1,5 +1,5 @@
 from django.contrib import admin, messages
-from packhouses.receiving.views import weighing_set_report, export_weighing_labels, export_batch_record
+from packhouses.receiving.views import weighing_set_report, export_weighing_labels, export_batch_record, render_weighing_labels
 from packhouses.gathering.models import ScheduleHarvest, ScheduleHarvestHarvestingCrew, ScheduleHarvestVehicle, ScheduleHarvestContainerVehicle
 from packhouses.catalogs.models import (Supply, HarvestingCrew, Vehicle, Provider, Product, ProductVariety, Gatherer, Maquiladora,
                                         Market, Orchard, OrchardCertification, WeighingScale, ProductPhenologyKind, ProductHarvestSizeKind, ProductDryMatterAcceptanceReport,
@@ -508,7 +508,7 @@ class IncomingProductAdmin(SheetReportExportAdminMixin, IncomingProductMetricsMi
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        return qs.annotate(total_net_weight_sum=Sum('weighingset__net_weight'))
+        return qs.with_list_columns().with_weighing_totals()
 
     def get_total_net_weight(self, obj):
         return obj.total_net_weight_sum
@@ -683,12 +683,15 @@ class BatchAdmin(SheetReportExportAdminMixin, ByOrganizationAdminMixin, BatchDis
     report_function = staticmethod(basic_report)
     resource_classes = [BatchResource]
     actions = ['action_merge_batches', 'action_merge_into_existing_batch', 'action_unmerge_all_batches',
-               'action_unmerge_selected_batches']
+               'action_unmerge_selected_batches', 'action_print_weighing_labels']
     admin.site.disable_action('delete_selected')
 
     def has_add_permission(self, request):
         return False
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_list_columns()
+
     def get_weight_fields(self, is_parent):
         base = ['display_own_weight_received', 'display_own_net_received']
         extra = ['display_weight_received', 'display_available_weight'] if is_parent else []
@@ -712,17 +715,12 @@ class BatchAdmin(SheetReportExportAdminMixin, ByOrganizationAdminMixin, BatchDis
             )
             return
 
-        qs = queryset.select_related('incomingproduct__scheduleharvest')
-
-        # Validar provider/product/variety/phenology/status
+        # Valida provider/product/variety/phenology/status y une en la misma transacción
         try:
-            Batch.validate_merge_batches(qs)
+            parent_batch = Batch.merge_batches(queryset).parent
         except ValidationError as e:
             self.message_user(request, e.message, level=messages.ERROR)
             return
-
-        try:
-            parent_batch = Batch.merge_batches(qs)
         except Exception as e:
             self.message_user(
                 request,
@@ -756,8 +754,6 @@ class BatchAdmin(SheetReportExportAdminMixin, ByOrganizationAdminMixin, BatchDis
                 level=messages.WARNING
             )
             return
-        qs = queryset.select_related('incomingproduct__scheduleharvest')
-
         possible_parents = queryset.filter(
             parent__isnull=True,
             children__isnull=False
@@ -780,11 +776,12 @@ class BatchAdmin(SheetReportExportAdminMixin, ByOrganizationAdminMixin, BatchDis
             return
 
         parent = possible_parents.first()
-        children_to_add = qs.exclude(pk=parent.pk)
+        children_to_add = queryset.exclude(pk=parent.pk)
 
-        # Validar los lotes por añadir con los que ya fueron unidos
+        # Validar los lotes por añadir con los que ya fueron unidos y unirlos al lote existente
+        # dentro de una transacción
         try:
-            Batch.validate_add_batches_to_existing_merge(parent, children_to_add)
+            Batch.add_batches_to_merge(parent, children_to_add)
         except ValidationError as e:
             self.message_user(
                 request,
@@ -792,10 +789,6 @@ class BatchAdmin(SheetReportExportAdminMixin, ByOrganizationAdminMixin, BatchDis
                 level=messages.ERROR
             )
             return
-
-        # Unir lotes al lote existente dentro de una transacción
-        try:
-            Batch.add_batches_to_merge(parent, children_to_add)
         except Exception as e:
             self.message_user(
                 request,
@@ -844,8 +837,9 @@ class BatchAdmin(SheetReportExportAdminMixin, ByOrganizationAdminMixin, BatchDis
     @admin.action(description=_('Unmerge selected batches from parent.'))
     def action_unmerge_selected_batches(self, request, queryset):
         try:
-            Batch.unmerge_selected_children(queryset)
-            ooids = ', '.join(str(batch.ooid) for batch in queryset)
+            result = Batch.unmerge_selected_children(queryset)
+            ooids = ', '.join(str(ooid) for ooid in Batch.objects.filter(pk__in=result.children_ids)
+                              .order_by('ooid').values_list('ooid', flat=True))
             self.message_user(
                 request,
                 _('The following batches were successfully unmerged: %(ooids)s.') % {'ooids': ooids},
@@ -858,6 +852,10 @@ class BatchAdmin(SheetReportExportAdminMixin, ByOrganizationAdminMixin, BatchDis
                 level=messages.ERROR
             )
 
+    @admin.action(description=_('Print weighing set labels of selected batches'))
+    def action_print_weighing_labels(self, request, queryset):
+        return render_weighing_labels(request, queryset.filter(incomingproduct__isnull=False), request.organization.id)
+
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
@@ -1475,6 +1473,13 @@ class FoodSafetyAdmin(ByOrganizationAdminMixin, nested_admin.NestedModelAdmin):
             return [f for f in fields if f != 'status']
         return fields
 
+    def save_formset(self, request, form, formset, change):
+        # Las estadísticas de Average se recalculan una vez por formset de muestras, no por fila
+        if formset.model in (DryMatter, InternalInspection):
+            with transaction.atomic(), Average.deferred_stats():
+                return super().save_formset(request, form, formset, change)
+        return super().save_formset(request, form, formset, change)
+
     def get_form(self, request, obj=None, **kwargs):
         form = super().get_form(request, obj, **kwargs)
 
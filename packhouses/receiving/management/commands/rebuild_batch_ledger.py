@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from packhouses.receiving.models import Batch, BatchWeightLedger
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized batch weight ledger from BatchWeightMovement.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', type=int, help='Only rebuild batches of this organization id.')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Batches rebuilt per transaction.')
+
+    def handle(self, *args, **options):
+        batches = Batch.objects.order_by('pk')
+        if options['organization']:
+            batches = batches.filter(organization_id=options['organization'])
+
+        batch_ids = list(batches.values_list('pk', flat=True))
+        chunk_size = options['chunk_size']
+        rebuilt = 0
+        for start in range(0, len(batch_ids), chunk_size):
+            with transaction.atomic():
+                rebuilt += BatchWeightLedger.rebuild(Batch.objects.filter(pk__in=batch_ids[start:start + chunk_size]))
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt weight ledger for {rebuilt} batches.'))
@@ -3,22 +3,147 @@ from organizations.models import Organization
 from django.utils.translation import gettext_lazy as _
 import datetime
 from django.core.validators import MinValueValidator, MaxValueValidator
-from .utils import get_processing_status_choices, get_batch_status_change
+from .utils import get_processing_status_choices, get_batch_status_change, is_ingress_weight_source
 from packhouses.catalogs.models import (WeighingScale, Supply, HarvestingCrew, Provider, ProductFoodSafetyProcess,
                                         Product, Vehicle, ProductPest, ProductDisease, ProductPhysicalDamage,
                                         OrchardCertification,
                                         ProductResidue, ProductDryMatterAcceptanceReport, Orchard, Market)
 from common.base.models import Pest
-from django.db.models import F, Sum
+from common.base.sequences import allocate_ooid, lock_ooid_counter, reset_ooid_counter
+from django.db.models import F, Sum, Count, Q, OuterRef, Subquery, Value, Prefetch, Min, Max, Case, When
+from django.db.models.functions import Cast, Coalesce, Round
+from django.db.models.lookups import GreaterThan
 from django.core.exceptions import ValidationError
 from common.settings import STATUS_CHOICES
+from common.mixins import TrackedFieldsMixin
 import uuid
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
 
 
 # Create your models here.
 
 
-class Batch(models.Model):
+SCHEDULE_HARVEST_LIST_RELATIONS = (
+    'orchard__producer', 'product', 'product_provider', 'product_variety', 'product_phenology',
+    'product_ripeness', 'market',
+)
+
+
+# Campos del corte que deben coincidir entre los lotes de un mismo grupo
+MERGE_PATH_PREFIX = 'incomingproduct__scheduleharvest__'
+MERGE_CONSISTENCY_FIELDS = (
+    ('product_provider', _('provider')),
+    ('product', _('product')),
+    ('product_variety', _('variety')),
+    ('product_phenology', _('phenology')),
+)
+
+# Resultado de unir/separar lotes: lote padre, ids de los hijos afectados y
+# los BatchStatusChange registrados
+BatchMergeResult = namedtuple('BatchMergeResult', ['parent', 'children_ids', 'status_changes'])
+
+
+def invalidate_member_dashboards(*organization_ids):
+    """
+    Los UPDATE en bloque no mandan post_save: invalida aquí los contadores del
+    dashboard de las organizaciones afectadas.
+    """
+    # members.utils importa estos modelos
+    from packhouses.members.utils import invalidate_dashboard
+    for organization_id in set(organization_ids):
+        if organization_id:
+            invalidate_dashboard(organization_id)
+
+
+class BatchQuerySet(models.QuerySet):
+    def with_list_columns(self):
+        """
+        Carga en un número fijo de consultas todo lo que muestran las columnas
+        del changelist (BatchDisplayMixin): corte, huerta, productor, producto,
+        libro de pesos, padre e hijos.
+        """
+        return self.select_related(
+            'weight_ledger', 'parent',
+            *[f'incomingproduct__scheduleharvest__{relation}' for relation in SCHEDULE_HARVEST_LIST_RELATIONS],
+        ).prefetch_related(
+            Prefetch('children', queryset=Batch.objects.only('pk', 'ooid', 'parent_id').order_by('ooid')),
+        )
+
+    def with_last_status_change(self):
+        """
+        Anota la fecha del último cambio de status (last_status_changed_at) con una
+        subconsulta por lote que resuelve el índice (batch, field_name, created_at)
+        de BatchStatusChange, en lugar de llamar last_status_change() por lote.
+        """
+        last_change = (
+            BatchStatusChange.objects
+            .filter(batch=OuterRef('pk'), field_name='status')
+            .order_by('-created_at')
+        )
+        return self.annotate(
+            last_status_changed_at=Subquery(last_change.values('created_at')[:1]),
+        )
+
+    def eligible(self, organization, statuses=('ready',), closed_since=None):
+        """
+        Lotes padre de la organización que pueden elegirse en los selectores de
+        otros módulos (compras, empaque) según su status actual. Con closed_since
+        también se incluyen los lotes cerrados a partir de esa fecha.
+        """
+        queryset = self.filter(organization=organization, parent__isnull=True)
+        condition = Q(status__in=statuses)
+        if closed_since is not None:
+            queryset = queryset.with_last_status_change()
+            condition |= Q(status='closed', last_status_changed_at__gte=closed_since)
+        return queryset.filter(condition)
+
+
+class IncomingProductQuerySet(models.QuerySet):
+    def _relation_total(self, expression, output_field):
+        subquery = (
+            self.model.objects.filter(pk=OuterRef('pk'))
+            .values('pk')
+            .annotate(total=expression)
+            .values('total')
+        )
+        return Coalesce(Subquery(subquery, output_field=output_field), Value(0), output_field=output_field)
+
+    def with_weighing_totals(self):
+        """
+        Anota los totales de pesadas y contenedores que usa IncomingProductMetricsMixin,
+        con una subconsulta por total en lugar de recorrer weighingset_set por fila.
+        """
+        vehicle_containers = 'scheduleharvest__scheduleharvestvehicle__scheduleharvestcontainervehicle__'
+        has_arrived = Q(scheduleharvest__scheduleharvestvehicle__has_arrived=True)
+        return self.annotate(
+            annotated_weighed_sets_count=self._relation_total(
+                Count('weighingset', distinct=True), models.IntegerField()),
+            annotated_containers_count=self._relation_total(
+                Sum('weighingset__weighingsetcontainer__quantity'), models.IntegerField()),
+            annotated_total_net_weight=self._relation_total(
+                Sum('weighingset__net_weight'), models.FloatField()),
+            annotated_assigned_container_total=self._relation_total(
+                Sum(vehicle_containers + 'quantity'), models.IntegerField()),
+            annotated_full_container_total=self._relation_total(
+                Sum(vehicle_containers + 'full_containers', filter=has_arrived), models.IntegerField()),
+            annotated_empty_container_total=self._relation_total(
+                Sum(vehicle_containers + 'empty_containers', filter=has_arrived), models.IntegerField()),
+            annotated_missing_container_total=self._relation_total(
+                Sum(vehicle_containers + 'missing_containers', filter=has_arrived), models.IntegerField()),
+        )
+
+    def with_list_columns(self):
+        return self.select_related(
+            *[f'scheduleharvest__{relation}' for relation in SCHEDULE_HARVEST_LIST_RELATIONS],
+        ).annotate(
+            total_net_weight_sum=self._relation_total(Sum('weighingset__net_weight'), models.FloatField()),
+        )
+
+
+class Batch(TrackedFieldsMixin, models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     ooid = models.PositiveIntegerField(verbose_name=_('Batch ID'), null=True, blank=True)
     status = models.CharField(max_length=25, verbose_name=_('Status'),
@@ -29,6 +154,10 @@ class Batch(models.Model):
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='children',
                                verbose_name=_('Parent'))
 
+    objects = BatchQuerySet.as_manager()
+
+    tracked_fields = ('status',)
+
     def __str__(self):
         incoming = getattr(self, 'incomingproduct', None)
 
@@ -97,42 +226,40 @@ class Batch(models.Model):
             'export': round((export_weight / total_weight) * 100, 2),
         }
 
+    # Los pesos se leen del libro mayor desnormalizado (BatchWeightLedger),
+    # que se mantiene al registrar BatchWeightMovement y al unir/separar lotes.
+    # Los lotes anteriores al libro que aún no pasan por rebuild_batch_ledger se
+    # calculan en memoria, sin escribir desde una lectura.
+    @property
+    def ledger(self):
+        try:
+            return self.weight_ledger
+        except BatchWeightLedger.DoesNotExist:
+            if not hasattr(self, '_computed_ledger'):
+                self._computed_ledger = BatchWeightLedger.compute({self.pk})[self.pk]
+            return self._computed_ledger
+
     @property
     def individual_ingress_weight(self):
-        if self.batchweightmovement_set.exists():
-            return self.batchweightmovement_set.aggregate(
-                batch_weight=Sum('weight')
-            )['batch_weight']
-        return 0
+        return self.ledger.available_weight
 
     @property
     def family_ingress_weight(self):
-        qs = self.batchweightmovement_set.filter(source__model__icontains='weighingset')
-        total_weight = qs.aggregate(ingress_weight=Sum('weight'))['ingress_weight'] or 0
-        if self.is_parent:
-            total_weight += sum(child.individual_ingress_weight for child in self.children.all())
-        return total_weight
+        return self.ledger.ingress_weight + self.ledger.children_available_weight
 
     @property
     def available_weight(self):
-        total_weight = self.individual_ingress_weight
-        if self.is_parent:
-            total_weight += sum(child.individual_ingress_weight for child in self.children.all())
-        return total_weight
+        return self.ledger.available_weight + self.ledger.children_available_weight
 
     # Peso recibido propio (sin hijos), para el admin
     @property
     def self_weighing_weight(self):
-        return self.batchweightmovement_set.filter(
-            source__model__icontains='weighingset'
-        ).aggregate(total=Sum('weight'))['total'] or 0
+        return self.ledger.ingress_weight
 
     # Peso disponible propio (sin hijos), para el admin
     @property
     def self_available_weight(self):
-        return self.batchweightmovement_set.aggregate(
-            total=Sum('weight')
-        )['total'] or 0
+        return self.ledger.available_weight
 
     @property
     def yield_orchard_producer(self):
@@ -180,7 +307,7 @@ class Batch(models.Model):
     # @property para lotes padres e hijos
     @property
     def is_child(self):
-        return self.parent is not None
+        return self.parent_id is not None
 
     @property
     def is_parent(self):
@@ -211,16 +338,14 @@ class Batch(models.Model):
                 raise ValidationError(errors)
 
     def save(self, *args, **kwargs):
-        if self.ooid is None:
-            with transaction.atomic():
-                last = (
-                    Batch.objects
-                    .filter(organization=self.organization)
-                    .order_by('-ooid')
-                    .first()
-                )
-                self.ooid = (last.ooid + 1) if last else 1
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            adding = self._state.adding
+            if self.ooid is None:
+                self.ooid = allocate_ooid(Batch, organization_id=self.organization_id)
+            super().save(*args, **kwargs)
+            if adding:
+                # El libro se crea junto con el lote para no escribirlo al leer los pesos
+                BatchWeightLedger.objects.get_or_create(batch=self)
 
     # Métodos para historial de status del lote
     def status_history(self):
@@ -229,50 +354,68 @@ class Batch(models.Model):
     def last_status_change(self):
         return self.status_history().order_by('-created_at').first()
 
+    # Resumen de invariantes para unir lotes, en una sola consulta agregada
+    @classmethod
+    def _merge_summary(cls, batches_queryset, **extra):
+        aggregates = {
+            'markets': Count(MERGE_PATH_PREFIX + 'market', distinct=True),
+            'non_mixable_markets': Count(MERGE_PATH_PREFIX + 'market', distinct=True,
+                                         filter=Q(**{MERGE_PATH_PREFIX + 'market__is_mixable': False})),
+        }
+        for field, label in MERGE_CONSISTENCY_FIELDS:
+            path = MERGE_PATH_PREFIX + field
+            aggregates[f'{field}_values'] = Count(path, distinct=True)
+            aggregates[f'{field}_nulls'] = Count('pk', distinct=True, filter=Q(**{f'{path}__isnull': True}))
+        aggregates.update(extra)
+        return batches_queryset.order_by().aggregate(**aggregates)
+
+    @classmethod
+    def _inconsistent_merge_label(cls, summary):
+        # NULL cuenta como un valor más, igual que values_list(...).distinct()
+        for field, label in MERGE_CONSISTENCY_FIELDS:
+            if summary[f'{field}_values'] + (1 if summary[f'{field}_nulls'] else 0) != 1:
+                return label
+        return None
+
     # Validar lotes para crear un padre
     @classmethod
     def validate_merge_batches(cls, batches_queryset):
+        summary = cls._merge_summary(
+            batches_queryset,
+            merged_children=Count('pk', distinct=True, filter=Q(parent__isnull=False)),
+            merged_parents=Count('children', distinct=True),
+            not_ready=Count('pk', distinct=True, filter=~Q(status='ready')),
+        )
+
         # Validar que los lotes seleccionados no sean hijos
-        if batches_queryset.filter(parent__isnull=False).exists():
+        if summary['merged_children']:
             raise ValidationError(
                 _('You cannot merge batches that have already been merged into another batch.'),
                 code='invalid_merge'
             )
 
         # Validar que ningun lote seleccionado sea padre
-        if batches_queryset.filter(parent__isnull=True, children__isnull=False).exists():
+        if summary['merged_parents']:
             raise ValidationError(
                 _('You cannot merge batches that already contain other merged batches.'),
                 code='invalid_merge'
             )
 
         # Validar que los lotes seleccionados tenga en su status "ready"
-        if batches_queryset.exclude(status='ready').exists():
+        if summary['not_ready']:
             raise ValidationError(
                 _('Only batches with a Review Status of “Ready” can be merged.'),
                 code='invalid_status'
             )
 
         # Verificar que los lotes sean del mismo proveedor, producto, variedad, fenología
-        prefix = 'incomingproduct__scheduleharvest__'
-        checks = {
-            _('provider'): prefix + 'product_provider',
-            _('product'): prefix + 'product',
-            _('variety'): prefix + 'product_variety',
-            _('phenology'): prefix + 'product_phenology',
-        }
-
-        for label, path in checks.items():
-            if batches_queryset.values_list(path, flat=True).distinct().count() != 1:
-                msg = _('All batches selected must have the same %(label)s.') % {'label': label}
-                raise ValidationError(msg, code='invalid_merge')
+        label = cls._inconsistent_merge_label(summary)
+        if label is not None:
+            msg = _('All batches selected must have the same %(label)s.') % {'label': label}
+            raise ValidationError(msg, code='invalid_merge')
 
         # Verificar que los lotes a unir, sus mercados permitan mezclarse
-        market_ids = batches_queryset.values_list('incomingproduct__scheduleharvest__market', flat=True).distinct()
-        markets = Market.objects.filter(pk__in=market_ids)
-        non_mixable_markets = markets.filter(is_mixable=False)
-
-        if markets.count() > 1 and non_mixable_markets.exists():
+        if summary['markets'] > 1 and summary['non_mixable_markets']:
             raise ValidationError(
                 _('Cannot merge batches: non-mixable markets cannot be mixed with others.'),
                 code='invalid_market_mix'
@@ -281,130 +424,161 @@ class Batch(models.Model):
     # Unir lotes para crear un padre
     @classmethod
     def merge_batches(cls, batches_queryset):
-        cls.validate_merge_batches(batches_queryset)
-
+        """
+        Une los lotes seleccionados bajo el de ooid más grande. Bloquea los lotes,
+        valida con una consulta agregada y asigna el padre con un solo UPDATE.
+        Regresa un BatchMergeResult.
+        """
         with transaction.atomic():
+            locked = list(
+                Batch.objects.select_for_update()
+                .filter(pk__in=batches_queryset.order_by().values('pk'))
+                .order_by('-ooid').values_list('pk', flat=True)
+            )
+            batches = Batch.objects.filter(pk__in=locked)
+            cls.validate_merge_batches(batches)
+
             # Elegir el lote con el ooid más grande como padre
-            parent_batch = batches_queryset.order_by('-ooid').first()
+            parent_batch = Batch.objects.get(pk=locked[0])
+            children_ids = locked[1:]
 
             # Asignar a los demás como hijos
-            for batch in batches_queryset:
-                if batch != parent_batch:
-                    batch.parent = parent_batch
-                    batch.save(update_fields=['parent'])
+            Batch.objects.filter(pk__in=children_ids).update(parent=parent_batch)
+            invalidate_member_dashboards(parent_batch.organization_id)
 
-            return parent_batch
+            BatchWeightLedger.refresh_children_weight([parent_batch.pk])
+            return BatchMergeResult(parent_batch, children_ids, [])
 
     # Validar para unir un lote (no hijo) a un lote padre
     @classmethod
     def validate_add_batches_to_existing_merge(cls, parent, candidate_batches):
         # Verificar que el lote padre no sea hijo
-        if parent.parent is not None:
+        if parent.parent_id is not None:
             raise ValidationError(
                 _('The selected destination batch is already merged into another batch.'),
                 code='invalid_target'
             )
+
+        # Se validan los hijos actuales del lote padre junto con los lotes seleccionados
+        candidate_ids = candidate_batches.order_by().values('pk')
+        is_candidate = Q(pk__in=candidate_ids)
+        summary = cls._merge_summary(
+            Batch.objects.filter(Q(parent=parent) | is_candidate),
+            already_merged=Count('pk', distinct=True, filter=is_candidate & Q(parent__isnull=False)),
+            not_ready=Count('pk', distinct=True, filter=is_candidate & ~Q(status='ready')),
+        )
+
         # Verificar que los lotes seleccionados no sean hijos de otro lote que no sea el lote padre que se seleccione
-        already_merged = candidate_batches.filter(parent__isnull=False)
-        if already_merged.exists():
+        if summary['already_merged']:
+            already_merged = Batch.objects.filter(is_candidate, parent__isnull=False).order_by('ooid')
             oids = ", ".join(f'batch {o}' for o in already_merged.values_list("ooid", flat=True))
             raise ValidationError(
                 _('The following batches are already part of another merged batch: %s') % oids,
                 code='invalid_merge'
             )
         # Validar que los lotes seleccionados tenga en su status "ready"
-        if candidate_batches.exclude(status='ready').exists():
+        if summary['not_ready']:
             raise ValidationError(
                 _('Only batches with a Review Status of “Ready” can be merged.'),
                 code='invalid_status'
             )
-        # Se añaden los lotes seleccionados a los hijos actuales del lote padre
-        child_ids = list(parent.children.values_list('pk', flat=True))
-        candidate_ids = list(candidate_batches.values_list('pk', flat=True))
-        combined_ids = child_ids + candidate_ids
-
-        all_batches = Batch.objects.filter(pk__in=combined_ids)
 
         # Verificar que los lotes sean del mismo proveedor, producto, variedad, fenología
-        prefix = 'incomingproduct__scheduleharvest__'
-        checks = {
-            _('provider'): prefix + 'product_provider',
-            _('product'): prefix + 'product',
-            _('variety'): prefix + 'product_variety',
-            _('phenology'): prefix + 'product_phenology',
-        }
-
-        for label, path in checks.items():
-            if all_batches.values_list(path, flat=True).distinct().count() != 1:
-                raise ValidationError(
-                    _('All batches to be merged must have the same %(label)s as the already merged ones.') % {
-                        'label': label},
-                    code='invalid_merge'
-                )
-
-        # Verificar que los lotes a unir, sus mercados permitan mezclarse
-        market_ids = all_batches.values_list(
-            'incomingproduct__scheduleharvest__market', flat=True
-        ).distinct()
-        markets = Market.objects.filter(pk__in=market_ids)
-
-        # 2. Identificar los no mezclables
-        non_mixable = markets.filter(is_mixable=False)
-
-        # 3. Si hay más de un mercado total Y al menos un mercado no mezclable, hay que verificar si son del mismo
-        if non_mixable.exists() and market_ids.count() > 1:
-            non_mixable_ids = list(non_mixable.values_list('id', flat=True))
+        label = cls._inconsistent_merge_label(summary)
+        if label is not None:
+            raise ValidationError(
+                _('All batches to be merged must have the same %(label)s as the already merged ones.') % {
+                    'label': label},
+                code='invalid_merge'
+            )
 
-            if len(non_mixable_ids) > 1:
+        # Verificar que los lotes a unir, sus mercados permitan mezclarse: con más de un mercado
+        # no puede haber mercados no mezclables
+        if summary['non_mixable_markets'] and summary['markets'] > 1:
+            if summary['non_mixable_markets'] > 1:
                 raise ValidationError(
                     _('Cannot add batches: more than one non-mixable market is involved.'),
                     code='invalid_market_mix'
                 )
-
-            # También inválido si hay mezcla de ese mercado no mezclable con otros mezclables
-            if markets.count() > 1:
-                raise ValidationError(
-                    _('Cannot add batches: non-mixable market cannot be mixed with others.'),
-                    code='invalid_market_mix'
-                )
+            raise ValidationError(
+                _('Cannot add batches: non-mixable market cannot be mixed with others.'),
+                code='invalid_market_mix'
+            )
 
     # Unir lote a un lote padre
     @classmethod
     def add_batches_to_merge(cls, parent, children_queryset):
+        """
+        Agrega los lotes al grupo del lote padre con un solo UPDATE; los cambios
+        de status que provoque se registran con bulk_create.
+        """
         with transaction.atomic():
-            for batch in children_queryset:
-                batch.parent = parent
-                batch.status = 'ready'
-                batch.is_available_for_processing = False
-                batch.save(update_fields=['parent', 'status', 'is_available_for_processing'])
+            locked = list(
+                Batch.objects.select_for_update()
+                .filter(pk__in=children_queryset.order_by().values('pk'))
+                .order_by('ooid').values_list('pk', 'status')
+            )
+            children_ids = [pk for pk, status in locked]
+            cls.validate_add_batches_to_existing_merge(parent, Batch.objects.filter(pk__in=children_ids))
+
+            Batch.objects.filter(pk__in=children_ids).update(
+                parent=parent, status='ready', is_available_for_processing=False,
+            )
+            status_changes = BatchStatusChange.objects.bulk_create([
+                BatchStatusChange(batch_id=pk, organization_id=parent.organization_id, field_name='status',
+                                  old_status=status, new_status='ready')
+                for pk, status in locked if status != 'ready'
+            ])
+            invalidate_member_dashboards(parent.organization_id)
+            BatchWeightLedger.refresh_children_weight([parent.pk])
+            return BatchMergeResult(parent, children_ids, status_changes)
 
     @classmethod
     def unmerge_all_children(cls, parent_batch):
-        if not parent_batch.is_parent:
-            raise ValidationError(
-                _('The selected batch is not a parent.'), code='not_parent_batch')
-        parent_batch.children.update(parent=None)
+        with transaction.atomic():
+            children_ids = list(
+                parent_batch.children.select_for_update().order_by('ooid').values_list('pk', flat=True)
+            )
+            if not children_ids:
+                raise ValidationError(
+                    _('The selected batch is not a parent.'), code='not_parent_batch')
+            Batch.objects.filter(pk__in=children_ids).update(parent=None)
+            invalidate_member_dashboards(parent_batch.organization_id)
+            BatchWeightLedger.refresh_children_weight([parent_batch.pk])
+            return BatchMergeResult(parent_batch, children_ids, [])
 
     @classmethod
     def unmerge_selected_children(cls, batch_queryset):
-        if not batch_queryset:
-            raise ValidationError(_('No batches provided.'), code='no_batches_selected')
-
-        non_children = [batch.ooid for batch in batch_queryset if batch.parent_id is None]
-        if non_children:
-            raise ValidationError(
-                _('One or more selected batches are not linked to a parent batch.'),
-                code='not_a_child_batch',
-                params={'ooids': ', '.join(map(str, non_children))}
+        with transaction.atomic():
+            locked = list(
+                Batch.objects.select_for_update()
+                .filter(pk__in=batch_queryset.order_by().values('pk'))
+                .order_by('ooid').values_list('pk', 'ooid', 'parent_id')
             )
+            if not locked:
+                raise ValidationError(_('No batches provided.'), code='no_batches_selected')
 
-        parents = {batch.parent_id for batch in batch_queryset}
-        if len(parents) > 1:
-            raise ValidationError(
-                _('Selected batches belong to a different parent batch.'),
-                code='multiple_parent_batches'
-            )
-        batch_queryset.update(parent=None)
+            non_children = [ooid for pk, ooid, parent_id in locked if parent_id is None]
+            if non_children:
+                raise ValidationError(
+                    _('One or more selected batches are not linked to a parent batch.'),
+                    code='not_a_child_batch',
+                    params={'ooids': ', '.join(map(str, non_children))}
+                )
+
+            parents = {parent_id for pk, ooid, parent_id in locked}
+            if len(parents) > 1:
+                raise ValidationError(
+                    _('Selected batches belong to a different parent batch.'),
+                    code='multiple_parent_batches'
+                )
+            children_ids = [pk for pk, ooid, parent_id in locked]
+            Batch.objects.filter(pk__in=children_ids).update(parent=None)
+            BatchWeightLedger.refresh_children_weight(parents)
+            parent_id, = parents
+            parent_batch = Batch.objects.get(pk=parent_id)
+            invalidate_member_dashboards(parent_batch.organization_id)
+            return BatchMergeResult(parent_batch, children_ids, [])
 
     class Meta:
         verbose_name = _('Batch')
@@ -415,6 +589,9 @@ class Batch(models.Model):
                 name='unique_batch_ooid_per_org'
             )
         ]
+        indexes = [
+            models.Index(fields=['organization', 'status', 'parent']),
+        ]
 
 
 class BatchWeightMovement(models.Model):
@@ -431,15 +608,263 @@ class BatchWeightMovement(models.Model):
         verbose_name = _('Batch Weight Movement')
         verbose_name_plural = _('Batch Weight Movements')
 
-    def clean(self):
-        if self.weight < 0 and self.batch.available_weight + self.weight < 0:
+    @property
+    def is_ingress(self):
+        return is_ingress_weight_source(self.source)
+
+    def validate_available_weight(self, available_weight):
+        if self.weight < 0 and available_weight + self.weight < 0:
             raise ValidationError(
                 _('This movement would result in a negative weight for the batch.'),
             )
 
+    def clean(self):
+        self.validate_available_weight(self.batch.available_weight)
+
     def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            # Se valida contra la fila bloqueada, no contra un weight_ledger ya cargado
+            ledger = BatchWeightLedger.lock(self.batch_id)
+            self.validate_available_weight(ledger.available_weight + ledger.children_available_weight)
+            previous = None
+            if not self._state.adding:
+                previous = BatchWeightMovement.objects.filter(pk=self.pk).values('batch_id', 'weight', 'source').first()
+            super().save(*args, **kwargs)
+            if previous:
+                BatchWeightLedger.post(previous['batch_id'], -previous['weight'],
+                                       is_ingress_weight_source(previous['source']))
+            BatchWeightLedger.post(self.batch_id, self.weight, self.is_ingress)
+
+    @classmethod
+    def post_weighing_sets(cls, weighing_sets):
+        """
+        Registra el movimiento de ingreso de varias pesadas [(weighing_set, batch_id)]
+        con una consulta de existentes, un bulk_create y un UPDATE por lote en el libro.
+        Las pesadas que ya tienen movimiento se omiten.
+        """
+        if not weighing_sets:
+            return []
+        model_name = WeighingSet.__name__
+        existing = set(
+            cls.objects.filter(
+                batch_id__in={batch_id for _, batch_id in weighing_sets},
+                source__model=model_name,
+                source__id__in=[weighing_set.pk for weighing_set, _ in weighing_sets],
+            ).values_list('batch_id', 'source__id')
+        )
+        movements = [
+            cls(
+                batch_id=batch_id,
+                weight=weighing_set.net_weight or 0,
+                source={
+                    "model": model_name,
+                    "id": weighing_set.pk,
+                    "gross_weight": weighing_set.gross_weight,
+                    "container_tare": weighing_set.container_tare,
+                    "platform_tare": weighing_set.platform_tare,
+                },
+            )
+            for weighing_set, batch_id in weighing_sets
+            if (batch_id, weighing_set.pk) not in existing
+        ]
+        return cls.post_many(movements)
+
+    @classmethod
+    def post_many(cls, movements):
+        """
+        Registra varios movimientos nuevos con un bulk_create y un UPDATE por lote
+        en el libro. Bloquea los libros de los lotes involucrados y valida, como
+        clean(), que ningún lote quede con peso disponible negativo.
+        """
+        if not movements:
+            return []
+        weights = defaultdict(float)
+        for movement in movements:
+            weights[movement.batch_id] += movement.weight
+        with transaction.atomic():
+            for batch_id in sorted(weights):
+                ledger = BatchWeightLedger.lock(batch_id)
+                if weights[batch_id] < 0 and (
+                    ledger.available_weight + ledger.children_available_weight + weights[batch_id] < 0
+                ):
+                    raise ValidationError(
+                        _('This movement would result in a negative weight for the batch.'),
+                    )
+            cls.objects.bulk_create(movements)
+            BatchWeightLedger.post_many([(movement.batch_id, movement.weight, movement.is_ingress)
+                                         for movement in movements])
+        return movements
+
+
+class BatchWeightLedger(models.Model):
+    """
+    Totales de peso desnormalizados por lote, para leerlos en O(1) desde el
+    changelist, los selects y __str__ sin agregar BatchWeightMovement por fila.
+
+    - ingress_weight: movimientos propios de pesadas (WeighingSet).
+    - available_weight: todos los movimientos propios.
+    - children_available_weight: suma de available_weight de los lotes hijos.
+    """
+    batch = models.OneToOneField(Batch, on_delete=models.CASCADE, related_name='weight_ledger',
+                                 verbose_name=_('Batch'))
+    ingress_weight = models.FloatField(default=0, verbose_name=_('Ingress weight'))
+    available_weight = models.FloatField(default=0, verbose_name=_('Available weight'))
+    children_available_weight = models.FloatField(default=0, verbose_name=_('Children available weight'))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Updated at'))
+
+    def __str__(self):
+        return f"{self.batch_id} :: {self.available_weight}"
+
+    class Meta:
+        verbose_name = _('Batch weight ledger')
+        verbose_name_plural = _('Batch weight ledgers')
+
+    @classmethod
+    def lock(cls, batch_id):
+        """
+        Bloquea (select_for_update) la fila del libro del lote, creándola si no
+        existe, para serializar los movimientos concurrentes del mismo lote.
+        """
+        if not cls.objects.filter(batch_id=batch_id).exists():
+            cls.rebuild(Batch.objects.filter(pk=batch_id))
+        return cls.objects.select_for_update().get(batch_id=batch_id)
+
+    @classmethod
+    def post(cls, batch_id, weight, is_ingress=False):
+        """
+        Aplica un movimiento de peso al libro del lote y al de su padre.
+        Debe llamarse dentro de una transacción.
+        """
+        cls.post_many([(batch_id, weight, is_ingress)])
+
+    @classmethod
+    def post_many(cls, movements):
+        """
+        Aplica varios movimientos (batch_id, weight, is_ingress) con un UPDATE
+        por lote afectado, para rutas que crean movimientos con bulk_create.
+        """
+        available = {}
+        ingress = {}
+        for batch_id, weight, is_ingress in movements:
+            available[batch_id] = available.get(batch_id, 0) + (weight or 0)
+            if is_ingress:
+                ingress[batch_id] = ingress.get(batch_id, 0) + (weight or 0)
+        if not available:
+            return
+
+        missing = set(available) - set(cls.objects.filter(batch_id__in=available).values_list('batch_id', flat=True))
+        if missing:
+            cls.rebuild(Batch.objects.filter(pk__in=missing))
+            # rebuild ya considera los movimientos guardados de estos lotes
+            for batch_id in missing:
+                available.pop(batch_id, None)
+                ingress.pop(batch_id, None)
+
+        parents = dict(Batch.objects.filter(pk__in=available, parent__isnull=False).values_list('pk', 'parent_id'))
+        missing_parents = set(parents.values()) - set(
+            cls.objects.filter(batch_id__in=parents.values()).values_list('batch_id', flat=True)
+        )
+        if missing_parents:
+            # rebuild ya suma los movimientos guardados de sus hijos
+            cls.rebuild(Batch.objects.filter(pk__in=missing_parents))
+            parents = {batch_id: parent_id for batch_id, parent_id in parents.items()
+                       if parent_id not in missing_parents}
+
+        children_available = {}
+        for batch_id, weight in available.items():
+            if batch_id in parents:
+                parent_id = parents[batch_id]
+                children_available[parent_id] = children_available.get(parent_id, 0) + weight
+
+        for batch_id, weight in available.items():
+            cls.objects.filter(batch_id=batch_id).update(
+                available_weight=F('available_weight') + weight,
+                ingress_weight=F('ingress_weight') + ingress.get(batch_id, 0),
+            )
+        for parent_id, weight in children_available.items():
+            cls.objects.filter(batch_id=parent_id).update(
+                children_available_weight=F('children_available_weight') + weight,
+            )
+
+    @classmethod
+    def refresh_children_weight(cls, parent_ids):
+        """
+        Recalcula children_available_weight de los lotes padres indicados, después
+        de unir o separar lotes.
+        """
+        parent_ids = [parent_id for parent_id in parent_ids if parent_id]
+        if not parent_ids:
+            return
+        missing = set(parent_ids) - set(cls.objects.filter(batch_id__in=parent_ids).values_list('batch_id', flat=True))
+        if missing:
+            cls.rebuild(Batch.objects.filter(pk__in=missing))
+        totals = dict(
+            cls.objects.filter(batch__parent_id__in=parent_ids)
+            .values('batch__parent_id')
+            .annotate(total=Sum('available_weight'))
+            .values_list('batch__parent_id', 'total')
+        )
+        for parent_id in parent_ids:
+            cls.objects.filter(batch_id=parent_id).update(children_available_weight=totals.get(parent_id) or 0)
+
+    @classmethod
+    def compute(cls, batch_ids):
+        """
+        Calcula desde BatchWeightMovement, sin guardarlos, los libros de los lotes
+        indicados y los de sus padres e hijos. Regresa {batch_id: libro}.
+        """
+        family = Batch.objects.filter(
+            models.Q(pk__in=batch_ids) | models.Q(parent_id__in=batch_ids) | models.Q(children__in=batch_ids)
+        ).distinct()
+        parents = dict(family.values_list('pk', 'parent_id'))
+        parents.update(Batch.objects.filter(parent_id__in=parents).values_list('pk', 'parent_id'))
+
+        totals = {
+            row['batch_id']: row
+            for row in BatchWeightMovement.objects.filter(batch_id__in=parents)
+            .values('batch_id')
+            .annotate(
+                available=Sum('weight'),
+                ingress=Sum('weight', filter=models.Q(source__model__icontains='weighingset')),
+            )
+        }
+
+        ledgers = {}
+        for batch_id in parents:
+            row = totals.get(batch_id, {})
+            ledgers[batch_id] = cls(
+                batch_id=batch_id,
+                available_weight=row.get('available') or 0,
+                ingress_weight=row.get('ingress') or 0,
+            )
+        for batch_id, parent_id in parents.items():
+            if parent_id in ledgers:
+                ledgers[parent_id].children_available_weight += ledgers[batch_id].available_weight
+        return ledgers
+
+    @classmethod
+    def rebuild(cls, batches_queryset):
+        """
+        Reconstruye desde BatchWeightMovement el libro de los lotes indicados
+        (y el de sus padres e hijos), con consultas agregadas.
+        """
+        batch_ids = set(batches_queryset.values_list('pk', flat=True))
+        if not batch_ids:
+            return 0
+        ledgers = cls.compute(batch_ids)
+
+        existing = set(cls.objects.filter(batch_id__in=ledgers).values_list('batch_id', flat=True))
+        cls.objects.bulk_create([ledger for batch_id, ledger in ledgers.items() if batch_id not in existing],
+                                ignore_conflicts=True)
+        to_update = []
+        for ledger in cls.objects.filter(batch_id__in=existing):
+            rebuilt = ledgers[ledger.batch_id]
+            ledger.available_weight = rebuilt.available_weight
+            ledger.ingress_weight = rebuilt.ingress_weight
+            ledger.children_available_weight = rebuilt.children_available_weight
+            to_update.append(ledger)
+        cls.objects.bulk_update(to_update, ['available_weight', 'ingress_weight', 'children_available_weight'])
+        return len(ledgers)
 
 
 class RepackingBatchWeightMovement(models.Model):
@@ -491,7 +916,7 @@ class BatchStatusChange(models.Model):
         )
 
 
-class IncomingProduct(models.Model):
+class IncomingProduct(TrackedFieldsMixin, models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     status = models.CharField(max_length=20, verbose_name=_('Status'), choices=STATUS_CHOICES,
                               default='open')
@@ -500,6 +925,9 @@ class IncomingProduct(models.Model):
     public_weight_result = models.FloatField(default=0, verbose_name=_("Public Weight Result"), )
     weighing_record_number = models.CharField(max_length=30, verbose_name=_('Weighing Record Number'), )
     total_weighed_sets = models.PositiveIntegerField(default=0, verbose_name=_('Total Weighed Sets'))
+    total_weighed_set_containers = models.PositiveIntegerField(default=0, verbose_name=_('Total Weighed Set Containers'))
+    packhouse_weight_result = models.FloatField(default=0.0, verbose_name=_('Packhouse Weight Result'))
+    average_per_container = models.FloatField(default=0.0, verbose_name=_('Average per Container'))
     mrl = models.FloatField(default=0, verbose_name=_('Maximum Residue Limit'), null=True, blank=True)
     phytosanitary_certificate = models.CharField(max_length=50, verbose_name=_('Phytosanitary Certificate'), null=True,
                                                  blank=True)
@@ -510,12 +938,22 @@ class IncomingProduct(models.Model):
     comments = models.TextField(verbose_name=_("Comments"), blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = IncomingProductQuerySet.as_manager()
+
+    tracked_fields = ('status',)
+
+    # Las métricas usan las anotaciones de IncomingProductQuerySet.with_weighing_totals() cuando existen
+
     @property
     def weighed_sets_count(self):
+        if hasattr(self, 'annotated_weighed_sets_count'):
+            return self.annotated_weighed_sets_count
         return self.weighingset_set.count()
 
     @property
     def containers_count(self):
+        if hasattr(self, 'annotated_containers_count'):
+            return self.annotated_containers_count
         return sum(
             container.quantity or 0
             for weighing in self.weighingset_set.all()
@@ -524,6 +962,8 @@ class IncomingProduct(models.Model):
 
     @property
     def total_net_weight(self):
+        if hasattr(self, 'annotated_total_net_weight'):
+            return self.annotated_total_net_weight
         return sum(
             weighing.net_weight or 0
             for weighing in self.weighingset_set.all()
@@ -537,6 +977,8 @@ class IncomingProduct(models.Model):
 
     @property
     def assigned_container_total(self):
+        if hasattr(self, 'annotated_assigned_container_total'):
+            return self.annotated_assigned_container_total
         return sum(
             container.quantity or 0
             for vehicle in self.scheduleharvest.scheduleharvestvehicle_set.all()
@@ -545,6 +987,8 @@ class IncomingProduct(models.Model):
 
     @property
     def full_container_total(self):
+        if hasattr(self, 'annotated_full_container_total'):
+            return self.annotated_full_container_total
         return sum(
             container.full_containers or 0
             for vehicle in self.scheduleharvest.scheduleharvestvehicle_set.filter(has_arrived=True)
@@ -553,6 +997,8 @@ class IncomingProduct(models.Model):
 
     @property
     def empty_container_total(self):
+        if hasattr(self, 'annotated_empty_container_total'):
+            return self.annotated_empty_container_total
         return sum(
             container.empty_containers or 0
             for vehicle in self.scheduleharvest.scheduleharvestvehicle_set.filter(has_arrived=True)
@@ -561,6 +1007,8 @@ class IncomingProduct(models.Model):
 
     @property
     def missing_container_total(self):
+        if hasattr(self, 'annotated_missing_container_total'):
+            return self.annotated_missing_container_total
         return sum(
             container.missing_containers or 0
             for vehicle in self.scheduleharvest.scheduleharvestvehicle_set.filter(has_arrived=True)
@@ -573,8 +1021,7 @@ class IncomingProduct(models.Model):
                 raise ValidationError(_("Cannot be in quarantine if its status is 'ready'"))
 
         if self.pk:
-            initial_status = IncomingProduct.objects.get(pk=self.pk).status
-            if initial_status == 'ready' and self.status != 'ready':
+            if self.previous('status') == 'ready' and self.status != 'ready':
                 raise ValidationError("Once it is 'Ready', the status cannot be changed.")
 
         # Comentado porque model.clean() corre antes de validar/guardar inlines y weighingset_set siempre esta vacío al crear por primera vez
@@ -584,9 +1031,7 @@ class IncomingProduct(models.Model):
     def save(self, *args, **kwargs):
         self.clean()
 
-        previous_status = 'open'
-        if self.pk:
-            previous_status = IncomingProduct.objects.get(pk=self.pk).status
+        previous_status = self.previous('status') or 'open'
 
         if self.pk is not None:
             self.recalculate_weighing_data()
@@ -603,44 +1048,68 @@ class IncomingProduct(models.Model):
                 self.batch = new_batch
                 super().save(update_fields=['batch'])
 
-                for weighing_set in self.weighingset_set.all():
-                    exists = BatchWeightMovement.objects.filter(
-                        batch=new_batch,
-                        source__model=weighing_set.__class__.__name__,
-                        source__id=weighing_set.pk
-                    ).exists()
-                    if not exists:
-                        BatchWeightMovement.objects.create(
-                            batch=new_batch,
-                            weight=weighing_set.net_weight or 0,
-                            source={
-                                "model": weighing_set.__class__.__name__,
-                                "id": weighing_set.pk,
-                                "gross_weight": weighing_set.gross_weight,
-                                "container_tare": weighing_set.container_tare,
-                                "platform_tare": weighing_set.platform_tare
-                            }
-                        )
+                BatchWeightMovement.post_weighing_sets(
+                    [(weighing_set, new_batch.pk) for weighing_set in self.weighingset_set.all()]
+                )
 
     def recalculate_weighing_data(self):
-        weighing_sets = self.weighingset_set.all()
-        self.total_weighed_sets = weighing_sets.count()
+        totals = self.weighingset_set.aggregate(sets=Count('pk'), net_weight=Sum('net_weight'))
+        self.total_weighed_sets = totals['sets']
 
-        self.total_weighed_set_containers = sum(
-            container.quantity or 0
-            for set in weighing_sets
-            for container in set.weighingsetcontainer_set.all()
-        )
-        self.packhouse_weight_result = weighing_sets.aggregate(
-            total=Sum('net_weight')
-        )['total'] or 0.0
+        self.total_weighed_set_containers = WeighingSetContainer.objects.filter(
+            weighing_set__incoming_product=self
+        ).aggregate(total=Sum('quantity'))['total'] or 0
+        self.packhouse_weight_result = totals['net_weight'] or 0.0
         if self.total_weighed_set_containers > 0:
             self.average_per_container = round(
-                self.total_weighed_set_containers / self.total_weighed_set_containers, 3
+                self.packhouse_weight_result / self.total_weighed_set_containers, 3
             )
         else:
             self.average_per_container = 0.0
 
+    @classmethod
+    def refresh_weighing_totals(cls, incoming_product_ids):
+        """
+        Actualiza con un solo UPDATE los mismos totales que recalculate_weighing_data
+        (pesadas, contenedores, peso neto y promedio por contenedor) de varios
+        IncomingProduct.
+        """
+        if not incoming_product_ids:
+            return
+        weighing_sets = WeighingSet.objects.filter(incoming_product_id=OuterRef('pk')).order_by().values('incoming_product_id')
+        weighed_sets = Coalesce(
+            Subquery(weighing_sets.annotate(total=Count('pk')).values('total'), output_field=models.IntegerField()),
+            Value(0)
+        )
+        net_weight = Coalesce(
+            Subquery(weighing_sets.annotate(total=Sum('net_weight')).values('total'), output_field=models.FloatField()),
+            Value(0.0)
+        )
+        containers = Coalesce(
+            Subquery(
+                WeighingSetContainer.objects.filter(weighing_set__incoming_product_id=OuterRef('pk'))
+                .order_by().values('weighing_set__incoming_product_id')
+                .annotate(total=Sum('quantity')).values('total'),
+                output_field=models.IntegerField()
+            ),
+            Value(0)
+        )
+        incoming_products = cls.objects.filter(pk__in=incoming_product_ids)
+        incoming_products.update(
+            total_weighed_sets=weighed_sets,
+            total_weighed_set_containers=containers,
+            packhouse_weight_result=net_weight,
+            average_per_container=Case(
+                When(GreaterThan(containers, 0),
+                     # round(double, int) no existe en PostgreSQL: se redondea como numeric
+                     then=Round(Cast(net_weight / Cast(containers, models.FloatField()),
+                                     models.DecimalField(max_digits=20, decimal_places=6)), 3)),
+                default=Value(0.0),
+                output_field=models.FloatField()
+            ),
+        )
+        invalidate_member_dashboards(*incoming_products.values_list('organization_id', flat=True).distinct())
+
     def __str__(self):
         schedule_harvest = self.scheduleharvest
         if schedule_harvest:
@@ -668,22 +1137,49 @@ class WeighingSet(models.Model):
 
     def save(self, *args, **kwargs):
         with transaction.atomic():
-            type(self).objects.exclude(pk=self.pk).filter(
-                incoming_product=self.incoming_product
-            ).update(protected=True)
+            # Asignar un ooid incremental; el contador se bloquea antes que las pesadas,
+            # en el mismo orden que delete() y update_weighing_set_numbers
+            if self.ooid is None:
+                self.ooid = allocate_ooid(type(self), incoming_product_id=self.incoming_product_id)
+
+            # La pesada nueva (o una protegida que se vuelve a editar) pasa a ser la única
+            # desprotegida; si ya lo era, las demás ya están protegidas
+            if self._state.adding or self.protected:
+                type(self).objects.exclude(pk=self.pk).filter(
+                    incoming_product_id=self.incoming_product_id
+                ).update(protected=True)
 
             self.protected = False
+            super().save(*args, **kwargs)
 
-            # Asignar un ooid incremental
-            last_record = (
-                type(self).objects
-                .filter(incoming_product=self.incoming_product)
-                .select_for_update()
-                .order_by('-ooid')
-                .first()
+    @classmethod
+    def refresh_container_totals(cls, weighing_set_ids):
+        """
+        Recalcula tara de envases, total de envases y peso neto de varias pesadas
+        con una consulta agrupada y un bulk_update. Regresa las pesadas actualizadas.
+        """
+        if not weighing_set_ids:
+            return []
+        totals = {
+            row['weighing_set_id']: row
+            for row in WeighingSetContainer.objects.filter(weighing_set_id__in=weighing_set_ids)
+            .order_by().values('weighing_set_id')
+            .annotate(
+                tare=Sum(F('quantity') * Coalesce('harvest_container__kg_tare', Value(0.0)),
+                         output_field=models.FloatField()),
+                quantity=Sum('quantity'),
             )
-            self.ooid = (last_record.ooid + 1) if last_record else 1
-            super().save(*args, **kwargs)
+        }
+        weighing_sets = list(cls.objects.filter(pk__in=weighing_set_ids))
+        for weighing_set in weighing_sets:
+            row = totals.get(weighing_set.pk, {})
+            weighing_set.container_tare = row.get('tare') or 0
+            weighing_set.total_containers = row.get('quantity') or 0
+            weighing_set.net_weight = (
+                (weighing_set.gross_weight or 0) - weighing_set.container_tare - (weighing_set.platform_tare or 0)
+            )
+        cls.objects.bulk_update(weighing_sets, ['container_tare', 'total_containers', 'net_weight'])
+        return weighing_sets
 
     def delete(self, *args, **kwargs):
         if self.protected:
@@ -693,11 +1189,13 @@ class WeighingSet(models.Model):
         deleted_ooid = self.ooid
 
         with transaction.atomic():
+            lock_ooid_counter(type(self), incoming_product_id=incoming_product_temp.pk)
             super().delete(*args, **kwargs)
             updated_count = type(self).objects.filter(
                 incoming_product=incoming_product_temp,
                 ooid__gt=deleted_ooid
             ).update(ooid=F('ooid') - 1)
+            reset_ooid_counter(type(self), incoming_product_id=incoming_product_temp.pk)
 
 
 class WeighingSetContainer(models.Model):
@@ -751,7 +1249,7 @@ class FoodSafety(models.Model):
         verbose_name_plural = _('Food Safeties')
 
 
-class DryMatter(models.Model):
+class DryMatter(TrackedFieldsMixin, models.Model):
     product_weight = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     paper_weight = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     moisture_weight = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
@@ -759,6 +1257,8 @@ class DryMatter(models.Model):
     dry_matter = models.DecimalField(max_digits=10, decimal_places=2)
     food_safety = models.ForeignKey(FoodSafety, verbose_name=_('Food Safety'), on_delete=models.CASCADE)
 
+    tracked_fields = ('dry_matter', 'food_safety')
+
     def __str__(self):
         return f""
 
@@ -767,11 +1267,13 @@ class DryMatter(models.Model):
         verbose_name_plural = _('Dry Matters')
 
 
-class InternalInspection(models.Model):
+class InternalInspection(TrackedFieldsMixin, models.Model):
     internal_temperature = models.DecimalField(max_digits=10, decimal_places=2)
     product_pest = models.ManyToManyField(ProductPest, verbose_name=_('Pests'), blank=True)
     food_safety = models.ForeignKey(FoodSafety, verbose_name=_('Food Safety'), on_delete=models.CASCADE)
 
+    tracked_fields = ('internal_temperature', 'food_safety')
+
     def __str__(self):
         return f""
 
@@ -780,11 +1282,46 @@ class InternalInspection(models.Model):
         verbose_name_plural = _('Internal Inspections')
 
 
+# Métricas de Average: nombre del campo de la muestra -> modelo de la muestra
+AVERAGE_METRICS = ('dry_matter', 'internal_temperature')
+
+# Food safety/métricas pendientes de recalcular dentro de Average.deferred_stats()
+_deferred_average_stats = ContextVar('deferred_average_stats', default=None)
+
+
 class Average(models.Model):
+    """
+    Promedios de inocuidad por food safety con estadísticas acumuladas por
+    métrica (conteo, suma, suma de cuadrados, mínimo y máximo), que se
+    actualizan aritméticamente al agregar, cambiar o borrar una muestra en
+    lugar de volver a agregar todas las muestras.
+
+    Un conteo en None indica que las estadísticas aún no se calculan (registros
+    anteriores); se reconstruyen la primera vez que se tocan.
+    """
     average_dry_matter = models.DecimalField(default=0, max_digits=10, decimal_places=2,
                                              verbose_name=_('Average Dry Matter'))
     average_internal_temperature = models.DecimalField(default=0, max_digits=10, decimal_places=2,
                                                        verbose_name=_('Average Internal Temperature'))
+    dry_matter_count = models.PositiveIntegerField(null=True, blank=True, verbose_name=_('Dry matter samples'))
+    dry_matter_sum = models.DecimalField(default=0, max_digits=14, decimal_places=2,
+                                         verbose_name=_('Dry matter sum'))
+    dry_matter_sum_squares = models.DecimalField(default=0, max_digits=20, decimal_places=4,
+                                                 verbose_name=_('Dry matter sum of squares'))
+    dry_matter_min = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                         verbose_name=_('Minimum dry matter'))
+    dry_matter_max = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                         verbose_name=_('Maximum dry matter'))
+    internal_temperature_count = models.PositiveIntegerField(null=True, blank=True,
+                                                             verbose_name=_('Internal temperature samples'))
+    internal_temperature_sum = models.DecimalField(default=0, max_digits=14, decimal_places=2,
+                                                   verbose_name=_('Internal temperature sum'))
+    internal_temperature_sum_squares = models.DecimalField(default=0, max_digits=20, decimal_places=4,
+                                                           verbose_name=_('Internal temperature sum of squares'))
+    internal_temperature_min = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                                   verbose_name=_('Minimum internal temperature'))
+    internal_temperature_max = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True,
+                                                   verbose_name=_('Maximum internal temperature'))
     acceptance_report = models.ForeignKey(ProductDryMatterAcceptanceReport, verbose_name=_('Acceptance Report'),
                                           on_delete=models.CASCADE, null=True)
     food_safety = models.ForeignKey(FoodSafety, verbose_name=_('Food Safety'), on_delete=models.CASCADE)
@@ -796,6 +1333,138 @@ class Average(models.Model):
         verbose_name = _('Average')
         verbose_name_plural = _('Averages')
 
+    @staticmethod
+    def get_sample_model(metric):
+        return {'dry_matter': DryMatter, 'internal_temperature': InternalInspection}[metric]
+
+    def std_dev(self, metric):
+        """
+        Desviación estándar poblacional de la métrica a partir de la suma de cuadrados.
+        """
+        count = getattr(self, f'{metric}_count') or 0
+        if not count:
+            return Decimal('0')
+        mean = getattr(self, f'{metric}_sum') / count
+        variance = getattr(self, f'{metric}_sum_squares') / count - mean * mean
+        return max(variance, Decimal('0')).sqrt().quantize(Decimal('0.01'))
+
+    def _set_stats(self, metric, count, total, squares, minimum, maximum):
+        setattr(self, f'{metric}_count', count)
+        setattr(self, f'{metric}_sum', total)
+        setattr(self, f'{metric}_sum_squares', squares)
+        setattr(self, f'{metric}_min', minimum)
+        setattr(self, f'{metric}_max', maximum)
+        average = (total / count).quantize(Decimal('0.01')) if count else Decimal('0')
+        setattr(self, f'average_{metric}', average)
+        return [f'{metric}_count', f'{metric}_sum', f'{metric}_sum_squares', f'{metric}_min', f'{metric}_max',
+                f'average_{metric}']
+
+    def _sample_bounds(self, metric):
+        return self.get_sample_model(metric).objects.filter(food_safety_id=self.food_safety_id).aggregate(
+            minimum=Min(metric), maximum=Max(metric),
+        )
+
+    def _apply(self, metric, added, removed):
+        count = getattr(self, f'{metric}_count') + len(added) - len(removed)
+        if count <= 0:
+            return self._set_stats(metric, 0, Decimal('0'), Decimal('0'), None, None)
+
+        total = getattr(self, f'{metric}_sum') + sum(added, Decimal('0')) - sum(removed, Decimal('0'))
+        squares = (getattr(self, f'{metric}_sum_squares')
+                   + sum((value * value for value in added), Decimal('0'))
+                   - sum((value * value for value in removed), Decimal('0')))
+        minimum = getattr(self, f'{metric}_min')
+        maximum = getattr(self, f'{metric}_max')
+
+        # Si se quita un extremo hay que consultarlo; las muestras ya están guardadas/borradas
+        if any(minimum is None or maximum is None or value <= minimum or value >= maximum for value in removed):
+            bounds = self._sample_bounds(metric)
+            minimum, maximum = bounds['minimum'], bounds['maximum']
+        else:
+            minimum = min([value for value in (minimum, *added) if value is not None], default=None)
+            maximum = max([value for value in (maximum, *added) if value is not None], default=None)
+        return self._set_stats(metric, count, total, squares, minimum, maximum)
+
+    @classmethod
+    def post(cls, food_safety_id, metric, added=(), removed=()):
+        """
+        Aplica las muestras agregadas/eliminadas de la métrica a las estadísticas del
+        food safety. Se llama después de guardar/borrar las muestras.
+        """
+        pending = _deferred_average_stats.get()
+        if pending is not None:
+            pending.add((food_safety_id, metric))
+            return
+
+        added = [Decimal(str(value)) for value in added if value is not None]
+        removed = [Decimal(str(value)) for value in removed if value is not None]
+        with transaction.atomic():
+            average = cls.objects.select_for_update().filter(food_safety_id=food_safety_id).order_by('pk').first()
+            if average is None and not added:
+                # Sin Average que actualizar (p. ej. se está borrando el food safety)
+                return
+            if average is None or getattr(average, f'{metric}_count') is None:
+                # rebuild ya considera las muestras guardadas
+                cls.rebuild(food_safety_id, [metric])
+                return
+            average.save(update_fields=average._apply(metric, added, removed))
+
+    @classmethod
+    def rebuild(cls, food_safety_id, metrics=AVERAGE_METRICS):
+        """
+        Recalcula desde las muestras las estadísticas de las métricas dadas, con una
+        consulta agregada por métrica. Crea el Average si no existe.
+        """
+        with transaction.atomic():
+            average = cls.objects.select_for_update().filter(food_safety_id=food_safety_id).order_by('pk').first()
+            if average is None:
+                average = cls(food_safety_id=food_safety_id)
+            update_fields = []
+            for metric in metrics:
+                field = F(metric)
+                output_field = models.DecimalField(max_digits=20, decimal_places=4)
+                stats = cls.get_sample_model(metric).objects.filter(food_safety_id=food_safety_id).aggregate(
+                    count=Count('pk'),
+                    total=Coalesce(Sum(metric), Value(Decimal('0')), output_field=output_field),
+                    squares=Coalesce(Sum(field * field, output_field=output_field), Value(Decimal('0')),
+                                     output_field=output_field),
+                    minimum=Min(metric),
+                    maximum=Max(metric),
+                )
+                update_fields += average._set_stats(
+                    metric, stats['count'], Decimal(str(stats['total'])), Decimal(str(stats['squares'])),
+                    stats['minimum'], stats['maximum'],
+                )
+            if average.pk is None:
+                average.save()
+            else:
+                average.save(update_fields=update_fields)
+            return average
+
+    @classmethod
+    @contextmanager
+    def deferred_stats(cls):
+        """
+        Difiere las actualizaciones de estadísticas hasta salir del bloque y entonces
+        recalcula una sola vez cada food safety/métrica tocada; para formsets que
+        guardan muchas muestras a la vez.
+        """
+        if _deferred_average_stats.get() is not None:
+            yield
+            return
+        pending = set()
+        token = _deferred_average_stats.set(pending)
+        try:
+            yield
+        finally:
+            _deferred_average_stats.reset(token)
+        metrics_by_food_safety = {}
+        for food_safety_id, metric in pending:
+            metrics_by_food_safety.setdefault(food_safety_id, []).append(metric)
+        for food_safety_id, metrics in metrics_by_food_safety.items():
+            if FoodSafety.objects.filter(pk=food_safety_id).exists():
+                cls.rebuild(food_safety_id, sorted(metrics))
+
 
 class VehicleReview(models.Model):
     vehicle = models.ForeignKey('gathering.ScheduleHarvestVehicle', verbose_name=_('Vehicle'), on_delete=models.CASCADE)
@@ -41,6 +41,12 @@ class IncomingProductResource(DehydrationResource, ExportResource):
     product_phenology = Field(column_name=_("Product Phenology"), readonly=True)
     harvesting_category = Field(column_name=_("Harvesting Category"), readonly=True)
 
+    # Relaciones que recorren los dehydrate_*; las usa el plan de prefetch de la exportación
+    export_select_related = tuple(
+        f'scheduleharvest__{relation}'
+        for relation in ('orchard__producer', 'gatherer', 'maquiladora', 'product_provider', 'product_phenology')
+    )
+
     def __init__(self, export_format=None, **kwargs):
         super().__init__(**kwargs)
         self.export_format = export_format
@@ -134,6 +140,13 @@ class BatchResource(DehydrationResource, ExportResource):
     full_containers = Field(column_name=_("Full Containments"), readonly=True)
     kg_sample = Field(column_name=_("Kg Sample"), readonly=True)
 
+    # Relaciones que recorren los dehydrate_*; las usa el plan de prefetch de la exportación
+    export_select_related = tuple(
+        f'incomingproduct__scheduleharvest__{relation}'
+        for relation in ('orchard__producer', 'gatherer', 'maquiladora', 'product_provider', 'product_phenology')
+    )
+    export_prefetch_related = ('incomingproduct__weighingset_set__weighingsetcontainer_set', 'children')
+
     def __init__(self, export_format=None, **kwargs):
         super().__init__(**kwargs)
         self.export_format = export_format
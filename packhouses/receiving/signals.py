@@ -1,85 +1,55 @@
+import threading
 from django.dispatch import receiver
+from django.db import transaction
+from django.db.models import F
 from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
 from .models import (DryMatter, InternalInspection, Average, FoodSafety, SampleCollection, SampleWeight, 
-                     IncomingProduct, Batch, BatchStatusChange, WeighingSetContainer, WeighingSet, BatchWeightMovement)
+                     IncomingProduct, Batch, BatchStatusChange, WeighingSetContainer, WeighingSet, BatchWeightMovement,
+                     BatchWeightLedger)
 from packhouses.gathering.models import ScheduleHarvest
 from packhouses.catalogs.models import ProductFoodSafetyProcess, ProductDryMatterAcceptanceReport
 from common.base.models import FoodSafetyProcedure
-from django.db.models import Avg
 from decimal import Decimal
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
+def post_average_sample(instance, metric, created):
+    """
+    Aplica el alta o el cambio de una muestra a las estadísticas de Average,
+    usando los valores con que se cargó la muestra (TrackedFieldsMixin).
+    """
+    value = getattr(instance, metric)
+    if created:
+        Average.post(instance.food_safety_id, metric, added=[value])
+        return
+
+    previous_food_safety_id = instance.previous('food_safety')
+    previous_value = instance.previous(metric)
+    if previous_food_safety_id != instance.food_safety_id:
+        Average.post(previous_food_safety_id, metric, removed=[previous_value])
+        Average.post(instance.food_safety_id, metric, added=[value])
+    elif previous_value != value:
+        Average.post(instance.food_safety_id, metric, added=[value], removed=[previous_value])
+
+
 @receiver(post_save, sender=DryMatter)
-def add_avg_dry_matter(sender, instance, **kwargs):
-    average = DryMatter.objects.filter(food_safety=instance.food_safety).aggregate(Avg('dry_matter'))
-    have_average = Average.objects.filter(food_safety=instance.food_safety).exists()
-
-    if not have_average:
-        Average.objects.create(
-                average_dry_matter=average['dry_matter__avg'],
-                food_safety=instance.food_safety,
-            )
-    else:
-        Average.objects.filter(
-            food_safety=instance.food_safety
-            ).update(
-                average_dry_matter=average['dry_matter__avg'],
-            )
+def add_avg_dry_matter(sender, instance, created, **kwargs):
+    post_average_sample(instance, 'dry_matter', created)
+
 
 @receiver(post_delete, sender=DryMatter)
 def delete_avg_dry_matter(sender, instance, **kwargs):
-    have_inspection = DryMatter.objects.filter(food_safety=instance.food_safety).exists()
-
-    if have_inspection:
-        average = DryMatter.objects.filter(food_safety=instance.food_safety).aggregate(Avg('dry_matter'))
-        Average.objects.filter(
-            food_safety=instance.food_safety
-            ).update(
-                average_dry_matter=average['dry_matter__avg'],
-            )
-    else:
-        Average.objects.filter(
-            food_safety=instance.food_safety
-            ).update(
-                average_dry_matter=0,
-            )
+    Average.post(instance.food_safety_id, 'dry_matter', removed=[instance.dry_matter])
+
 
 @receiver(post_save, sender=InternalInspection)
-def add_avg_internal_temperature(sender, instance, **kwargs):
-    average = InternalInspection.objects.filter(food_safety=instance.food_safety).aggregate(Avg('internal_temperature'))
-    have_average = Average.objects.filter(food_safety=instance.food_safety).exists()
-
-    if not have_average:
-        Average.objects.create(
-                average_internal_temperature=average['internal_temperature__avg'],
-                food_safety=instance.food_safety,
-            )
-    else:
-        Average.objects.filter(
-            food_safety=instance.food_safety
-            ).update(
-                average_internal_temperature=average['internal_temperature__avg'],
-            )
+def add_avg_internal_temperature(sender, instance, created, **kwargs):
+    post_average_sample(instance, 'internal_temperature', created)
 
 
 @receiver(post_delete, sender=InternalInspection)
 def delete_avg_internal_temperature(sender, instance, **kwargs):
-    have_inspection = InternalInspection.objects.filter(food_safety=instance.food_safety).exists()
-
-    if have_inspection:
-        average = InternalInspection.objects.filter(food_safety=instance.food_safety).aggregate(Avg('internal_temperature'))
-        Average.objects.filter(
-            food_safety=instance.food_safety
-            ).update(
-                average_internal_temperature=average['internal_temperature__avg'],
-            )
-    else:
-        Average.objects.filter(
-            food_safety=instance.food_safety
-            ).update(
-                average_internal_temperature=0,
-            )
+    Average.post(instance.food_safety_id, 'internal_temperature', removed=[instance.internal_temperature])
 
 @receiver(post_save, sender=FoodSafety)
 def add_food_safety(sender, instance, **kwargs):
@@ -119,83 +89,75 @@ def add_food_safety(sender, instance, **kwargs):
  
 @receiver(pre_save, sender=Batch)
 def batch_status_changes(sender, instance, **kwargs):
-    if not instance.pk:
-        return
-    try:
-        prev = sender.objects.get(pk=instance.pk)
-    except sender.DoesNotExist:
-        return
-    org  = instance.organization
-    
-    # Registra cambios en el estado del lote
-    if prev.status != instance.status:
-        BatchStatusChange.objects.create(
-            batch        = instance,
-            organization = org,
-            field_name   = 'status',
-            old_status   = prev.status,
-            new_status   = instance.status,
-        )
-
-# Calculo de peso neto de pesadas (WeighingSet)
-@receiver([post_save, post_delete], sender=WeighingSetContainer)
-def update_weighing_set_totals(sender, instance, **kwargs):
-    try:
-        parent = instance.weighing_set
-    except WeighingSet.DoesNotExist:
+    # Registra cambios en el estado del lote; el valor previo viene de la instancia cargada
+    if not instance.pk or not instance.has_changed('status'):
         return
+    BatchStatusChange.objects.create(
+        batch           = instance,
+        organization_id = instance.organization_id,
+        field_name      = 'status',
+        old_status      = instance.previous('status'),
+        new_status      = instance.status,
+    )
 
-    if not parent or not parent.pk:
-        return
+# Recalculo de pesadas (WeighingSet): los cambios se marcan y se aplican en lote
+# al confirmar la transacción, en lugar de recalcular con cada contenedor guardado
+_weighing_state = threading.local()
+
+
+def mark_weighing_changes(**changes):
+    """
+    Marca pesadas/productos a recalcular (weighing_set_totals, weighing_sets,
+    incoming_products). Dentro de una transacción se acumulan y se procesan una
+    sola vez en on_commit; fuera de ella se procesan de inmediato.
+
+    Cada marca registra su callback: el primero que corre procesa todo lo
+    acumulado y los demás ya no encuentran nada. Si la transacción (o el
+    savepoint) se revierte, Django descarta sus callbacks y lo marcado se procesa
+    con el siguiente commit; el recálculo parte de la BD, así que no altera nada.
+    """
+    pending = getattr(_weighing_state, 'pending', None)
+    if pending is None:
+        pending = {'weighing_set_totals': set(), 'weighing_sets': set(), 'incoming_products': set()}
+        _weighing_state.pending = pending
+
+    for key, ids in changes.items():
+        pending[key].update(pk for pk in ids if pk is not None)
+
+    transaction.on_commit(flush_weighing_set_changes)
 
-    if parent.gross_weight is None or parent.platform_tare is None:
+
+def flush_weighing_set_changes():
+    pending = getattr(_weighing_state, 'pending', None)
+    _weighing_state.pending = None
+    if not pending:
         return
 
-    containers = parent.weighingsetcontainer_set.all()
-    total_tare = sum(
-        c.quantity * (c.harvest_container.kg_tare or 0)
-        for c in containers
-    )
-    total_qty = sum(c.quantity or 0 for c in containers)
+    with transaction.atomic():
+        refreshed = WeighingSet.refresh_container_totals(pending['weighing_set_totals'])
+        pending['incoming_products'].update(weighing_set.incoming_product_id for weighing_set in refreshed)
 
-    # Calcular net_weight de pesada
-    gross = parent.gross_weight or 0
-    tare = total_tare or 0
-    platform = parent.platform_tare or 0
-    net = gross - tare - platform
+        # Movimiento de ingreso para pesadas con peso neto cuyo producto ya tiene lote
+        weighing_set_ids = pending['weighing_set_totals'] | pending['weighing_sets']
+        weighing_sets = (
+            WeighingSet.objects.filter(pk__in=weighing_set_ids, net_weight__gt=0,
+                                       incoming_product__batch__isnull=False)
+            .annotate(batch_id=F('incoming_product__batch_id'))
+        ) if weighing_set_ids else []
+        BatchWeightMovement.post_weighing_sets([(weighing_set, weighing_set.batch_id) for weighing_set in weighing_sets])
+
+        IncomingProduct.refresh_weighing_totals(pending['incoming_products'])
+
+
+@receiver([post_save, post_delete], sender=WeighingSetContainer)
+def mark_weighing_set_totals(sender, instance, **kwargs):
+    mark_weighing_changes(weighing_set_totals=[instance.weighing_set_id])
 
-    # Actualizar fields con los cálculos
-    parent.container_tare = total_tare
-    parent.total_containers = total_qty
-    parent.net_weight = net
-    parent.save(update_fields=["container_tare", "total_containers", "net_weight"])
 
-        
 @receiver(post_save, sender=WeighingSet)
-def handle_weighing_set_post_save(sender, instance, created, **kwargs):
-    # Registrar movimiento de peso si existe net_weight y un batch relacionado
-    if instance.net_weight > 0 and instance.incoming_product.batch is not None:
-        batch = instance.incoming_product.batch
-        source_data = {
-            "model": instance.__class__.__name__,
-            "id": instance.pk,
-            "gross_weight": instance.gross_weight,
-            "container_tare": instance.container_tare,
-            "platform_tare": instance.platform_tare,
-        }
-        # Verifica si ya existe movimiento para evitar duplicados
-        already_exists = BatchWeightMovement.objects.filter(
-            batch=batch,
-            source__model= instance.__class__.__name__,
-            source__id=instance.pk
-        ).exists()
-
-        if not already_exists:
-            BatchWeightMovement.objects.create(
-                batch=batch,
-                weight=instance.net_weight,
-                source=source_data
-            )
+def mark_weighing_set(sender, instance, **kwargs):
+    mark_weighing_changes(weighing_sets=[instance.pk], incoming_products=[instance.incoming_product_id])
+
 
 @receiver(post_delete, sender=WeighingSet)
 def handle_post_delete_weighing_set(sender, instance, **kwargs):
@@ -216,22 +178,13 @@ def handle_post_delete_weighing_set(sender, instance, **kwargs):
             )
 
 
-@receiver([post_save, post_delete], sender=WeighingSet)
-@receiver([post_save, post_delete], sender=WeighingSetContainer)
-def recalculate_weighingset_change(sender, instance, **kwargs):
-    incoming = None
-
-    if isinstance(instance, WeighingSet):
-        incoming = instance.incoming_product
-
-    elif isinstance(instance, WeighingSetContainer):
-        weighing_set_id = getattr(instance, 'weighing_set_id', None)
-        if weighing_set_id:
-            try:
-                weighing_set = WeighingSet.objects.only("incoming_product_id").get(pk=weighing_set_id)
-                incoming = weighing_set.incoming_product
-            except WeighingSet.DoesNotExist:
-                incoming = None
-
-    if incoming:
-        incoming.recalculate_weighing_data()
+@receiver(post_delete, sender=BatchWeightMovement)
+def revert_batch_weight_ledger(sender, instance, **kwargs):
+    # Si el libro ya no existe el lote se está eliminando, no hay nada que revertir
+    if BatchWeightLedger.objects.filter(batch_id=instance.batch_id).exists():
+        BatchWeightLedger.post(instance.batch_id, -instance.weight, instance.is_ingress)
+
+
+@receiver(post_delete, sender=WeighingSet)
+def mark_weighing_set_deleted(sender, instance, **kwargs):
+    mark_weighing_changes(incoming_products=[instance.incoming_product_id])
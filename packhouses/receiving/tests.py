@@ -1,3 +1,272 @@
-from django.test import TestCase
+import os
+import threading
+import uuid
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from common.base import sequences
+from common.base.models import OoidCounter
+from packhouses.gathering.models import ScheduleHarvest
+from .models import Batch, BatchWeightLedger, IncomingProduct, WeighingSet
+from .utils import update_weighing_set_numbers
+
+# Datos de desarrollo; la organización 1 responde en uno.dev.certiffy.net
+DEV_FIXTURES = [
+    os.path.join(settings.BASE_DIR, '__fixtures', name) for name in (
+        '001_users_user.json',
+        '002_profiles_userprofile.json',
+        '003_base.json',
+        '005_organizations_organization.json',
+        '006_organizations_organizationuser.json',
+        '007_organizations_organizationowner.json',
+        '008_profiles_organizationprofile.json',
+        '009_packhouse_settings_dev.json',
+        '010_catalogs_dev.json',
+        '011_receiving_dev.json',
+        '012_gathering_dev.json',
+    )
+]
+DEV_HOSTNAME = 'uno.dev.certiffy.net'
+
+
+class ChangelistQueryCountTests(TestCase):
+    """
+    Los changelists de Batch e IncomingProduct deben cargar sus columnas con un
+    número fijo de consultas, sin importar cuántas filas muestren.
+    """
+    fixtures = DEV_FIXTURES
+
+    @classmethod
+    def setUpTestData(cls):
+        # loaddata no pasa por Batch.save: los libros de peso se arman aquí
+        BatchWeightLedger.rebuild(Batch.objects.all())
+        cls.user = get_user_model().objects.get(email='admin@localhost')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def add_incoming_products(self, count):
+        """
+        Copia el IncomingProduct 1 (listo, con su ScheduleHarvest); cada copia
+        crea su propio lote al guardarse lista.
+        """
+        for _ in range(count):
+            schedule_harvest = ScheduleHarvest.objects.get(incoming_product_id=1)
+            incoming_product = IncomingProduct.objects.get(pk=1)
+            incoming_product.pk = None
+            incoming_product.uuid = uuid.uuid4()
+            incoming_product.batch = None
+            incoming_product._state.adding = True
+            incoming_product.save()
+
+            schedule_harvest.pk = None
+            schedule_harvest.uuid = uuid.uuid4()
+            schedule_harvest.ooid = None
+            schedule_harvest.incoming_product = incoming_product
+            schedule_harvest._state.adding = True
+            schedule_harvest.save()
+
+    def get_changelist(self, url):
+        response = self.client.get(url, HTTP_HOST=DEV_HOSTNAME)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertConstantChangelistQueries(self, url):
+        # La primera carga llena los caches (tenant, filtros); se mide la segunda
+        self.get_changelist(url)
+        with CaptureQueriesContext(connection) as baseline:
+            rows = self.get_changelist(url).context['cl'].result_count
+
+        self.add_incoming_products(10)
+
+        self.get_changelist(url)
+        with self.assertNumQueries(len(baseline)):
+            response = self.get_changelist(url)
+        self.assertGreater(response.context['cl'].result_count, rows)
+
+    def test_batch_changelist_query_count(self):
+        self.assertConstantChangelistQueries(reverse('admin:receiving_batch_changelist'))
+
+    def test_incoming_product_changelist_query_count(self):
+        self.assertConstantChangelistQueries(reverse('admin:receiving_incomingproduct_changelist'))
+
+
+requires_postgresql = skipUnless(connection.vendor == 'postgresql', 'row_number() path requires PostgreSQL.')
+
+
+def force_bulk_update_renumbering():
+    # renumber_ooids elige el UPDATE con row_number() en PostgreSQL; esto fuerza el bulk_update
+    return mock.patch.object(sequences, '_renumber_with_row_number', sequences._renumber_with_bulk_update)
+
+
+class WeighingSetNumberingMixin:
+    """
+    Pesadas del IncomingProduct 4 de los fixtures (abierto, sin lote, una pesada).
+    """
+    fixtures = DEV_FIXTURES
+    incoming_product_id = 4
+    harvesting_crew_id = 1
+
+    def append_weighing_set(self):
+        return WeighingSet.objects.create(
+            incoming_product_id=self.incoming_product_id,
+            harvesting_crew_id=self.harvesting_crew_id,
+            gross_weight=1000,
+        )
+
+    def delete_latest_weighing_set(self):
+        with transaction.atomic():
+            # Mismo orden de bloqueo que WeighingSet.save/delete: primero el contador
+            sequences.lock_ooid_counter(WeighingSet, incoming_product_id=self.incoming_product_id)
+            latest = WeighingSet.objects.select_for_update().filter(
+                incoming_product_id=self.incoming_product_id, protected=False
+            ).order_by('-pk').first()
+            if latest is not None:
+                latest.delete()
+
+    def renumber(self):
+        update_weighing_set_numbers(IncomingProduct.objects.get(pk=self.incoming_product_id))
+
+    def assertSequential(self):
+        ooids = list(
+            WeighingSet.objects.filter(incoming_product_id=self.incoming_product_id)
+            .order_by('pk').values_list('ooid', flat=True)
+        )
+        self.assertEqual(ooids, list(range(1, len(ooids) + 1)))
+        counter = OoidCounter.objects.get(
+            sequence='receiving.weighingset:incoming_product_id', scope_id=self.incoming_product_id
+        )
+        self.assertEqual(counter.last_value, len(ooids))
+
+
+class WeighingSetNumberingTests(WeighingSetNumberingMixin, TestCase):
+
+    def check_append_and_delete(self):
+        for _ in range(4):
+            self.append_weighing_set()
+        self.delete_latest_weighing_set()
+        self.renumber()
+        self.assertSequential()
+
+        # Hueco a mitad de la secuencia (borrado sin pasar por WeighingSet.delete)
+        WeighingSet.objects.filter(incoming_product_id=self.incoming_product_id, ooid=2).delete()
+        self.renumber()
+        self.assertSequential()
+
+        # Folios corridos y contador desfasado
+        WeighingSet.objects.filter(incoming_product_id=self.incoming_product_id).update(ooid=F('ooid') + 10)
+        OoidCounter.objects.filter(sequence='receiving.weighingset:incoming_product_id').update(last_value=99)
+        self.renumber()
+        self.assertSequential()
+
+        count = WeighingSet.objects.filter(incoming_product_id=self.incoming_product_id).count()
+        self.assertEqual(self.append_weighing_set().ooid, count + 1)
+        self.assertSequential()
+
+    @requires_postgresql
+    def test_row_number_renumbering(self):
+        self.check_append_and_delete()
+
+    def test_bulk_update_renumbering(self):
+        with force_bulk_update_renumbering():
+            self.check_append_and_delete()
+
+
+@requires_postgresql
+class WeighingSetConcurrentNumberingTests(WeighingSetNumberingMixin, TransactionTestCase):
+    """
+    Un hilo agrega pesadas mientras otro borra la última y renumera; al terminar
+    la secuencia debe seguir 1..n y el contador en n, sin renumerar al final.
+    """
+    appends = 20
+    deletes = 10
+
+    def run_concurrently(self):
+        barrier = threading.Barrier(2)
+        errors = []
+
+        def run(action, times):
+            try:
+                barrier.wait()
+                for _ in range(times):
+                    action()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        def delete_and_renumber():
+            self.delete_latest_weighing_set()
+            self.renumber()
+
+        threads = [
+            threading.Thread(target=run, args=(self.append_weighing_set, self.appends)),
+            threading.Thread(target=run, args=(delete_and_renumber, self.deletes)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertSequential()
+
+    def test_row_number_renumbering(self):
+        self.run_concurrently()
+
+    def test_bulk_update_renumbering(self):
+        with force_bulk_update_renumbering():
+            self.run_concurrently()
+
+    def test_renumber_waits_for_an_uncommitted_append(self):
+        """
+        Un alta ya reservó n+1 sin confirmar cuando empieza la renumeración: ésta
+        debe esperar y dejar el contador en n+1, no regresarlo a n.
+        """
+        appended = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def append_and_hold():
+            try:
+                with transaction.atomic():
+                    self.append_weighing_set()
+                    appended.set()
+                    release.wait(10)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                appended.set()
+                connection.close()
+
+        def renumber():
+            try:
+                self.renumber()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        appender = threading.Thread(target=append_and_hold)
+        appender.start()
+        appended.wait(10)
+        renumberer = threading.Thread(target=renumber)
+        renumberer.start()
+
+        # La renumeración queda bloqueada en el contador mientras el alta no confirma
+        renumberer.join(0.5)
+        self.assertTrue(renumberer.is_alive())
+        release.set()
+        appender.join()
+        renumberer.join()
+
+        self.assertEqual(errors, [])
+        self.assertSequential()
+        count = WeighingSet.objects.filter(incoming_product_id=self.incoming_product_id).count()
+        self.assertEqual(self.append_weighing_set().ooid, count + 1)
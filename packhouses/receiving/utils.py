@@ -1,17 +1,19 @@
 from django.utils.translation import gettext_lazy as _, gettext
-from django.db import transaction
 from django.forms.models import BaseInlineFormSet
 from django.apps import apps
 from common.settings import STATUS_CHOICES
+from common.base.sequences import renumber_ooids
 
 
 def update_weighing_set_numbers(incoming_product):
-    pallets = incoming_product.weighingset_set.all().order_by('id')
-    with transaction.atomic():
-        for index, pallet in enumerate(pallets, start=1):
-            if pallet.ooid != index:
-                pallet.ooid = index
-                pallet.save(update_fields=['ooid'])
+    renumber_ooids(incoming_product.weighingset_set.model, order_by=('id',), incoming_product_id=incoming_product.pk)
+
+
+def is_ingress_weight_source(source):
+    """
+    Un BatchWeightMovement es de ingreso cuando proviene de una pesada (WeighingSet).
+    """
+    return 'weighingset' in str((source or {}).get('model', '')).lower()
 
 
 def get_processing_status_choices():
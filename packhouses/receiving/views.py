@@ -8,18 +8,22 @@ from .models import (IncomingProduct, WeighingSet, Batch, FoodSafety, ProductPes
                      VehicleCondition, SampleCollection, SampleWeight, SamplePhysicalDamage, SampleDisease,
                      SampleResidue, SamplePest, Average)
 from packhouses.catalogs.models import (ProductPest, ProductDisease, ProductPhysicalDamage, ProductResidue,)
-from cities_light.models import City, Country, Region, SubRegion
 from django.utils.text import capfirst
 from datetime import datetime
-from weasyprint import HTML, CSS
-from django.template.loader import render_to_string
 from io import BytesIO
 from django.core import serializers
 from django.http import JsonResponse
 import json
 from .resources import get_model_fields_verbose_names, transform_data
+from common.base.utils import get_report_rows
+from common.base.reports import render_pdf_response
+from common.profiles.utils import get_report_header, get_request_report_header
 from .forms import ContainerInlineForm
 from .utils import FILTER_DISPLAY_CONFIG, apply_filter_config
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from functools import lru_cache
 import qrcode, base64
 
 def generate_qr_base64(data: str) -> str:
@@ -29,11 +33,31 @@ def generate_qr_base64(data: str) -> str:
     img_str = base64.b64encode(buffer.getvalue()).decode("utf-8")
     return f"data:image/png;base64,{img_str}"
 
+def get_qr_for_batches(batches, request):
+    """
+    QR (data URI) del batch record de cada lote, por uuid. La URL es fija para
+    cada lote, así que la imagen se guarda en cache y sólo se genera una vez.
+    """
+    host = request.get_host()
+    cache_keys = {f"batch_qr:{host}:{batch.uuid}": batch for batch in batches}
+    qr_codes = cache.get_many(list(cache_keys))
+
+    missing = {}
+    for cache_key, batch in cache_keys.items():
+        if cache_key not in qr_codes:
+            url = request.build_absolute_uri(reverse("batch_record_report", args=[batch.uuid]))
+            missing[cache_key] = qr_codes[cache_key] = generate_qr_base64(url)
+    if missing:
+        cache.set_many(missing, settings.BATCH_QR_CACHE_TIMEOUT)
+
+    return {batch.uuid: qr_codes[cache_key] for cache_key, batch in cache_keys.items()}
+
 def get_qr_for_batch(batch, request):
-    url = request.build_absolute_uri(
-        reverse("batch_record_report", args=[batch.uuid])
-    )
-    return generate_qr_base64(url)
+    return get_qr_for_batches([batch], request)[batch.uuid]
+
+@lru_cache(maxsize=1)
+def get_weighing_labels_stylesheet():
+    return render_to_string('admin/packhouses/receiving/weighing_labels.css')
 
 def create_contenedor(request):
     if request.method == 'POST':
@@ -61,33 +85,12 @@ def weighing_set_report(request, uuid, source="incoming"):
         incomingProduct = get_object_or_404(IncomingProduct, uuid=uuid)
         batch = getattr(incomingProduct, 'batch', None)
 
-    # Obtener Datos de la Organización
-    if hasattr(request, 'organization'):
-        organization = request.organization.organizationprofile.name
-        add = request.organization.organizationprofile.address
-        organization_profile = request.organization.organizationprofile
-
-        def get_name(model, obj_id, default):
-            if obj_id:
-                try:
-                    return model.objects.get(id=obj_id).name
-                except model.DoesNotExist:
-                    return f"{default} does not exist"
-            return f"{default} not specified"
-
-        # Obtener los nombres de las regiones
-        city_name = get_name(SubRegion, organization_profile.city_id, "Ciudad")
-        country_name = get_name(Country, organization_profile.country_id, "Country")
-        state_name = get_name(Region, organization_profile.state_id, "State")
-        district_name = get_name(City, organization_profile.district_id, "District")
-        if organization_profile.logo:
-            logo_url = organization_profile.logo.url
-        else:
-            logo_url = None
+    report_header = get_request_report_header(request)
 
     pdf_title = _('Weighing Sets')
-    packhouse_name = organization
-    company_address = f"{add}, {district_name}, {city_name}, {state_name}, {country_name}"
+    packhouse_name = report_header['name']
+    company_address = report_header['address']
+    logo_url = report_header['logo_url']
     date = datetime.now()
     year = date.year
 
@@ -122,14 +125,14 @@ def weighing_set_report(request, uuid, source="incoming"):
     }
 
     # CSS
-    base_url = request.build_absolute_uri('/')
-    css = CSS(string='''
+    css = '''
         @page {
             size: letter portrait;
-        }''')
+        }'''
 
     # Renderizar el template HTML
-    html_string = render_to_string('admin/packhouses/receiving/weighing-set-report.html', {
+    filename = f"{_('weighing_set')}_{incomingProduct.id}.pdf"
+    return render_pdf_response(request, 'admin/packhouses/receiving/weighing-set-report.html', {
         'packhouse_name': packhouse_name,
         'company_address': company_address,
         'pdf_title': pdf_title,
@@ -142,87 +145,57 @@ def weighing_set_report(request, uuid, source="incoming"):
         'year': year,
         'date': date,
         'printed_by': user,
-    })
-
-    # Convertir el HTML a PDF
-    html = HTML(string=html_string, base_url=base_url)
-    pdf_buffer = BytesIO()
-    html.write_pdf(pdf_buffer, stylesheets=[css], )
+    }, filename, stylesheets=[css])
 
-    # Traducir el nombre del archivo manualmente
-    filename = f"{_('weighing_set')}_{incomingProduct.id}.pdf"
-
-    # Devolver el PDF como respuesta
-    pdf_buffer.seek(0)
-    response = HttpResponse(pdf_buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="{filename}"'
-    return response
-
-def export_weighing_labels(request, uuid): 
+def render_weighing_labels(request, batches, organization_id):
+    """
+    Genera en un solo PDF las etiquetas de las pesadas de todos los lotes
+    recibidos, con los QR en cache y la hoja de estilos precompilada.
+    """
     if request.user.is_authenticated:
         user = str(request.user)
     else:
-        user = None  
-    batch = get_object_or_404(Batch, uuid=uuid)
-    weighing_sets = batch.incomingproduct.weighingset_set.all()
-
-    organization_profile = batch.incomingproduct.scheduleharvest.orchard.organization.organizationprofile
-    organization = organization_profile.name
-    add = organization_profile.address
-    
-    def get_name(model, obj_id, default):
-        if obj_id:
-            try:
-                return model.objects.get(id=obj_id).name
-            except model.DoesNotExist:
-                return f"{default} does not exist"
-        return f"{default} not specified"
-
-    city_name = get_name(SubRegion, organization_profile.city_id, "City")
-    country_name = get_name(Country, organization_profile.country_id, "Country")
-    state_name = get_name(Region, organization_profile.state_id, "State")
-    district_name = get_name(City, organization_profile.district_id, "District")
-    logo_url = organization_profile.logo.url if organization_profile.logo else None
-
-    packhouse_name = organization
-    company_address = f"{add}, {district_name}, {city_name}, {state_name}, {country_name}"
+        user = None
+    batches = list(
+        batches.select_related('incomingproduct__scheduleharvest__orchard__producer')
+        .prefetch_related('incomingproduct__weighingset_set')
+        .order_by('ooid')
+    )
+
+    report_header = get_report_header(organization_id)
+    packhouse_name = report_header['name']
+    company_address = report_header['address']
+    logo_url = report_header['logo_url']
     date = datetime.now()
     year = str(date.year)
 
     # generar qr
-    qr_code = get_qr_for_batch(batch, request) 
+    qr_codes = get_qr_for_batches(batches, request)
+    labels = [
+        {
+            'batch': batch,
+            'weighing_sets': batch.incomingproduct.weighingset_set.all(),
+            'qr_code': qr_codes[batch.uuid],
+        }
+        for batch in batches
+    ]
 
-    base_url = request.build_absolute_uri('/')
-    css = CSS(string='''
-        @page {
-            size: letter portrait;
-        }''')
-    
-    html_string = render_to_string('admin/packhouses/receiving/weighing_labels.html', {
+    filename = f"{_('labels')}.pdf"
+    return render_pdf_response(request, 'admin/packhouses/receiving/weighing_labels.html', {
         'packhouse_name': packhouse_name,
         'company_address': company_address,
         'logo_url': logo_url,
-        'batch': batch,
-        'weighing_sets': weighing_sets,
+        'labels': labels,
         'year': year,
         'date': date,
         'printed_by': user,
-        'qr_code': qr_code,
-    })
+    }, filename, stylesheets=[get_weighing_labels_stylesheet()])
 
-    # Convertir el HTML a PDF
-    html = HTML(string=html_string, base_url=base_url)
-    pdf_buffer = BytesIO()
-    html.write_pdf(pdf_buffer, stylesheets=[css],)
-
-    # Traducir el nombre del archivo manualmente
-    filename = f"{_('labels')}.pdf"
-
-    # Devolver el PDF como respuesta
-    pdf_buffer.seek(0)
-    response = HttpResponse(pdf_buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="{filename}"'
-    return response
+def export_weighing_labels(request, uuid):
+    batch = get_object_or_404(Batch.objects.select_related('incomingproduct__scheduleharvest__orchard'), uuid=uuid)
+    return render_weighing_labels(
+        request, Batch.objects.filter(pk=batch.pk), batch.incomingproduct.scheduleharvest.orchard.organization_id
+    )
 
 def basic_report(request, json_data, model_name, model_key, pretty_filters):
     if request.user.is_authenticated:
@@ -230,40 +203,12 @@ def basic_report(request, json_data, model_name, model_key, pretty_filters):
     else:
         user = None  
     # prepare data
-    json_data = json.loads(json_data)
-    base_url = request.build_absolute_uri('/')
-
-    if json_data: 
-        headers = list(json_data[0].keys()) 
-    else: 
-        headers = [] 
-     
-    data = [[item.get(header) for header in headers] for item in json_data]
-
-    if hasattr(request, 'organization'):
-        organization = request.organization.organizationprofile.name
-        add =  request.organization.organizationprofile.address
-        organization_profile = request.organization.organizationprofile
-        def get_name(model, obj_id, default):
-            if obj_id:
-                try:
-                    return model.objects.get(id=obj_id).name
-                except model.DoesNotExist:
-                    return f"{default} does not exist"
-            return f"{default} not specified"
-
-        # Obtener los nombres de las regiones
-        city_name = get_name(SubRegion, organization_profile.city_id, "Ciudad")
-        country_name = get_name(Country, organization_profile.country_id, "Country")
-        state_name = get_name(Region, organization_profile.state_id, "State")
-        district_name = get_name(City, organization_profile.district_id, "District")
-        if organization_profile.logo:  
-            logo_url = organization_profile.logo.url  
-        else:
-            logo_url = None
+    headers, data = get_report_rows(json_data)
+
+    report_header = get_request_report_header(request)
     pdf_title = model_name
-    packhouse_name = organization
-    company_address = f"{add}, {district_name}, {city_name}, {state_name}, {country_name}"
+    packhouse_name = report_header['name']
+    company_address = report_header['address']
     columns_total = len(headers)
     date = datetime.now()
     year = str(date.year)
@@ -281,24 +226,25 @@ def basic_report(request, json_data, model_name, model_key, pretty_filters):
     col_count = 4
     # orientation page
     if len(headers) < 10:
-        css = CSS(string='''
+        css = '''
         @page {
             size: letter portrait;
-        }''')
+        }'''
         col_count = 3
     elif len(headers) < 16: 
-        css = CSS(string='''
+        css = '''
         @page {
             size: letter landscape;
-        }''')
+        }'''
     else:
-        css = CSS(string='''
+        css = '''
         @page {
             size: 18in 11in;
-        }''')
+        }'''
 
     # send data to create pdf
-    html_string = render_to_string('admin/packhouses/base-table-report.html',{
+    filename = f"{model_name}.pdf"
+    return render_pdf_response(request, 'admin/packhouses/base-table-report.html',{
         'company_info': 'Certiffy',
         'pdf_title': pdf_title,
         'headers': headers,
@@ -312,14 +258,7 @@ def basic_report(request, json_data, model_name, model_key, pretty_filters):
         "date_ranges": date_ranges,
         "other_filters": other_filters,
         'col_count': col_count,
-    })
-
-    html = HTML(string=html_string, base_url=base_url)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="{model_name}.pdf"'
-    html.write_pdf(response, stylesheets=[css], )
-
-    return response
+    }, filename, stylesheets=[css])
 
 def export_batch_record(request, uuid,):
     if request.user.is_authenticated:
@@ -337,23 +276,7 @@ def export_batch_record(request, uuid,):
     scheduleharvestvehicle = harvest.scheduleharvestvehicle_set.all() if harvest else []
 
     # === ORGANIZACIÓN Y UBICACIÓN ===
-    organization_profile = harvest.orchard.organization.organizationprofile if harvest else None
-    organization = organization_profile.name if organization_profile else ""
-    add = organization_profile.address if organization_profile else ""
-
-    def get_name(model, obj_id, default):
-        if obj_id:
-            try:
-                return model.objects.get(id=obj_id).name
-            except model.DoesNotExist:
-                return f"{default} does not exist"
-        return f"{default} not specified"
-
-    city_name = get_name(SubRegion, getattr(organization_profile, "city_id", None), "City")
-    country_name = get_name(Country, getattr(organization_profile, "country_id", None), "Country")
-    state_name = get_name(Region, getattr(organization_profile, "state_id", None), "State")
-    district_name = get_name(City, getattr(organization_profile, "district_id", None), "District")
-    logo_url = organization_profile.logo.url if organization_profile and organization_profile.logo else None
+    report_header = get_report_header(harvest.orchard.organization_id if harvest else None)
 
     # === DATOS DE INOCUIDAD ===
     drymatters = []
@@ -551,12 +474,12 @@ def export_batch_record(request, uuid,):
         acceptance_report = averages.acceptance_report if averages and averages.acceptance_report else None
 
     # === CONTEXTO Y GENERACIÓN PDF ===
-    packhouse_name = organization
-    company_address = f"{add}, {district_name}, {city_name}, {state_name}, {country_name}"
+    packhouse_name = report_header['name']
+    company_address = report_header['address']
+    logo_url = report_header['logo_url']
     date = datetime.now()
     year = str(date.year)
-    base_url = request.build_absolute_uri('/')
-    css = CSS(string='@page { size: letter portrait; }')
+    css = '@page { size: letter portrait; }'
 
     context = {
         'packhouse_name': packhouse_name,
@@ -583,12 +506,10 @@ def export_batch_record(request, uuid,):
         'acceptance_report': acceptance_report,
     }
 
-    html_string = render_to_string('admin/packhouses/receiving/batch_record.html', context)
-    pdf = HTML(string=html_string, base_url=base_url).write_pdf(stylesheets=[css])
-
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="{_('batch_record')}.pdf"'
-    return response
+    filename = f"{_('batch_record')}.pdf"
+    # Vista pública (QR de las etiquetas de pesada): se renderiza dentro del request
+    return render_pdf_response(request, 'admin/packhouses/receiving/batch_record.html', context, filename,
+                               stylesheets=[css], synchronous=True)
 
 
 
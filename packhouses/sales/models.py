@@ -24,6 +24,7 @@ from packhouses.catalogs.settings import CLIENT_KIND_CHOICES
 from django.db.models import Max, Min, Q, F, Sum
 from .utils import incoterms_choices
 from common.base.models import Incoterm, LocalDelivery
+from common.base.sequences import allocate_ooid
 import datetime
 from .settings import ORDER_ITEMS_KIND_CHOICES, ORDER_ITEMS_PRICING_CHOICES
 from ..receiving.models import Batch
@@ -83,11 +84,10 @@ class Order(IncotermsAndLocalDeliveryMarketMixin, models.Model):
         return f"#{self.ooid} - {self.client} - SHIPMENT: {self.shipment_date} - DELIVERY: {self.delivery_date}"
 
     def save(self, *args, **kwargs):
-        if not self.pk:
-            with transaction.atomic():
-                last_order = Order.objects.select_for_update().filter(organization=self.organization).order_by('ooid').last()
-                self.ooid = last_order.ooid + 1 if last_order else 1
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.pk:
+                self.ooid = allocate_ooid(Order, organization_id=self.organization_id)
+            super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = _('Order')
@@ -5,3 +5,6 @@ class StorehouseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'packhouses.storehouse'
     verbose_name = _('Storehouse')
+
+    def ready(self):
+        from . import signals
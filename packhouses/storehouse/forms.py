@@ -7,7 +7,7 @@ from packhouses.purchases.models import PurchaseOrderSupply, PurchaseOrder
 from decimal import Decimal
 from django.db.models import DecimalField, Value, Sum, F, Subquery, OuterRef, Q
 from django.db.models.functions import Coalesce
-from .utils import validate_inventory_availability, get_inventory_balance, get_source_for_quantity_fifo
+from .utils import validate_inventory_availability, get_inventory_balance, post_outbound_fifo
 
 
 class StorehouseEntrySupplyInlineFormSet(BaseInlineFormSet):
@@ -113,18 +113,11 @@ class AdjustmentInventoryForm(forms.ModelForm):
             Se crean transacciones de salida en InventoryTransaction para cada movimiento
             hasta completar la cantidad solicitada.
             """
-            fifo_movements = get_source_for_quantity_fifo(supply, qty, org)
-
-            for mov in fifo_movements:
-                InventoryTransaction.objects.create(
-                    supply=supply,
-                    transaction_kind='outbound',
-                    transaction_category=obj.transaction_category,
-                    quantity=mov['take'],
-                    storehouse_entry_supply=mov['entry'].storehouse_entry_supply,
-                    created_by=user,
-                    organization=org
-                )
+            post_outbound_fifo(
+                supply, qty, org,
+                transaction_category=obj.transaction_category,
+                created_by=user
+            )
 
         return obj
 
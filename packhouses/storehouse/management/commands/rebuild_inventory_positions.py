@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from packhouses.storehouse.models import InventoryPosition, InventoryTransaction
+
+
+class Command(BaseCommand):
+    help = 'Rebuild inventory positions and FIFO lot balances from InventoryTransaction.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', type=int, help='Only rebuild positions of this organization id.')
+        parser.add_argument('--chunk-size', type=int, default=100, help='Supplies rebuilt per transaction.')
+
+    def handle(self, *args, **options):
+        transactions = InventoryTransaction.objects.all()
+        if options['organization']:
+            transactions = transactions.filter(organization_id=options['organization'])
+
+        pairs = list(transactions.values_list('organization_id', 'supply_id').distinct().order_by('organization_id', 'supply_id'))
+        chunk_size = options['chunk_size']
+        rebuilt = 0
+        for start in range(0, len(pairs), chunk_size):
+            chunk = pairs[start:start + chunk_size]
+            with transaction.atomic():
+                for organization_id in {organization_id for organization_id, _ in chunk}:
+                    supply_ids = [supply_id for org_id, supply_id in chunk if org_id == organization_id]
+                    rebuilt += InventoryPosition.rebuild(organization_id=organization_id, supply_ids=supply_ids)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt inventory position for {rebuilt} supplies.'))
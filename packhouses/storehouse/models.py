@@ -1,5 +1,7 @@
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q, Sum
 from organizations.models import Organization
 from django.utils.translation import gettext_lazy as _
 from packhouses.purchases.models import PurchaseOrder, PurchaseOrderSupply
@@ -152,10 +154,245 @@ class InventoryTransaction(models.Model):
         verbose_name=_("Organization"),
         on_delete=models.PROTECT
     )
+    # Saldo FIFO del lote (sólo entradas) y lote del que se tomó una salida
+    remaining_quantity = models.DecimalField(
+        verbose_name=_("Remaining Quantity"),
+        max_digits=10, decimal_places=2,
+        null=True, blank=True,
+        editable=False
+    )
+    source_entry = models.ForeignKey(
+        'self',
+        verbose_name=_("Source Entry"),
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        editable=False,
+        related_name='outbound_transactions'
+    )
+
+    # Campos que ya se aplicaron a InventoryPosition y al saldo de los lotes
+    POSTED_FIELDS = ('supply_id', 'organization_id', 'transaction_kind', 'quantity', 'source_entry_id')
 
     def __str__(self):
         return f"{self.supply}: {self.quantity} units"
 
+    def save(self, *args, **kwargs):
+        """
+        Al registrar una transacción actualiza en la misma transacción de BD la
+        existencia (InventoryPosition) del insumo y, en salidas con lote de origen,
+        el saldo restante de ese lote. Las transacciones no se editan después:
+        un cambio que movería la existencia o los lotes se rechaza; para
+        corregirla se registra un ajuste.
+        """
+        if not self._state.adding:
+            stored = InventoryTransaction.objects.filter(pk=self.pk).values(*self.POSTED_FIELDS).first()
+            if stored and any(stored[field] != getattr(self, field) for field in self.POSTED_FIELDS):
+                raise ValidationError(_("Registered inventory transactions cannot change their supply, kind or quantity."))
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            InventoryPosition.lock(self.supply_id, self.organization_id)
+            if self.transaction_kind == 'inbound':
+                self.remaining_quantity = self.quantity
+            super().save(*args, **kwargs)
+            InventoryPosition.post(self.supply_id, self.organization_id, self.signed_quantity)
+            if self.transaction_kind == 'outbound' and self.source_entry_id:
+                InventoryTransaction.objects.filter(pk=self.source_entry_id).update(
+                    remaining_quantity=F('remaining_quantity') - self.quantity
+                )
+
+    @property
+    def signed_quantity(self):
+        return self.quantity if self.transaction_kind == 'inbound' else -self.quantity
+
+    class Meta:
+        verbose_name = _("Inventory Transaction")
+        verbose_name_plural = _("Inventory Transactions")
+        indexes = [
+            models.Index(fields=['organization', 'supply', 'created_at']),
+            # Lotes de entrada con saldo, los únicos que recorre la salida FIFO
+            models.Index(
+                fields=['organization', 'supply', 'created_at', 'id'],
+                condition=Q(transaction_kind='inbound', remaining_quantity__gt=0),
+                name='inventory_open_lots_idx'
+            ),
+        ]
+
+
+class InventoryPosition(models.Model):
+    """
+    Existencia actual por (organización, insumo), mantenida al registrar cada
+    InventoryTransaction para validar salidas con una sola lectura en lugar de
+    sumar todo el historial del insumo.
+    """
+    supply = models.ForeignKey(
+        Supply,
+        verbose_name=_("Supply"),
+        on_delete=models.CASCADE
+    )
+    organization = models.ForeignKey(
+        Organization,
+        verbose_name=_("Organization"),
+        on_delete=models.CASCADE
+    )
+    quantity = models.DecimalField(
+        verbose_name=_("Quantity"),
+        max_digits=14, decimal_places=2,
+        default=Decimal('0')
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Updated at")
+    )
+
+    def __str__(self):
+        return f"{self.supply}: {self.quantity} in inventory"
+
+    class Meta:
+        verbose_name = _("Inventory Position")
+        verbose_name_plural = _("Inventory Positions")
+        constraints = [
+            models.UniqueConstraint(fields=['organization', 'supply'], name='unique_inventory_position')
+        ]
+
+    @classmethod
+    def lock(cls, supply_id, organization_id):
+        """
+        Bloquea (select_for_update) la existencia del insumo, creándola desde el
+        historial si no existe, para serializar los movimientos concurrentes.
+        """
+        if not cls.objects.filter(supply_id=supply_id, organization_id=organization_id).exists():
+            cls.rebuild(organization_id=organization_id, supply_ids=[supply_id])
+        return cls.objects.select_for_update().get(supply_id=supply_id, organization_id=organization_id)
+
+    @classmethod
+    def post(cls, supply_id, organization_id, quantity):
+        """
+        Aplica un movimiento (positivo o negativo) a la existencia del insumo.
+        Debe llamarse dentro de una transacción.
+        """
+        cls.objects.filter(supply_id=supply_id, organization_id=organization_id).update(
+            quantity=F('quantity') + quantity
+        )
+
+    @classmethod
+    def rebuild(cls, organization_id=None, supply_ids=None):
+        """
+        Reconstruye desde InventoryTransaction la existencia y el saldo FIFO de
+        los lotes de entrada de los insumos indicados. Las salidas sin
+        source_entry (históricas) se asignan como antes: primero a las entradas
+        de su misma StorehouseEntrySupply y, si no tienen, en orden FIFO a las
+        entradas sin origen físico.
+
+        Regresa cuántas existencias se reconstruyeron.
+        """
+        transactions = InventoryTransaction.objects.all()
+        if organization_id:
+            transactions = transactions.filter(organization_id=organization_id)
+        if supply_ids is not None:
+            transactions = transactions.filter(supply_id__in=supply_ids)
+
+        totals = (
+            transactions.values('organization_id', 'supply_id')
+            .annotate(
+                inbound=Sum('quantity', filter=Q(transaction_kind='inbound')),
+                outbound=Sum('quantity', filter=Q(transaction_kind='outbound')),
+            )
+            .order_by('organization_id', 'supply_id')
+        )
+        rebuilt = 0
+        for row in totals:
+            quantity = (row['inbound'] or Decimal('0')) - (row['outbound'] or Decimal('0'))
+            cls.objects.update_or_create(
+                organization_id=row['organization_id'], supply_id=row['supply_id'],
+                defaults={'quantity': quantity},
+            )
+            cls._rebuild_lots(transactions.filter(organization_id=row['organization_id'], supply_id=row['supply_id']))
+            rebuilt += 1
+
+        # Un insumo sin transacciones también tiene existencia (cero)
+        if organization_id and supply_ids:
+            cls.objects.bulk_create(
+                [cls(organization_id=organization_id, supply_id=supply_id) for supply_id in supply_ids],
+                ignore_conflicts=True,
+            )
+        return rebuilt
+
+    @classmethod
+    def _rebuild_lots(cls, transactions):
+        lots = list(
+            transactions.filter(transaction_kind='inbound')
+            .only('id', 'quantity', 'remaining_quantity', 'storehouse_entry_supply_id')
+            .order_by('created_at', 'id')
+        )
+        for lot in lots:
+            lot.rebuilt_remaining = lot.quantity
+        lots_by_id = {lot.pk: lot for lot in lots}
+
+        def consume(candidates, quantity):
+            for lot in candidates:
+                if quantity <= 0:
+                    break
+                take = min(lot.rebuilt_remaining, quantity)
+                lot.rebuilt_remaining -= take
+                quantity -= take
+
+        outbounds = (
+            transactions.filter(transaction_kind='outbound')
+            .values_list('quantity', 'source_entry_id', 'storehouse_entry_supply_id')
+            .order_by('created_at', 'id')
+        )
+        for quantity, source_entry_id, storehouse_entry_supply_id in outbounds:
+            if source_entry_id in lots_by_id:
+                lots_by_id[source_entry_id].rebuilt_remaining -= quantity
+            elif storehouse_entry_supply_id:
+                consume([lot for lot in lots if lot.storehouse_entry_supply_id == storehouse_entry_supply_id], quantity)
+            else:
+                consume([lot for lot in lots if not lot.storehouse_entry_supply_id], quantity)
+
+        changed = []
+        for lot in lots:
+            if lot.remaining_quantity != lot.rebuilt_remaining:
+                lot.remaining_quantity = lot.rebuilt_remaining
+                changed.append(lot)
+        InventoryTransaction.objects.bulk_update(changed, ['remaining_quantity'], batch_size=500)
+
+
+class InventoryCheckpoint(models.Model):
+    """
+    Existencia de un insumo al inicio de un mes, para que los reportes con
+    filtro de fecha partan de aquí en lugar de recorrer todo el historial.
+    Sólo se guardan meses ya iniciados y se eliminan los posteriores a una
+    transacción borrada.
+    """
+    supply = models.ForeignKey(
+        Supply,
+        verbose_name=_("Supply"),
+        on_delete=models.CASCADE
+    )
+    organization = models.ForeignKey(
+        Organization,
+        verbose_name=_("Organization"),
+        on_delete=models.CASCADE
+    )
+    month = models.DateField(
+        verbose_name=_("Month")
+    )
+    quantity = models.DecimalField(
+        verbose_name=_("Quantity"),
+        max_digits=14, decimal_places=2
+    )
+
+    def __str__(self):
+        return f"{self.supply}: {self.quantity} at {self.month}"
+
+    class Meta:
+        verbose_name = _("Inventory Checkpoint")
+        verbose_name_plural = _("Inventory Checkpoints")
+        constraints = [
+            models.UniqueConstraint(fields=['organization', 'supply', 'month'], name='unique_inventory_checkpoint')
+        ]
+
 
 # Modelo para simular entradas/salidas de inventario
 class AdjustmentInventory(models.Model):
@@ -1,8 +1,10 @@
-import tablib
-from django.http import HttpResponse
-from .models import InventoryTransaction
 from datetime import datetime
+from decimal import Decimal
+from django.db.models import Exists, Max, Min, OuterRef
 from django.utils.translation import gettext_lazy as _
+from common.base.utils import EXPORT_CHUNK_SIZE, sheet_file_response
+from .models import InventoryTransaction
+from .utils import get_opening_balances
 
 def strip_tz(value):
     """
@@ -13,10 +15,44 @@ def strip_tz(value):
         return value.replace(tzinfo=None)
     return value
 
+def get_fifo_report_rows(transactions, balances):
+    """
+    Genera las filas del reporte conforme se leen las transacciones (cursor del
+    lado del servidor). El balance de cada insumo se acumula con todas sus
+    transacciones, pero sólo se escriben las seleccionadas (is_selected), así
+    que los movimientos que excluyen los filtros del changelist no se pierden.
+    """
+    for t in transactions.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        supply_id = t.supply_id
+        balances[supply_id] = balances.get(supply_id, Decimal('0')) + t.signed_quantity
+        if not t.is_selected:
+            continue
+
+        # Identificador relacionado
+        entry = t.storehouse_entry_supply
+        linked_reference = "-"
+        if entry and entry.storehouse_entry and entry.storehouse_entry.purchase_order:
+            linked_reference = entry.storehouse_entry.purchase_order.ooid
+
+        yield (
+            strip_tz(t.created_at),
+            f"{t.supply.kind.name}: {t.supply.name}",
+            t.transaction_category,
+            t.transaction_kind,
+            t.quantity,
+            linked_reference,
+            strip_tz(t.created_at),
+            t.created_by if t.created_by else "—",
+            balances[supply_id],
+        )
+
 def export_fifo_report(modeladmin, request, queryset):
     """
     Exporta un reporte detallado de las transacciones de inventario (entradas y salidas),
-    mostrando el balance de inventario después de cada movimiento.
+    mostrando el balance de inventario después de cada movimiento. El balance parte de
+    la existencia de cada insumo antes de la primera transacción del reporte, calculada
+    desde los cortes mensuales, más todas sus transacciones hasta cada fila; el XLSX se
+    escribe por bloques.
     """
 
     headers = (
@@ -24,70 +60,38 @@ def export_fifo_report(modeladmin, request, queryset):
         _("Linked entry or purchase order"), _("Reference date"), _("Created by"),
         _("Inventory balance after transaction")
     )
-    data = []
 
     # Cargamos todas las transacciones seleccionadas, no sólo outputs
+    selected = InventoryTransaction.objects.filter(
+        id__in=queryset.values('id'),
+    )
+
+    bounds = selected.aggregate(first=Min('created_at'), last=Max('created_at'))
+    if bounds['first'] is None:
+        return sheet_file_response(headers, (), "inventory_movements_report.xlsx")
+
+    # Cada insumo parte de su existencia antes del inicio del reporte (cortes
+    # mensuales) y se recorren todas sus transacciones del periodo, incluidas
+    # las que excluyen los filtros de tipo o categoría, para que el balance de
+    # cada fila seleccionada sea el real
+    supply_ids = list(selected.order_by().values_list('supply_id', flat=True).distinct())
+    balances = get_opening_balances(request.organization, supply_ids, bounds['first'])
+
     transactions = InventoryTransaction.objects.filter(
-        id__in=queryset.values_list('id', flat=True),
+        organization=request.organization,
+        supply_id__in=supply_ids,
+        created_at__gte=bounds['first'],
+        created_at__lte=bounds['last'],
+    ).annotate(
+        is_selected=Exists(selected.filter(pk=OuterRef('pk'))),
     ).select_related(
-        'supply',
+        'supply__kind',
         'storehouse_entry_supply__storehouse_entry__purchase_order',
         'created_by',
-        'organization'
     ).order_by('created_at', 'id')  # FIFO real
 
-    # Simulador de inventarios por insumo
-    inventory_simulated = {}
-
-    for t in transactions:
-        supply_id = t.supply_id
-        quantity = float(t.quantity)
-        kind = t.transaction_kind
-
-        if supply_id not in inventory_simulated:
-            inventory_simulated[supply_id] = 0.0
-
-        if kind == 'inbound':
-            inventory_simulated[supply_id] += quantity  # entradas suman
-        elif kind == 'outbound':
-            inventory_simulated[supply_id] -= quantity  # salidas restan
-
-        entry = t.storehouse_entry_supply
-
-        # Fecha de referencia
-        reference_date = "-"
-        if kind == 'outbound' and t:
-            reference_date = strip_tz(t.created_at)
-        elif kind == 'inbound' and t:
-            reference_date = strip_tz(t.created_at)
-
-        # Identificador relacionado
-        linked_reference = "-"
-        if kind == 'outbound' and entry and entry.storehouse_entry and entry.storehouse_entry.purchase_order:
-            linked_reference = entry.storehouse_entry.purchase_order.ooid
-        elif kind == 'inbound' and entry and entry.storehouse_entry and entry.storehouse_entry.purchase_order:
-            linked_reference = entry.storehouse_entry.purchase_order.ooid
-
-        supply = f"{t.supply.kind.name}: {t.supply.name}"
-
-        data.append((
-            strip_tz(t.created_at),
-            supply,
-            t.transaction_category,
-            kind,
-            quantity,
-            linked_reference,
-            reference_date,
-            t.created_by if t.created_by else "—",
-            inventory_simulated[supply_id],
-        ))
-
-    dataset = tablib.Dataset(*data, headers=headers)
-    response = HttpResponse(
-        dataset.xlsx,
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    return sheet_file_response(
+        headers, get_fifo_report_rows(transactions, balances), "inventory_movements_report.xlsx"
     )
-    response['Content-Disposition'] = 'attachment; filename="inventory_movements_report.xlsx"'
-    return response
 
 export_fifo_report.short_description = _("Export Inventory Movements Report")
@@ -0,0 +1,22 @@
+from django.db.models import F
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import InventoryTransaction, InventoryPosition, InventoryCheckpoint
+
+
+@receiver(post_delete, sender=InventoryTransaction)
+def revert_inventory_position(sender, instance, **kwargs):
+    # Si la existencia ya no existe el insumo se está eliminando, no hay nada que revertir
+    if InventoryPosition.objects.filter(supply_id=instance.supply_id, organization_id=instance.organization_id).exists():
+        InventoryPosition.post(instance.supply_id, instance.organization_id, -instance.signed_quantity)
+    if instance.transaction_kind == 'outbound' and instance.source_entry_id:
+        InventoryTransaction.objects.filter(pk=instance.source_entry_id).update(
+            remaining_quantity=F('remaining_quantity') + instance.quantity
+        )
+    # Los cortes mensuales posteriores a la transacción ya no son válidos
+    InventoryCheckpoint.objects.filter(
+        supply_id=instance.supply_id,
+        organization_id=instance.organization_id,
+        month__gt=timezone.localtime(instance.created_at).date()
+    ).delete()
@@ -1,30 +1,33 @@
 from decimal import Decimal
-from django.db.models import Sum, Q
-from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
-from .models import InventoryTransaction
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, When
+from django.utils import timezone
+from .models import InventoryTransaction, InventoryPosition, InventoryCheckpoint
+
+
+def _pk(value):
+    return getattr(value, 'pk', value)
 
 def get_inventory_balance(supply, organization):
     """
-    Devuelve el saldo actual del inventario para un insumo en una organización específica.
+    Devuelve el saldo actual del inventario para un insumo en una organización específica,
+    leído de su InventoryPosition.
     """
-    total_entries = InventoryTransaction.objects.filter(
+    quantity = InventoryPosition.objects.filter(
         supply=supply,
-        transaction_kind='inbound',
         organization=organization
-    ).aggregate(
-        total=Coalesce(Sum('quantity'), Decimal('0'))
-    )['total']
+    ).values_list('quantity', flat=True).first()
 
-    total_outputs = InventoryTransaction.objects.filter(
-        supply=supply,
-        transaction_kind='outbound',
-        organization=organization
-    ).aggregate(
-        total=Coalesce(Sum('quantity'), Decimal('0'))
-    )['total']
+    if quantity is None:
+        # Sin existencia registrada se suma el historial; la existencia la crean
+        # el primer movimiento o el comando de reconstrucción, no la lectura
+        quantity = InventoryTransaction.objects.filter(
+            supply=supply,
+            organization=organization
+        ).aggregate(total=_signed_quantity_sum())['total']
 
-    return total_entries - total_outputs
+    return quantity or Decimal('0')
 
 def validate_inventory_availability(supply, quantity, organization):
     """
@@ -37,10 +40,10 @@ def validate_inventory_availability(supply, quantity, organization):
 
     return remaining
 
-def get_entry_sources_fifo(supply, organization):
+def get_entry_sources_fifo(supply, organization, lock=False):
     """
     Devuelve una lista de entradas disponibles en orden FIFO, con su saldo restante.
-    Considera entradas con y sin `storehouse_entry_supply`.
+    Sólo recorre las entradas con remaining_quantity mayor a cero.
 
     Returns:
         List[Dict]: Cada dict contiene:
@@ -50,45 +53,19 @@ def get_entry_sources_fifo(supply, organization):
     entries = InventoryTransaction.objects.filter(
         supply=supply,
         transaction_kind='inbound',
-        organization=organization
-    ).order_by('created_at', 'id')
+        organization=organization,
+        remaining_quantity__gt=0
+    ).select_related('storehouse_entry_supply').order_by('created_at', 'id')
 
-    outputs = InventoryTransaction.objects.filter(
-        supply=supply,
-        transaction_kind='outbound',
-        organization=organization
-    ).order_by('created_at', 'id')
-
-    results = []
-
-    # Se separan las salidas que no tienen origen físico
-    remaining_output_without_source = outputs.filter(storehouse_entry_supply__isnull=True)
-    output_balance = sum([o.quantity for o in remaining_output_without_source])
-
-    for entry in entries:
-        if entry.storehouse_entry_supply:
-            # Salidas asociadas a esta entrada física
-            used_quantity = outputs.filter(
-                storehouse_entry_supply=entry.storehouse_entry_supply
-            ).aggregate(
-                total=Coalesce(Sum('quantity'), Decimal('0'))
-            )['total']
-        else:
-            # Entrada sin origen físico — le restamos lo que quede pendiente de salidas sin origen
-            used_quantity = min(entry.quantity, output_balance)
-            output_balance -= used_quantity  # descontamos lo que ya asignamos
-
-        available_quantity = entry.quantity - used_quantity
-
-        if available_quantity > 0:
-            results.append({
-                'entry': entry,
-                'available_quantity': available_quantity
-            })
-
-    return results
-
-def get_source_for_quantity_fifo(supply, quantity, organization):
+    if lock:
+        entries = entries.select_for_update(of=('self',))
+
+    return [
+        {'entry': entry, 'available_quantity': entry.remaining_quantity}
+        for entry in entries
+    ]
+
+def get_source_for_quantity_fifo(supply, quantity, organization, lock=False):
     """
     Simula una salida y determina de qué entradas (FIFO) se tomará el inventario.
 
@@ -96,6 +73,7 @@ def get_source_for_quantity_fifo(supply, quantity, organization):
         supply (Supply): Insumo a mover.
         quantity (Decimal): Cantidad total que se desea mover.
         organization (Organization): Organización en contexto.
+        lock (bool): Bloquea las entradas elegidas (select_for_update) para registrar la salida.
 
     Returns:
         List[Dict]: Cada dict contiene:
@@ -105,7 +83,7 @@ def get_source_for_quantity_fifo(supply, quantity, organization):
     Raises:
         ValidationError: Si no hay inventario suficiente.
     """
-    fifo_entries = get_entry_sources_fifo(supply, organization)
+    fifo_entries = get_entry_sources_fifo(supply, organization, lock=lock)
 
     remaining = quantity
     result = []
@@ -127,3 +105,100 @@ def get_source_for_quantity_fifo(supply, quantity, organization):
         raise ValidationError(f"Not enough inventory available for this supply. Missing: {remaining} units.")
 
     return result
+
+def post_outbound_fifo(supply, quantity, organization, **fields):
+    """
+    Registra una salida del insumo repartida en sus entradas en orden FIFO.
+    Bloquea la existencia del insumo y los lotes que toma, de modo que dos
+    salidas concurrentes no consuman el mismo saldo.
+
+    Args:
+        fields: Campos adicionales de cada InventoryTransaction (transaction_category, created_by, ...).
+
+    Returns:
+        List[InventoryTransaction]: Las transacciones de salida creadas.
+
+    Raises:
+        ValidationError: Si no hay inventario suficiente.
+    """
+    with transaction.atomic():
+        InventoryPosition.lock(_pk(supply), _pk(organization))
+        movements = get_source_for_quantity_fifo(supply, quantity, organization, lock=True)
+        return [
+            InventoryTransaction.objects.create(
+                supply=supply,
+                transaction_kind='outbound',
+                quantity=mov['take'],
+                source_entry=mov['entry'],
+                storehouse_entry_supply=mov['entry'].storehouse_entry_supply,
+                organization=organization,
+                **fields
+            )
+            for mov in movements
+        ]
+
+def _signed_quantity_sum():
+    return Sum(Case(When(transaction_kind='inbound', then=F('quantity')), default=-F('quantity')))
+
+def _month_start(moment):
+    return timezone.localtime(moment).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def get_inventory_checkpoints(organization, supply_ids, month_start):
+    """
+    Devuelve {supply_id: existencia al inicio del mes} partiendo del corte más
+    reciente de cada insumo y guarda los cortes que falten, con una consulta
+    agregada para todos los insumos.
+    """
+    month = month_start.date()
+    latest = {}
+    for supply_id, checkpoint_month, quantity in InventoryCheckpoint.objects.filter(
+        organization=organization, supply_id__in=supply_ids, month__lte=month
+    ).order_by('supply_id', '-month').values_list('supply_id', 'month', 'quantity'):
+        latest.setdefault(supply_id, (checkpoint_month, quantity))
+
+    balances = {supply_id: quantity for supply_id, (checkpoint_month, quantity) in latest.items()
+                if checkpoint_month == month}
+    missing = [supply_id for supply_id in supply_ids if supply_id not in balances]
+    if not missing:
+        return balances
+
+    window = Q()
+    for supply_id in missing:
+        condition = Q(supply_id=supply_id)
+        if supply_id in latest:
+            checkpoint_month = latest[supply_id][0]
+            condition &= Q(created_at__gte=month_start.replace(year=checkpoint_month.year,
+                                                                month=checkpoint_month.month))
+        window |= condition
+    totals = dict(
+        InventoryTransaction.objects.filter(window, organization=organization, created_at__lt=month_start)
+        .values('supply_id').annotate(total=_signed_quantity_sum()).values_list('supply_id', 'total')
+    )
+    for supply_id in missing:
+        base = latest[supply_id][1] if supply_id in latest else Decimal('0')
+        balances[supply_id] = base + (totals.get(supply_id) or Decimal('0'))
+
+    # Un mes ya iniciado no recibe transacciones anteriores a su inicio
+    if month_start <= timezone.now():
+        InventoryCheckpoint.objects.bulk_create(
+            [InventoryCheckpoint(organization_id=_pk(organization), supply_id=supply_id, month=month,
+                                 quantity=balances[supply_id]) for supply_id in missing],
+            ignore_conflicts=True,
+        )
+    return balances
+
+def get_opening_balances(organization, supply_ids, moment):
+    """
+    Existencia de cada insumo justo antes de `moment`: el corte del mes más
+    las transacciones del mes anteriores a esa fecha.
+    """
+    month_start = _month_start(moment)
+    balances = get_inventory_checkpoints(organization, supply_ids, month_start)
+    totals = dict(
+        InventoryTransaction.objects.filter(
+            organization=organization, supply_id__in=supply_ids,
+            created_at__gte=month_start, created_at__lt=moment
+        ).values('supply_id').annotate(total=_signed_quantity_sum()).values_list('supply_id', 'total')
+    )
+    return {supply_id: balances.get(supply_id, Decimal('0')) + (totals.get(supply_id) or Decimal('0'))
+            for supply_id in supply_ids}